@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 import json
-import requests
-import time
+
+from lighthouse_loader import REPORT_FIELDS, load_report, report_spec
+from psi_client import PSIClient
+from third_party import VendorAttribution
+from waterfall import Waterfall
 
 def analyze_lighthouse_report():
     """Analyze the local Lighthouse report"""
     try:
-        with open('lighthouse-report.json', 'r') as f:
-            data = json.load(f)
+        # Only audit scores, network requests and script bootup are decoded; screenshots and traces are skipped
+        spec = report_spec(['network-requests', 'bootup-time'], audit_summary=True,
+                           fields=REPORT_FIELDS + ('entities',))
+        data = load_report('lighthouse-report.json', spec=spec)
 
         print("=" * 60)
         print("LIGHTHOUSE PERFORMANCE ANALYSIS")
@@ -151,25 +156,59 @@ def analyze_lighthouse_report():
 
         network_requests = audits.get('network-requests', {})
         if network_requests and network_requests.get('details'):
-            items = network_requests['details'].get('items', [])
-            print(f"Total requests: {len(items)}")
-
-            total_size = sum(item.get('transferSize', 0) for item in items)
-            print(f"Total transfer size: {total_size / 1024 / 1024:.2f} MB")
-
-            # Group by resource type
-            resource_types = {}
-            for item in items:
-                resource_type = item.get('resourceType', 'Other')
-                if resource_type not in resource_types:
-                    resource_types[resource_type] = {'count': 0, 'size': 0}
-                resource_types[resource_type]['count'] += 1
-                resource_types[resource_type]['size'] += item.get('transferSize', 0)
+            waterfall = Waterfall.from_report(data)
+            print(f"Total requests: {len(waterfall)}")
+            print(f"Total transfer size: {waterfall.transfer.sum() / 1024 / 1024:.2f} MB")
 
             print("\nBy resource type:")
-            for rtype, data in sorted(resource_types.items(), key=lambda x: x[1]['size'], reverse=True):
-                size_mb = data['size'] / 1024 / 1024
-                print(f"  {rtype}: {data['count']} requests, {size_mb:.2f} MB")
+            for row in waterfall.breakdown('type'):
+                size_mb = row['transfer_bytes'] / 1024 / 1024
+                print(f"  {row['type']}: {row['requests']} requests, {size_mb:.2f} MB")
+
+            print("\n🌊 WATERFALL:")
+            print("-" * 40)
+            print("Top origins by transfer size:")
+            for row in waterfall.breakdown('origin')[:5]:
+                print(f"  {row['origin']}: {row['requests']} requests, "
+                      f"{row['transfer_bytes'] / 1024:.0f} KB, busy {row['busy_ms']:.0f}ms")
+
+            blocking = waterfall.render_blocking()
+            if blocking:
+                print(f"\nRender-blocking CSS/JS before FCP: {blocking['requests']} requests, "
+                      f"{blocking['transfer_bytes'] / 1024:.0f} KB, in flight {blocking['in_flight_before_fcp_ms']:.0f}ms "
+                      f"({blocking['share_of_fcp'] * 100:.0f}% of FCP)")
+
+            parallelism = waterfall.parallelism()
+            if parallelism:
+                print(f"Parallelism: up to {parallelism['max_in_flight']} requests in flight, "
+                      f"{parallelism['mean_in_flight_while_busy']:.1f} on average while the network is busy")
+
+            chains = waterfall.critical_chains()
+            if chains:
+                longest = chains['longest_chain']
+                print(f"Longest critical chain: {longest['length']} requests, {longest['duration_ms']:.0f}ms, "
+                      f"{longest['transfer_bytes'] / 1024:.0f} KB")
+
+            attribution = waterfall.lcp_attribution()
+            if attribution:
+                print(f"\nTime to LCP ({attribution['lcp_ms']:.0f}ms):")
+                print(f"  HTML document:        {attribution['document_ms']:.0f}ms")
+                print(f"  Render-blocking only: {attribution['render_blocking_ms']:.0f}ms")
+                print(f"  Other requests:       {attribution['other_network_ms']:.0f}ms")
+                print(f"  Network idle:         {attribution['network_idle_ms']:.0f}ms (main thread / rendering)")
+
+            vendors = VendorAttribution()
+            vendors.add_lighthouse_report(data)
+            vendor_report = vendors.report()
+            print("\n🏢 THIRD-PARTY VENDORS:")
+            print("-" * 40)
+            print(f"Third parties: {vendor_report['third_party_requests']} requests, "
+                  f"{vendor_report['third_party_bytes'] / 1024:.0f} KB, "
+                  f"{vendor_report['third_party_main_thread_ms']:.0f}ms main thread")
+            for row in vendor_report['by_vendor']:
+                if not row['first_party']:
+                    print(f"  {row['vendor']}: {row['requests']} requests, "
+                          f"{row['transfer_bytes'] / 1024:.0f} KB, {row['main_thread_ms']:.0f}ms main thread")
 
         return data
 
@@ -180,31 +219,23 @@ def analyze_lighthouse_report():
         print("Error parsing Lighthouse report")
         return None
 
-def check_pagespeed_insights(url):
+def check_pagespeed_insights(url, client=None):
     """Check Google PageSpeed Insights"""
     print("\n" + "=" * 60)
     print("GOOGLE PAGESPEED INSIGHTS")
     print("=" * 60)
 
-    # Using the PageSpeed Insights API
-    api_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+    # Mobile and desktop run concurrently; results are cached for the day
+    print("Analyzing mobile and desktop performance... (this may take 30-60 seconds)")
+    client = client or PSIClient()
+    responses = client.run_all([url])[url]
 
-    for strategy in ['mobile', 'desktop']:
+    for strategy, data in responses.items():
         print(f"\n📱 {strategy.upper()} RESULTS:")
         print("-" * 40)
 
-        params = {
-            'url': url,
-            'strategy': strategy,
-            'category': ['performance', 'accessibility', 'best-practices', 'seo']
-        }
-
         try:
-            print(f"Analyzing {strategy} performance... (this may take 30-60 seconds)")
-            response = requests.get(api_url, params=params, timeout=60)
-
-            if response.status_code == 200:
-                data = response.json()
+            if 'error' not in data:
                 lighthouse = data.get('lighthouseResult', {})
 
                 # Categories
@@ -267,15 +298,11 @@ def check_pagespeed_insights(url):
                         print(f"  FID (P75): {fid_data.get('percentile', 'N/A')}ms")
 
             else:
-                print(f"Error: Unable to fetch PageSpeed data (Status: {response.status_code})")
+                print(f"Error: Unable to fetch PageSpeed data ({data['error']})")
 
-        except requests.RequestException as e:
-            print(f"Error connecting to PageSpeed Insights: {e}")
         except Exception as e:
             print(f"Error processing data: {e}")
 
-        time.sleep(2)  # Rate limiting
-
 if __name__ == "__main__":
     url = "https://www.tln-werbemittel.de"
 
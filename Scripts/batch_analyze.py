@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Batch HTML analysis of saved page snapshots
+
+Spreads analyze_html() over a process pool sized to the available cores.
+Files are submitted in chunks with a bounded number of chunks in flight,
+and one JSONL record per file is streamed to the output as chunks finish.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from analyze_html import analyze_html
+from html_extractor import SITE_DOMAIN
+from results_index import ResultsIndex
+
+# One index connection per worker process
+_worker_index = None
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def find_html_files(source):
+    """Resolve a directory (searched recursively) or a glob pattern to a sorted file list"""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '**', '*.htm*')
+    else:
+        pattern = source
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def analyze_file(path, site_domain=SITE_DOMAIN, parser=None, results_index=None):
+    """Return ``(record, reused)`` for one snapshot"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html_content = f.read()
+
+        def compute():
+            return analyze_html(html_content, site_domain, parser)
+
+        record = {'file': path}
+        if results_index:
+            skipped = results_index.stats['skipped']
+            record.update(results_index.get_or_compute(
+                os.path.abspath(path), f'html:{site_domain}', html_content, compute
+            ))
+            return record, results_index.stats['skipped'] > skipped
+        record.update(compute())
+        return record, False
+    except Exception as e:
+        return {'file': path, 'error': str(e)}, False
+
+def _analyze_chunk(paths, site_domain, parser, index_path):
+    global _worker_index
+    if index_path and _worker_index is None:
+        _worker_index = ResultsIndex(index_path)
+    return [analyze_file(path, site_domain, parser, _worker_index if index_path else None) for path in paths]
+
+def batch_analyze(source, output_path, workers=None, chunksize=16, parser=None,
+                  site_domain=SITE_DOMAIN, progress_every=2.0, index_path=None):
+    """Analyze every HTML file under ``source`` and write one JSON line per file"""
+    paths = find_html_files(source) if isinstance(source, str) else list(source)
+    workers = workers or available_cores()
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+    stats = {'files': len(paths), 'done': 0, 'errors': 0, 'skipped': 0, 'recomputed': 0, 'workers': workers}
+
+    started = time.perf_counter()
+    last_report = started
+    with open(output_path, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        next_chunk = 0
+        while next_chunk < len(chunks) or pending:
+            # Keep two chunks per worker queued so no process idles
+            while next_chunk < len(chunks) and len(pending) < workers * 2:
+                pending.add(executor.submit(
+                    _analyze_chunk, chunks[next_chunk], site_domain, parser, index_path
+                ))
+                next_chunk += 1
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record, reused in future.result():
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    stats['done'] += 1
+                    stats['errors'] += 'error' in record
+                    stats['skipped' if reused else 'recomputed'] += 'error' not in record
+
+            now = time.perf_counter()
+            if progress_every and now - last_report >= progress_every:
+                last_report = now
+                rate = stats['done'] / (now - started)
+                print(f"  {stats['done']}/{stats['files']} files ({rate:.1f} files/s)", file=sys.stderr)
+
+    stats['elapsed'] = time.perf_counter() - started
+    stats['files_per_second'] = stats['done'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    return stats
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Batch-analyze saved HTML snapshots into JSONL')
+    arg_parser.add_argument('source', help='directory of snapshots or a glob pattern')
+    arg_parser.add_argument('output', nargs='?', default='html_analysis.jsonl')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--chunksize', type=int, default=16)
+    arg_parser.add_argument('--parser', choices=['bs4', 'lxml'], default=None)
+    arg_parser.add_argument('--index', default=None,
+                            help='results index (SQLite) for skipping unchanged files')
+    args = arg_parser.parse_args()
+
+    stats = batch_analyze(args.source, args.output, args.workers, args.chunksize, args.parser,
+                          index_path=args.index)
+    print(f"Analyzed {stats['done']} files ({stats['errors']} errors) with {stats['workers']} workers "
+          f"in {stats['elapsed']:.2f}s - {stats['files_per_second']:.1f} files/s")
+    if args.index:
+        print(f"Incremental: {stats['skipped']} unchanged files skipped, {stats['recomputed']} recomputed")
+    print(f"Results written to {args.output}")
@@ -0,0 +1,993 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the analysis pipeline
+
+Usage: python Scripts/benchmark.py [crawl] [sitemap] [cache] [extract] [dedupe] [linkgraph] [lighthouse] [history] [waterfall] [thirdparty] [probe] [load] [compression] [psi] [monitor] [fullanalysis] [portfolio] [dns] [tls] [robots]
+"""
+import gc
+import gzip
+import random
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+
+from compression_sim import CompressionSimulator
+from crawler import crawl_pages
+from dns_cache import CachingResolver, install_resolver
+from html_extractor import extract_features
+from http_cache import install_cache
+from lighthouse_history import LighthouseHistory
+from lighthouse_loader import find_reports, load_report, load_reports, report_spec
+from link_graph import LinkGraphBuilder
+from load_test import LoadTest
+from monitor import TimeSeriesStore
+from near_duplicates import LSHIndex, MinHasher
+from phase_probe import PhaseProbe
+from portfolio import SUMMARY_FILE, PortfolioRunner
+from psi_client import PSIClient, psi_standin_app
+from robots import RobotsCache, RobotsTxt, _translate
+from seo_analyzer import CHECK_TIMEOUTS, SEOAnalyzer, extract_page_metrics, summarize_response
+from sitemap import SitemapStats, iter_sitemap_urls
+from standin_server import StandinServer, StubDNSServer, default_app
+from task_graph import TaskGraph
+from third_party import DomainClassifier, VendorAttribution, url_host
+from tls_scan import ExpiryIndex, TLSScanner
+from waterfall import WATERFALL_SPEC, Waterfall, summarize_reports
+
+def bench_crawl(pages=200, latency=0.05, concurrency=16, per_host=16):
+    """Compare the sequential fetch+parse loop with the asyncio crawler"""
+    print("=" * 60)
+    print(f"CRAWL THROUGHPUT ({pages} pages, {latency * 1000:.0f}ms simulated latency)")
+    print("=" * 60)
+
+    with StandinServer(latency=latency) as server:
+        urls = [server.url(f'/page/{i}') for i in range(pages)]
+
+        # Sequential baseline: the old analyze_multiple_pages loop without its sleep
+        session = requests.Session()
+        started = time.perf_counter()
+        for url in urls:
+            response = session.get(url, timeout=10)
+            analysis = summarize_response(url, response)
+            analysis.update(extract_page_metrics(url, server.base_url, response.text))
+        sequential = time.perf_counter() - started
+        print(f"Sequential: {pages / sequential:8.1f} pages/s ({sequential:.2f}s)")
+
+        results, stats = crawl_pages(
+            urls, concurrency=concurrency, per_host=per_host, politeness_delay=0.0
+        )
+        print(f"Async:      {stats['pages_per_second']:8.1f} pages/s ({stats['elapsed']:.2f}s, "
+              f"{stats['errors']} errors)")
+        print(f"Speedup:    {sequential / stats['elapsed']:8.1f}x")
+
+def _sitemap_app(urls_per_sitemap, children):
+    """Serve a sitemap index pointing at plain and gzipped child sitemaps"""
+    def urlset(child):
+        entries = ''.join(
+            f'<url><loc>https://www.tln-werbemittel.de/artikel/{child}-{i}.html</loc>'
+            f'<lastmod>2025-09-0{1 + i % 7}</lastmod><changefreq>weekly</changefreq></url>'
+            for i in range(urls_per_sitemap)
+        )
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'{entries}</urlset>').encode('utf-8')
+
+    files = {}
+    for child in range(children):
+        body = urlset(child)
+        if child % 2:
+            files[f'/sitemap-{child}.xml.gz'] = gzip.compress(body)
+        else:
+            files[f'/sitemap-{child}.xml'] = body
+    index = ''.join(f'<sitemap><loc>{{base}}{path}</loc></sitemap>' for path in files)
+    files['/sitemap_index.xml'] = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{index}</sitemapindex>'
+    )
+
+    def app(method, path, headers):
+        body = files.get(path)
+        if body is None:
+            return 404, {}, b''
+        if isinstance(body, str):
+            body = body.replace('{base}', app.base_url).encode('utf-8')
+        return 200, {'Content-Type': 'application/xml'}, body
+    return app
+
+def bench_sitemap(urls_per_sitemap=25000, children=2):
+    """Stream a sitemap index with plain and gzipped children and report throughput and memory"""
+    total = urls_per_sitemap * children
+    print("=" * 60)
+    print(f"SITEMAP STREAMING ({total} URLs in {children} child sitemaps)")
+    print("=" * 60)
+
+    app = _sitemap_app(urls_per_sitemap, children)
+    with StandinServer(app=app) as server:
+        app.base_url = server.base_url
+        session = requests.Session()
+        stats = SitemapStats()
+        count = sum(1 for _ in iter_sitemap_urls(session, server.url('/sitemap_index.xml'), stats=stats))
+
+        # Second pass under tracemalloc, which is too slow to time with
+        tracemalloc.start()
+        for _ in iter_sitemap_urls(session, server.url('/sitemap_index.xml')):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    report = stats.as_dict()
+    print(f"URLs yielded:     {count}")
+    print(f"Bytes streamed:   {report['bytes'] / 1024 / 1024:.1f} MB (compressed where gzipped)")
+    print(f"Throughput:       {report['urls_per_second']:.0f} URLs/s, {report['mb_per_second']:.1f} MB/s")
+    print(f"Python heap peak: {peak / 1024 / 1024:.2f} MB")
+    print(f"Process peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+SAMPLE_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Raw_Data', 'homepage_raw.html')
+SAMPLE_LIGHTHOUSE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data', 'lighthouse-report.json')
+
+def bench_cache(rounds=20, latency=0.02):
+    """Compare full downloads of the sample homepage with 304 revalidations"""
+    print("=" * 60)
+    print(f"HTTP CACHE ({rounds} fetches of homepage_raw.html, {latency * 1000:.0f}ms latency)")
+    print("=" * 60)
+
+    with open(SAMPLE_HTML, 'rb') as f:
+        body = f.read()
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+
+    def app(method, path, headers):
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}, body
+
+    cache_dir = tempfile.mkdtemp(prefix='seo-http-cache-')
+    try:
+        with StandinServer(app=app, latency=latency) as server:
+            plain = requests.Session()
+            started = time.perf_counter()
+            for _ in range(rounds):
+                plain.get(server.url('/'), timeout=10).content
+            uncached = time.perf_counter() - started
+
+            cached = requests.Session()
+            cache = install_cache(cached, cache_dir)
+            cached.get(server.url('/'), timeout=10).content
+            started = time.perf_counter()
+            for _ in range(rounds):
+                cached.get(server.url('/'), timeout=10).content
+            revalidated = time.perf_counter() - started
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"Full download: {uncached / rounds * 1000:7.1f} ms/fetch, {len(body) * rounds / 1024:.0f} KB transferred")
+    print(f"Revalidated:   {revalidated / rounds * 1000:7.1f} ms/fetch, 0 KB body transferred")
+    print(f"Cache stats:   {cache.stats}")
+
+def legacy_analyze_html(html_content):
+    """The original multi-pass analyze_html.py (one find_all scan per metric), kept as baseline"""
+    soup = BeautifulSoup(html_content, 'lxml')
+
+    analysis = {}
+
+    # Title
+    title = soup.find('title')
+    analysis['title'] = title.text.strip() if title else None
+    analysis['title_length'] = len(analysis['title']) if analysis['title'] else 0
+
+    # Meta tags
+    meta_tags = {}
+    for meta in soup.find_all('meta'):
+        if meta.get('name'):
+            meta_tags[meta['name']] = meta.get('content', '')
+        elif meta.get('property'):
+            meta_tags[meta['property']] = meta.get('content', '')
+        elif meta.get('http-equiv'):
+            meta_tags[meta['http-equiv']] = meta.get('content', '')
+
+    analysis['meta_tags'] = meta_tags
+
+    # Headings
+    analysis['h1'] = [h.text.strip() for h in soup.find_all('h1')]
+    analysis['h2'] = [h.text.strip() for h in soup.find_all('h2')]
+    analysis['h3'] = [h.text.strip() for h in soup.find_all('h3')]
+    analysis['h4'] = [h.text.strip() for h in soup.find_all('h4')]
+
+    # Images
+    images = soup.find_all('img')
+    analysis['total_images'] = len(images)
+    analysis['images_without_alt'] = len([img for img in images if not img.get('alt')])
+    analysis['images_without_title'] = len([img for img in images if not img.get('title')])
+
+    # Links
+    all_links = soup.find_all('a', href=True)
+    analysis['total_links'] = len(all_links)
+    internal_links = [a for a in all_links if not a['href'].startswith('http') or 'tln-werbemittel.de' in a['href']]
+    external_links = [a for a in all_links if a['href'].startswith('http') and 'tln-werbemittel.de' not in a['href']]
+    analysis['internal_links'] = len(internal_links)
+    analysis['external_links'] = len(external_links)
+
+    # Check for no-follow links
+    nofollow_links = [a for a in all_links if a.get('rel') and 'nofollow' in a.get('rel')]
+    analysis['nofollow_links'] = len(nofollow_links)
+
+    # Canonical URL
+    canonical = soup.find('link', {'rel': 'canonical'})
+    analysis['canonical_url'] = canonical.get('href') if canonical else None
+
+    # Language
+    html_tag = soup.find('html')
+    analysis['language'] = html_tag.get('lang') if html_tag else None
+
+    # Schema.org structured data
+    schema_scripts = soup.find_all('script', type='application/ld+json')
+    analysis['schema_markup_count'] = len(schema_scripts)
+    if schema_scripts:
+        analysis['schema_types'] = []
+        for script in schema_scripts:
+            try:
+                schema_data = json.loads(script.string)
+                if '@type' in schema_data:
+                    analysis['schema_types'].append(schema_data['@type'])
+            except:
+                pass
+
+    # Open Graph tags
+    og_tags = {}
+    for meta in soup.find_all('meta', property=re.compile('^og:')):
+        og_tags[meta['property']] = meta.get('content', '')
+    analysis['open_graph'] = og_tags
+
+    # Twitter Card tags
+    twitter_tags = {}
+    for meta in soup.find_all('meta', attrs={'name': re.compile('^twitter:')}):
+        twitter_tags[meta['name']] = meta.get('content', '')
+    analysis['twitter_card'] = twitter_tags
+
+    # Forms
+    forms = soup.find_all('form')
+    analysis['total_forms'] = len(forms)
+
+    # Scripts
+    scripts = soup.find_all('script')
+    analysis['total_scripts'] = len(scripts)
+    analysis['inline_scripts'] = len([s for s in scripts if not s.get('src')])
+    analysis['external_scripts'] = len([s for s in scripts if s.get('src')])
+
+    # Stylesheets
+    stylesheets = soup.find_all('link', rel='stylesheet')
+    analysis['total_stylesheets'] = len(stylesheets)
+
+    # Check for viewport meta tag
+    viewport = soup.find('meta', attrs={'name': 'viewport'})
+    analysis['has_viewport'] = viewport is not None
+    analysis['viewport_content'] = viewport.get('content') if viewport else None
+
+    # Check for favicon
+    favicon = soup.find('link', rel=re.compile('icon'))
+    analysis['has_favicon'] = favicon is not None
+
+    # Word count (approximate)
+    text_content = soup.get_text()
+    words = text_content.split()
+    analysis['word_count'] = len(words)
+
+    return analysis
+
+def bench_extract(rounds=5):
+    """Time parse+extract per page: multi-pass find_all scans vs the single-pass extractor"""
+    print("=" * 60)
+    print(f"HTML FEATURE EXTRACTION (homepage_raw.html, best of {rounds})")
+    print("=" * 60)
+
+    with open(SAMPLE_HTML, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    def best_of(func):
+        func(html)
+        timings = []
+        for _ in range(rounds):
+            # bs4 trees are reference cycles; collect them outside the timed region
+            gc.collect()
+            started = time.perf_counter()
+            result = func(html)
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    parse_time, _ = best_of(lambda html: BeautifulSoup(html, 'lxml'))
+    legacy_time, legacy_result = best_of(legacy_analyze_html)
+    single_time, single_result = best_of(lambda html: extract_features(html, parser='bs4'))
+    lxml_time, lxml_result = best_of(lambda html: extract_features(html, parser='lxml'))
+
+    print(f"bs4 parse only:       {parse_time * 1000:7.1f} ms/page")
+    print(f"bs4 multi-pass:       {legacy_time * 1000:7.1f} ms/page (extract {(legacy_time - parse_time) * 1000:.1f} ms)")
+    print(f"bs4 single-pass:      {single_time * 1000:7.1f} ms/page (extract {(single_time - parse_time) * 1000:.1f} ms)")
+    print(f"lxml event stream:    {lxml_time * 1000:7.1f} ms/page")
+    print(f"Speedup vs multi-pass: single-pass {legacy_time / single_time:.2f}x, lxml {legacy_time / lxml_time:.2f}x")
+    print(f"Identical output: {legacy_result == single_result == lxml_result}")
+
+def bench_dedupe(pages=10000, families=500, words=300):
+    """Fingerprint a synthetic catalogue of product variants and cluster it via LSH"""
+    print("=" * 60)
+    print(f"NEAR-DUPLICATE DETECTION ({pages} pages, {families} variant families)")
+    print("=" * 60)
+
+    rng = random.Random(7)
+    vocabulary = [f'wort{i}' for i in range(5000)]
+    bases = [[rng.choice(vocabulary) for _ in range(words)] for _ in range(families)]
+    texts = []
+    for i in range(pages):
+        text = list(bases[i % families])
+        # Variant pages differ in a handful of words (colour, size, SKU)
+        for _ in range(3):
+            text[rng.randrange(words)] = f'sku{i}'
+        texts.append(' '.join(text))
+
+    hasher = MinHasher()
+    index = LSHIndex(num_perm=hasher.num_perm)
+    started = time.perf_counter()
+    for i, text in enumerate(texts):
+        index.add(f'/artikel/{i}', hasher.signature(text))
+    fingerprinted = time.perf_counter() - started
+
+    started = time.perf_counter()
+    candidates = sum(1 for _ in index.candidate_pairs())
+    clusters = index.clusters(threshold=0.8)
+    clustered = time.perf_counter() - started
+
+    all_pairs = pages * (pages - 1) // 2
+    print(f"Fingerprinting: {fingerprinted:.2f}s ({pages / fingerprinted:.0f} pages/s)")
+    print(f"Clustering:     {clustered:.2f}s")
+    print(f"Pairs checked:  {candidates} of {all_pairs} possible ({candidates / all_pairs:.4%})")
+    print(f"Clusters found: {len(clusters)} (expected {families})")
+
+def bench_linkgraph(pages=100000, links=10):
+    """Build a CSR link graph from a synthetic site and run the graph metrics on it"""
+    print("=" * 60)
+    print(f"LINK GRAPH ({pages} pages, ~{pages * links} internal links)")
+    print("=" * 60)
+
+    rng = random.Random(11)
+    base = 'https://example.test'
+    navigation = [f'{base}/kategorie/{i}' for i in range(links)]
+    builder = LinkGraphBuilder()
+    started = time.perf_counter()
+    for i in range(pages):
+        # Site-wide navigation plus a few deep links; every 50th page gets no inlinks
+        targets = navigation[:links // 2] + [f'{base}/seite/{rng.randrange(pages) // 50 * 50 + 1}'
+                                            for _ in range(links - links // 2)]
+        builder.add_page(f'{base}/seite/{i}', targets)
+    interned = time.perf_counter() - started
+
+    started = time.perf_counter()
+    graph = builder.build()
+    built = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rank = graph.pagerank()
+    ranked = time.perf_counter() - started
+
+    started = time.perf_counter()
+    graph.click_depth(f'{base}/seite/1')
+    orphans = graph.orphan_pages(f'{base}/seite/1')
+    analysed = time.perf_counter() - started
+
+    memory = graph.indptr.nbytes + graph.indices.nbytes + graph.crawled.nbytes
+    print(f"Interning:  {interned:.2f}s ({pages / interned:.0f} pages/s)")
+    print(f"CSR build:  {built:.2f}s, {graph.num_nodes} nodes, {graph.num_edges} edges, {memory / 1024 / 1024:.1f} MB")
+    print(f"PageRank:   {ranked:.2f}s (sum {rank.sum():.4f})")
+    print(f"BFS+orphan: {analysed:.2f}s, {len(orphans)} orphan pages")
+
+def _measure(load, rounds):
+    """Best-of-``rounds`` time and the traced heap peak of one call"""
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def bench_lighthouse(rounds=10, reports=200):
+    """Per-report time and memory of json.load vs the selective loader, then a parallel batch"""
+    print("=" * 60)
+    print(f"LIGHTHOUSE REPORT LOADING ({os.path.getsize(SAMPLE_LIGHTHOUSE) / 1024 / 1024:.1f} MB report)")
+    print("=" * 60)
+
+    def full_load():
+        with open(SAMPLE_LIGHTHOUSE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    summary_ids = ['network-requests']
+    for label, load in [
+        ('json.load (everything)', full_load),
+        ('selective: Core Web Vitals', lambda: load_report(SAMPLE_LIGHTHOUSE)),
+        ('selective: all audit scores', lambda: load_report(SAMPLE_LIGHTHOUSE, summary_ids, audit_summary=True)),
+    ]:
+        elapsed, peak = _measure(load, rounds)
+        print(f"{label:30} {elapsed * 1000:7.1f} ms  {peak / 1024 / 1024:6.2f} MB peak")
+
+    directory = tempfile.mkdtemp(prefix='lighthouse_bench_')
+    try:
+        for i in range(reports):
+            shutil.copy(SAMPLE_LIGHTHOUSE, os.path.join(directory, f'report_{i:04d}.json'))
+        paths = find_reports(directory)
+
+        started = time.perf_counter()
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        loaded = sum(1 for record in load_reports(paths, report_spec()) if 'error' not in record)
+        parallel = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"\nBatch of {reports} reports:")
+    print(f"Sequential json.load:     {sequential:.2f}s ({reports / sequential:.0f} reports/s)")
+    print(f"Parallel selective load:  {parallel:.2f}s ({loaded / parallel:.0f} reports/s)")
+
+def bench_history(runs=100000, pages=50, days=365):
+    """Append a year of synthetic runs to the columnar store and query weekly LCP p75"""
+    print("=" * 60)
+    print(f"LIGHTHOUSE HISTORY ({runs} runs over {days} days)")
+    print("=" * 60)
+
+    rng = random.Random(5)
+    now = time.time()
+    rows = [{
+        'fetch_time': now - rng.uniform(0, days * 86400),
+        'url': f'https://example.test/page/{i % pages}',
+        'score_performance': rng.uniform(0.3, 0.9),
+        'lcp': rng.lognormvariate(8.5, 0.4),
+        'bytes_total': rng.randrange(500000, 3000000),
+    } for i in range(runs)]
+
+    directory = tempfile.mkdtemp(prefix='lighthouse_history_')
+    try:
+        history = LighthouseHistory(directory)
+        started = time.perf_counter()
+        for i in range(0, runs, 10000):
+            history.append(rows[i:i + 10000])
+        appended = time.perf_counter() - started
+
+        history = LighthouseHistory(directory)
+        started = time.perf_counter()
+        weeks, values, counts = history.percentile_by_period('lcp', 75, 'week', since=now - days * 86400)
+        queried = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"Append:        {appended:.2f}s ({runs / appended:.0f} runs/s), {size / 1024 / 1024:.1f} MB on disk")
+    print(f"LCP p75/week:  {queried * 1000:.1f} ms for {len(weeks)} weeks ({counts.sum()} runs)")
+
+def bench_waterfall(rounds=20, reports=100):
+    """Waterfall analysis of one report, then a batch of report copies on the process pool"""
+    print("=" * 60)
+    print("NETWORK WATERFALL")
+    print("=" * 60)
+
+    report = load_report(SAMPLE_LIGHTHOUSE, spec=WATERFALL_SPEC)
+    items = report['audits']['network-requests']['details']['items']
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        Waterfall.from_report(report).summary()
+        best = min(best, time.perf_counter() - started)
+    print(f"Single report ({len(items)} requests): {best * 1000:.2f} ms for the full summary")
+
+    directory = tempfile.mkdtemp(prefix='waterfall_bench_')
+    try:
+        for i in range(reports):
+            shutil.copy(SAMPLE_LIGHTHOUSE, os.path.join(directory, f'report_{i:04d}.json'))
+        paths = find_reports(directory)
+        started = time.perf_counter()
+        summarized = sum(1 for record in summarize_reports(paths) if 'error' not in record)
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory)
+    print(f"Batch of {reports} reports: {elapsed:.2f}s ({summarized / elapsed:.0f} reports/s)")
+
+def bench_thirdparty(rows=1000000, hosts=5000):
+    """Attribute a million synthetic request rows to vendors with and without host memoization"""
+    print("=" * 60)
+    print(f"THIRD-PARTY ATTRIBUTION ({rows} request rows, {hosts} hosts)")
+    print("=" * 60)
+
+    rng = random.Random(15)
+    vendors = ['google-analytics.com', 'gstatic.com', 'facebook.net', 'cookiebot.com', 'jsdelivr.net']
+    host_names = [f'cdn{i}.{rng.choice(vendors)}' if i % 3 == 0 else f'www.site{i}.co.uk' for i in range(hosts)]
+    urls = [f'https://{rng.choice(host_names)}/asset/{i % 97}.js' for i in range(rows)]
+    sizes = [rng.randrange(100, 200000) for _ in range(rows)]
+
+    classifier = DomainClassifier()
+    started = time.perf_counter()
+    for url in urls[:rows // 10]:
+        host = url_host(url)
+        classifier.registrable_domain(host)
+        classifier._entity(host)
+    uncached = (time.perf_counter() - started) * 10
+
+    attribution = VendorAttribution()
+    started = time.perf_counter()
+    attribution.add(urls, sizes, page_url='https://www.site1.co.uk/')
+    report = attribution.report()
+    elapsed = time.perf_counter() - started
+
+    print(f"Trie walk per row (est.):   {uncached:.2f}s")
+    print(f"Memoized attribution:       {elapsed:.2f}s ({rows / elapsed:.0f} rows/s), "
+          f"{report['stats']['hosts']} hosts resolved, {report['vendors']} vendors")
+
+def bench_probe(samples=60, latency=0.05, concurrency=10):
+    """Sequential timed GETs (the old check_performance loop without its sleeps) vs the phase probe"""
+    print("=" * 60)
+    print(f"PHASE PROBE ({samples} samples over HTTPS, {latency * 1000:.0f}ms simulated latency)")
+    print("=" * 60)
+
+    with StandinServer(latency=latency, tls=True) as server:
+        url = server.url('/')
+        started = time.perf_counter()
+        for _ in range(samples):
+            requests.get(url, timeout=30, verify=server.cafile)
+        sequential = time.perf_counter() - started
+
+        probe = PhaseProbe(samples, concurrency, verify=server.cafile)
+        report = probe.run(url)
+
+    print(f"Sequential GETs:  {sequential:.2f}s (total time only)")
+    print(f"Phase probe:      {report['elapsed']:.2f}s ({concurrency} concurrent, {report['errors']} errors)")
+    for phase in ('dns', 'connect', 'tls', 'ttfb', 'transfer', 'total'):
+        summary = report['phases_ms'][phase]
+        print(f"  {phase:9} p50 {summary['p50']:7.2f}ms  p90 {summary['p90']:7.2f}ms  p99 {summary['p99']:7.2f}ms")
+
+def bench_load(duration=3.0, latency=0.02, users=16, rate=200):
+    """Closed- and open-loop load against the stand-in server, plus the generator's own ceiling"""
+    print("=" * 60)
+    print(f"LOAD GENERATION ({duration:g}s per run, {latency * 1000:.0f}ms simulated latency)")
+    print("=" * 60)
+
+    for label, server_latency, options in [
+        (f'Closed loop, {users} users', latency, {'users': users}),
+        (f'Open loop, {rate} req/s', latency, {'rate': rate}),
+        (f'Closed loop, {users} users, 0ms', 0.0, {'users': users}),
+    ]:
+        with StandinServer(latency=server_latency) as server:
+            report = LoadTest(server.url('/'), duration, **options).run()
+        latency_ms = report['latency_ms']
+        print(f"{label:32} {report['throughput']:7.1f} req/s  p50 {latency_ms['p50']:6.1f}ms  "
+              f"p99 {latency_ms['p99']:6.1f}ms  errors {report['error_rate'] * 100:.1f}%")
+
+def bench_compression(files=41, bundles=5):
+    """Compress synthetic JS files one by one vs on the process pool, then from the memo, and bundle them"""
+    print("=" * 60)
+    print(f"COMPRESSION SIMULATOR ({files} JS files + homepage_raw.html into {bundles} bundles)")
+    print("=" * 60)
+
+    rng = random.Random(18)
+    words = ['function', 'var', 'return', 'this', 'document', 'window', 'if', 'else', 'length', 'jQuery']
+    assets = [{'url': SAMPLE_HTML, 'type': 'document', 'body': open(SAMPLE_HTML, 'rb').read()}]
+    for i in range(files):
+        lines = rng.randrange(500, 5000)
+        body = ''.join(f'{rng.choice(words)}({rng.choice(words)}_{rng.randrange(1000)});\n' for _ in range(lines))
+        assets.append({'url': f'/js/{i}.js', 'type': 'script', 'body': body.encode(), 'served_encoding': 'gzip'})
+
+    started = time.perf_counter()
+    serial = CompressionSimulator(workers=1)
+    for asset in assets:
+        serial.sizes([asset['body']])
+    sequential = time.perf_counter() - started
+
+    simulator = CompressionSimulator()
+    started = time.perf_counter()
+    simulator.sizes([asset['body'] for asset in assets])
+    pooled = time.perf_counter() - started
+
+    before = dict(simulator.stats)
+    started = time.perf_counter()
+    report = simulator.report(assets, bundles)
+    memoized = time.perf_counter() - started
+    reused = report['stats']['memoized'] - before['memoized']
+    bodies = report['stats']['bodies'] - before['bodies']
+
+    print(f"Codecs: {', '.join(f'{codec} {levels}' for codec, levels in simulator.codecs.items())}")
+    print(f"One body at a time:  {sequential:.2f}s")
+    print(f"Process pool:        {pooled:.2f}s")
+    print(f"Full report (memo):  {memoized:.2f}s ({reused} of {bodies} bodies memoized; only the bundles are new)")
+    bundling = report['bundling'][0]
+    for key in bundling['saved_bytes']:
+        print(f"  bundling {key:9} {bundling['separate_bytes'][key] / 1024:8.1f} KB -> "
+              f"{bundling['bundled_bytes'][key] / 1024:8.1f} KB, {bundling['saved_requests']} fewer requests")
+
+def bench_psi(urls=4, latency=0.5):
+    """Sequential PSI calls (the old loop without its sleeps) vs the shared client, cold and cached"""
+    print("=" * 60)
+    print(f"PAGESPEED INSIGHTS CLIENT ({urls} URLs x 2 strategies, {latency * 1000:.0f}ms per call)")
+    print("=" * 60)
+
+    with open(SAMPLE_LIGHTHOUSE, 'r', encoding='utf-8') as f:
+        lighthouse_result = json.load(f)
+    targets = [f'https://www.example.test/page/{i}' for i in range(urls)]
+    directory = tempfile.mkdtemp(prefix='psi_cache_')
+    try:
+        with StandinServer(psi_standin_app(lighthouse_result), latency=latency) as server:
+            endpoint = server.url('/pagespeedonline/v5/runPagespeed')
+            started = time.perf_counter()
+            for url in targets:
+                for strategy in ('mobile', 'desktop'):
+                    requests.get(endpoint, params={'url': url, 'strategy': strategy}, timeout=60)
+            sequential = time.perf_counter() - started
+
+            client = PSIClient(endpoint=endpoint, rate=10, burst=4, concurrency=8, backoff=0.1, cache_dir=directory)
+            started = time.perf_counter()
+            client.run_all(targets)
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            client.run_all(targets)
+            cached = time.perf_counter() - started
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"Sequential:       {sequential:.2f}s")
+    print(f"Client (cold):    {cold:.2f}s ({client.stats['requests']} API calls)")
+    print(f"Client (cached):  {cached:.2f}s ({client.stats['cache_hits']} cache hits)")
+
+def bench_monitor(days=60, urls=3, metrics=10, interval=60):
+    """Months of monitoring samples: storage and query cost with and without downsampling"""
+    print("=" * 60)
+    print(f"MONITORING STORE ({days} days of {urls} URLs x {metrics} metrics every {interval}s)")
+    print("=" * 60)
+
+    rng = np.random.default_rng(0)
+    targets = [f'https://www.example.test/page/{i}' for i in range(urls)]
+    names = [f'performance.metric_{i}' for i in range(metrics)]
+    now = time.time()
+    start = now - days * 86400
+    directories = [tempfile.mkdtemp(prefix='monitor_') for _ in range(2)]
+    try:
+        stores = [TimeSeriesStore(directory) for directory in directories]
+        started = time.perf_counter()
+        compact_seconds = 0.0
+        next_compaction = start + 86400
+        for t in np.arange(start, now, interval):
+            for url in targets:
+                values = dict(zip(names, rng.normal(100, 10, metrics)))
+                for store in stores:
+                    store.append(url, values, t)
+            if t >= next_compaction:
+                # The daemon compacts as it goes; only the first store is compacted
+                compact_started = time.perf_counter()
+                stores[0].compact(t)
+                compact_seconds += time.perf_counter() - compact_started
+                next_compaction += 86400
+        stores[0].compact(now)
+        samples = int(days * 86400 / interval) * urls * metrics
+        print(f"Appended {samples:,} samples in {time.perf_counter() - started:.2f}s "
+              f"(compaction {compact_seconds:.2f}s in total)")
+
+        for label, store in zip(('Downsampled', 'Raw only'), stores):
+            timings = []
+            for span in (1, 30, days):
+                started = time.perf_counter()
+                points = len(store.query(targets[0], names[0], start=now - span * 86400)['t'])
+                timings.append(f"{span}d {(time.perf_counter() - started) * 1000:.1f}ms/{points} points")
+            print(f"{label:12} {store.size() / 1024 / 1024:7.1f} MB   query " + ', '.join(timings))
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory)
+
+def bench_fullanalysis(scale=0.5):
+    """run_full_analysis checks one after another vs the task graph, with simulated network latency"""
+    # Typical latency (seconds) of each check against a remote site; WHOIS is usually the slowest
+    latencies = {'homepage_analysis': 0.4, 'robots_txt': 0.15, 'sitemaps': 0.45, 'ssl_certificate': 0.3,
+                 'dns_records': 0.3, 'domain_info': 1.2, 'additional_pages': 0.6}
+    latencies = {name: seconds * scale for name, seconds in latencies.items()}
+    print("=" * 60)
+    print(f"FULL ANALYSIS SCHEDULING ({len(latencies)} checks, {sum(latencies.values()):.2f}s of simulated latency)")
+    print("=" * 60)
+
+    def check(name):
+        time.sleep(latencies[name])
+        return name
+
+    started = time.perf_counter()
+    for name in latencies:
+        check(name)
+    sequential = time.perf_counter() - started
+
+    graph = TaskGraph(timeout=60)
+    for name in latencies:
+        graph.add(name, check, name, timeout=CHECK_TIMEOUTS[name])
+    graph.run()
+    report = graph.report()
+    slowest = max(report['tasks'], key=lambda name: report['tasks'][name]['seconds'])
+
+    print(f"Sequential:  {sequential:.2f}s")
+    print(f"Task graph:  {report['elapsed']:.2f}s (slowest check: {slowest}, "
+          f"{report['tasks'][slowest]['seconds']:.2f}s)")
+
+class _OfflineAnalyzer(SEOAnalyzer):
+    """SEOAnalyzer without the checks that need public DNS, WHOIS or port 443"""
+
+    def check_ssl(self):
+        return {'ssl_enabled': False}
+
+    def check_dns(self):
+        return {}
+
+    def check_domain_info(self):
+        return {}
+
+class _OfflinePortfolio(PortfolioRunner):
+    def analyze_domain(self, domain):
+        analyzer = _OfflineAnalyzer(domain, parser=self.parser, index_path=None, session=self.session,
+                                    results_index=self.results_index, resolver=self.resolver)
+        return analyzer.run_full_analysis(**self.analysis_options)
+
+def _site_app(method, path, headers):
+    """A small site: robots.txt, a sitemap listing the homepage and legal pages, synthetic HTML"""
+    origin = f"http://{headers['Host']}"
+    if path == '/robots.txt':
+        body = f'User-agent: *\nDisallow: /private/\nSitemap: {origin}/sitemap.xml\n'
+        return 200, {'Content-Type': 'text/plain'}, body.encode('utf-8')
+    if path == '/sitemap.xml':
+        locs = ''.join(f'<url><loc>{origin}/{page}</loc></url>' for page in ('', 'impressum', 'datenschutz', 'kontakt'))
+        body = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+        return 200, {'Content-Type': 'application/xml'}, body.encode('utf-8')
+    if path in ('/sitemap_index.xml', '/export/sitemap_de.xml'):
+        return 404, {'Content-Type': 'text/plain'}, b'not found'
+    return default_app(method, path, headers)
+
+def bench_portfolio(domains=12, latency=0.1, workers=8):
+    """Portfolio audit of several stand-in domains, one at a time vs in parallel on a shared session"""
+    print("=" * 60)
+    print(f"PORTFOLIO MODE ({domains} stand-in domains, {latency * 1000:.0f}ms latency)")
+    print("=" * 60)
+
+    servers = [StandinServer(_site_app, latency=latency).start() for _ in range(domains)]
+    directory = tempfile.mkdtemp(prefix='portfolio_')
+    try:
+        urls = [server.base_url + '/' for server in servers]
+        timings = {}
+        for label, worker_count in (('One at a time', 1), (f'{workers} in parallel', workers)):
+            runner = _OfflinePortfolio(directory, worker_count, cache_dir=None, index_path=None)
+            started = time.perf_counter()
+            stats = runner.run(urls)
+            timings[label] = (time.perf_counter() - started, stats)
+        with open(os.path.join(directory, SUMMARY_FILE), 'r', encoding='utf-8') as f:
+            summaries = [json.loads(line) for line in f]
+        requests_per_domain = sum(server.request_count for server in servers) / (2 * domains)
+    finally:
+        for server in servers:
+            server.stop()
+        shutil.rmtree(directory)
+
+    for label, (elapsed, stats) in timings.items():
+        print(f"{label:16} {elapsed:6.2f}s ({stats['done']} reports, {stats['errors']} failed)")
+    print(f"Per domain: {requests_per_domain:.0f} requests, "
+          f"{sum(bool(summary['robots_txt']) for summary in summaries)}/{domains} with robots.txt, "
+          f"{sum(summary['sitemaps'] for summary in summaries)} sitemaps, "
+          f"failed checks: {sorted({name for summary in summaries for name in summary['failed_checks']}) or 'none'}")
+
+def bench_dns(domains=50, latency=0.02, pages_per_domain=4):
+    """check_dns one record at a time vs the batched caching resolver, plus fetches sharing its cache"""
+    import dns.resolver
+
+    print("=" * 60)
+    print(f"DNS RESOLVER ({domains} domains x A/MX/TXT, {latency * 1000:.0f}ms per query)")
+    print("=" * 60)
+
+    names = [f'site{i}.example.test' for i in range(domains)]
+    zone = {f'{name}.': {'A': (300, ['127.0.0.1']), 'MX': (300, [f'10 mail.{name}.']),
+                         'TXT': (300, ['"v=spf1 -all"'])} for name in names}
+    with StubDNSServer(zone, latency=latency) as stub, StandinServer() as server:
+        nameserver, port = stub.address
+        plain = dns.resolver.Resolver(configure=False)
+        plain.nameservers, plain.port = [nameserver], port
+        started = time.perf_counter()
+        for name in names:
+            for record_type in ('A', 'MX', 'TXT'):
+                plain.resolve(name, record_type)
+        sequential = time.perf_counter() - started
+
+        resolver = CachingResolver(nameservers=[nameserver], port=port)
+        queries = len(stub.queries)
+        started = time.perf_counter()
+        resolver.resolve_many(names)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        resolver.resolve_many(names)
+        warm = time.perf_counter() - started
+        batch_queries = len(stub.queries) - queries
+
+        # Every host needs its address once for its connection
+        session = requests.Session()
+        install_resolver(session, resolver)
+        http_port = server.base_url.rsplit(':', 1)[1]
+        queries = len(stub.queries)
+        started = time.perf_counter()
+        for name in names:
+            for page in range(pages_per_domain):
+                session.get(f'http://{name}:{http_port}/page/{page}', timeout=10)
+        fetches = time.perf_counter() - started
+        fetch_queries = len(stub.queries) - queries
+
+    print(f"Sequential (old check_dns): {sequential:.2f}s ({domains * 3} queries)")
+    print(f"Batched resolver (cold):    {cold:.2f}s ({batch_queries} queries)")
+    print(f"Batched resolver (cached):  {warm * 1000:.1f}ms")
+    print(f"{domains * pages_per_domain} fetches from {domains} hosts: {fetches:.2f}s, {fetch_queries} extra DNS queries")
+
+def bench_tls(hosts=16, handshake_latency=0.05, certificates=100000):
+    """Per-host check_ssl-style handshakes vs the batch scanner, and expiry queries on a large index"""
+    import socket
+    import ssl
+
+    from standin_server import self_signed_certificate
+
+    print("=" * 60)
+    print(f"TLS SCANNER ({hosts} stand-ins, {handshake_latency * 1000:.0f}ms handshake latency, "
+          f"index of {certificates:,} certificates)")
+    print("=" * 60)
+
+    directory = tempfile.mkdtemp(prefix='tls_bench_')
+    certfile, keyfile = self_signed_certificate(directory)
+    servers = [StandinServer(tls=True, certfile=certfile, keyfile=keyfile, handshake_latency=handshake_latency).start()
+               for _ in range(hosts)]
+    try:
+        targets = [f'localhost:{server._httpd.server_address[1]}' for server in servers]
+        started = time.perf_counter()
+        for target in targets:
+            # The old check_ssl: a new default context and connection per host, leaf certificate only
+            context = ssl.create_default_context(cafile=certfile)
+            with socket.create_connection(('localhost', int(target.split(':')[1])), timeout=5) as sock:
+                with context.wrap_socket(sock, server_hostname='localhost') as ssock:
+                    ssock.getpeercert()
+        sequential = time.perf_counter() - started
+
+        scanner = TLSScanner(concurrency=hosts, cafile=certfile, index=ExpiryIndex())
+        started = time.perf_counter()
+        results = scanner.scan(targets)
+        batch = time.perf_counter() - started
+    finally:
+        for server in servers:
+            server.stop()
+        shutil.rmtree(directory)
+    handshakes = sorted(result['handshake_ms'] for result in results if result['ssl_enabled'])
+
+    rng = random.Random(0)
+    now = time.time()
+    index = ExpiryIndex()
+    entries = []
+    for i in range(certificates):
+        entry = {'host': f'site{i}.example.test', 'port': 443, 'not_after': None, 'verified': True,
+                 'expires_at': now + rng.uniform(-30, 365) * 86400}
+        entries.append(entry)
+        index.add(entry)
+    started = time.perf_counter()
+    linear = [entry for entry in entries if entry['expires_at'] < now + 14 * 86400]
+    linear.sort(key=lambda entry: entry['expires_at'])
+    scan_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    expiring = index.expiring_within(14, now)
+    index_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Sequential handshakes:  {sequential:.2f}s")
+    print(f"Batch scanner:          {batch:.2f}s ({scanner.stats['verified']} verified, "
+          f"median handshake {handshakes[len(handshakes) // 2]:.1f}ms, full chains)")
+    print(f"Expiring within 14 days: {len(expiring):,} certificates, "
+          f"linear scan {scan_ms:.1f}ms vs index {index_ms:.1f}ms")
+
+def _robots_txt(rules=60):
+    """A large, realistic robots.txt: directory blocks, their exceptions and wildcard rules"""
+    lines = ['User-agent: Googlebot', 'Disallow: /nogoogle/', '', 'User-agent: *', 'Crawl-delay: 0.2']
+    for i in range(rules // 3):
+        lines.append(f'Disallow: /section{i}/private/')
+        lines.append(f'Allow: /section{i}/private/press')
+    for i in range(rules // 3):
+        lines.append(f'Disallow: /*?filter{i}=' if i % 2 else f'Disallow: /*/print{i}/*.pdf$')
+    lines.append('Sitemap: /sitemap.xml')
+    return '\n'.join(lines) + '\n'
+
+def _naive_allowed(rules, path):
+    """A regex per rule, every rule tried for every URL"""
+    best = None
+    for allow, regex, length in rules:
+        if regex.match(path) and (best is None or (length, allow) > best):
+            best = (length, allow)
+    return best is None or best[1]
+
+def bench_robots(urls=500000, rules=60, pages=12):
+    """Compiled robots.txt matcher vs a regex-per-rule loop, and Crawl-delay enforced by the crawler"""
+    print("=" * 60)
+    print(f"ROBOTS.TXT ({urls:,} URLs against {rules} rules, crawl of {pages} pages with Crawl-delay)")
+    print("=" * 60)
+
+    text = _robots_txt(rules)
+    rng = random.Random(0)
+    paths = []
+    for _ in range(urls):
+        section = rng.randrange(rules)
+        kind = rng.random()
+        if kind < 0.2:
+            paths.append(f'/section{section}/private/{rng.choice(["press", "docs"])}/{rng.randrange(1000)}')
+        elif kind < 0.4:
+            paths.append(f'/shop/{rng.randrange(10000)}?filter{rng.randrange(rules)}=red')
+        elif kind < 0.5:
+            paths.append(f'/a/print{rng.randrange(rules)}/file{rng.randrange(100)}.pdf')
+        else:
+            paths.append(f'/section{section}/page/{rng.randrange(100000)}')
+
+    started = time.perf_counter()
+    robots = RobotsTxt(text, 'Mozilla/5.0')
+    compiled = robots.allowed_many(paths)
+    compiled_elapsed = time.perf_counter() - started
+
+    naive_rules = [(allow, re.compile(_translate(pattern)), len(pattern)) for allow, pattern in robots.rules if pattern]
+    sample = paths[:urls // 10]
+    started = time.perf_counter()
+    naive = [_naive_allowed(naive_rules, path) for path in sample]
+    naive_elapsed = (time.perf_counter() - started) * len(paths) / len(sample)
+    assert naive == compiled[:len(sample)]
+
+    def app(method, path, headers):
+        if path == '/robots.txt':
+            return 200, {'Content-Type': 'text/plain'}, text.encode('utf-8')
+        return default_app(method, path, headers)
+
+    with StandinServer(app) as server:
+        crawl_urls = [server.url(f'/section{i % 3}/{"private/" if i % 4 == 0 else ""}page{i}') for i in range(pages)]
+        cache = RobotsCache(user_agent='Mozilla/5.0')
+        started = time.perf_counter()
+        _, stats = crawl_pages(crawl_urls, concurrency=pages, per_host=pages, politeness_delay=0.0,
+                               parse_in_processes=False, robots=cache)
+        crawl_elapsed = time.perf_counter() - started
+        requests_made = server.request_count
+
+    print(f"Regex per rule:   {len(paths) / naive_elapsed:12,.0f} URLs/s (extrapolated from {len(sample):,})")
+    print(f"Compiled matcher: {len(paths) / compiled_elapsed:12,.0f} URLs/s ({compiled_elapsed:.2f}s, "
+          f"{compiled.count(False):,} blocked, parse and compile included)")
+    print(f"Crawl: {stats['pages']} pages fetched, {stats['robots_blocked']} blocked by robots.txt, "
+          f"{requests_made} requests (robots.txt once) in {crawl_elapsed:.2f}s "
+          f"(Crawl-delay {robots.crawl_delay}s spaces the host's requests)")
+
+BENCHMARKS = {
+    'crawl': bench_crawl,
+    'sitemap': bench_sitemap,
+    'cache': bench_cache,
+    'extract': bench_extract,
+    'dedupe': bench_dedupe,
+    'linkgraph': bench_linkgraph,
+    'lighthouse': bench_lighthouse,
+    'history': bench_history,
+    'waterfall': bench_waterfall,
+    'thirdparty': bench_thirdparty,
+    'probe': bench_probe,
+    'load': bench_load,
+    'compression': bench_compression,
+    'psi': bench_psi,
+    'monitor': bench_monitor,
+    'fullanalysis': bench_fullanalysis,
+    'portfolio': bench_portfolio,
+    'dns': bench_dns,
+    'tls': bench_tls,
+    'robots': bench_robots,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
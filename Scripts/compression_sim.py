@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Compression and bundling transfer-size simulator
+
+Fetched HTML, CSS and JS bodies are compressed with gzip, brotli and zstd
+at several levels on a process pool, to show what each encoding would
+transfer compared with what the server sends today. Bundling is simulated
+by concatenating the files of one type into a few bundles and compressing
+those, which captures both the saved requests and the better compression
+of larger bodies. brotli and zstd come from the brotli and zstandard
+packages (in requirements.txt); a codec whose module is missing is listed
+in the report's ``missing_codecs`` and warned about. Sizes are memoized per content hash (optionally persisted in
+the results index), so a body shared by many pages or unchanged since
+the last run is never compressed twice.
+"""
+import argparse
+import json
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import numpy as np
+import requests
+
+from parser_backends import get_backend
+from results_index import content_hash
+from seo_analyzer import USER_AGENT
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_LEVELS = {'gzip': (1, 6, 9), 'brotli': (1, 5, 11), 'zstd': (3, 9, 19)}
+# Content-Encoding token -> (codec, level typical of server defaults)
+SERVED_ENCODINGS = {'gzip': ('gzip', 6), 'br': ('brotli', 5), 'zstd': ('zstd', 3)}
+# Request plus response headers of one extra HTTP/1.1 request; HTTP/2 header compression sends less
+REQUEST_OVERHEAD_BYTES = 500
+BUNDLE_SEPARATORS = {'script': b'\n;\n', 'stylesheet': b'\n'}
+
+def available_codecs():
+    codecs = {'gzip': CODEC_LEVELS['gzip']}
+    if brotli is not None:
+        codecs['brotli'] = CODEC_LEVELS['brotli']
+    if zstandard is not None:
+        codecs['zstd'] = CODEC_LEVELS['zstd']
+    return codecs
+
+def missing_codecs():
+    """Codecs that cannot be simulated because their module is not installed"""
+    return [codec for codec in CODEC_LEVELS if codec not in available_codecs()]
+
+def compressed_size(codec, level, data):
+    if codec == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return len(compressor.compress(data)) + len(compressor.flush())
+    if codec == 'brotli':
+        return len(brotli.compress(data, quality=level))
+    if codec == 'zstd':
+        return len(zstandard.ZstdCompressor(level=level).compress(data))
+    raise ValueError(f'Unknown codec: {codec}')
+
+def compressed_sizes(data, codecs):
+    """``{'identity': n, 'gzip-6': n, ...}`` for one body"""
+    sizes = {'identity': len(data)}
+    for codec, levels in codecs.items():
+        for level in levels:
+            sizes[f'{codec}-{level}'] = compressed_size(codec, level, data)
+    return sizes
+
+def _compressed_sizes_task(args):
+    return compressed_sizes(*args)
+
+def contiguous_partition(sizes, parts):
+    """Split consecutive items into ``parts`` groups of roughly equal total size; returns group ids"""
+    sizes = np.asarray(sizes, dtype=np.float64)
+    parts = max(1, min(parts, len(sizes)))
+    # An item joins the group its midpoint falls into, so order is kept and no group is empty
+    midpoints = np.cumsum(sizes) - sizes / 2
+    groups = np.floor(midpoints / sizes.sum() * parts).astype(np.int64) if sizes.sum() else np.arange(len(sizes))
+    groups = np.minimum(groups, parts - 1)
+    # Renumber so group ids are consecutive even if some boundary fell inside a huge file
+    return np.unique(groups, return_inverse=True)[1]
+
+class CompressionSimulator:
+    def __init__(self, codecs=None, workers=None, index=None):
+        self.codecs = codecs or available_codecs()
+        self.workers = workers
+        self.index = index
+        self._signature = json.dumps(self.codecs, sort_keys=True)
+        self._memo = {}
+        self.stats = {'bodies': 0, 'memoized': 0, 'compressed': 0}
+
+    def sizes(self, bodies):
+        """Compressed sizes of each body; identical bodies are compressed once"""
+        digests = [content_hash(body) for body in bodies]
+        self.stats['bodies'] += len(bodies)
+        pending = {}
+        for digest, body in zip(digests, bodies):
+            if digest in self._memo or digest in pending:
+                self.stats['memoized'] += 1
+                continue
+            stored = self.index.lookup(digest, f'compression:{self._signature}', digest) if self.index else None
+            if stored is not None:
+                self._memo[digest] = stored
+                self.stats['memoized'] += 1
+                continue
+            pending[digest] = body
+
+        tasks = [(body, self.codecs) for body in pending.values()]
+        if len(tasks) > 1:
+            from batch_analyze import available_cores
+
+            with ProcessPoolExecutor(max_workers=self.workers or available_cores()) as executor:
+                results = list(executor.map(_compressed_sizes_task, tasks))
+        else:
+            results = [compressed_sizes(*task) for task in tasks]
+        for digest, result in zip(pending, results):
+            self._memo[digest] = result
+            if self.index:
+                self.index.store(digest, f'compression:{self._signature}', digest, result)
+        self.stats['compressed'] += len(tasks)
+        return [self._memo[digest] for digest in digests]
+
+    def measure(self, assets):
+        """Add compressed sizes, the served size estimate and the best encoding to each asset"""
+        rows = []
+        for asset, sizes in zip(assets, self.sizes([asset['body'] for asset in assets])):
+            served = SERVED_ENCODINGS.get((asset.get('served_encoding') or '').lower())
+            served_key = f'{served[0]}-{served[1]}' if served else 'identity'
+            best = min(sizes, key=sizes.get)
+            row = {key: value for key, value in asset.items() if key != 'body'}
+            row.update({
+                'sizes': sizes,
+                'served_estimate': sizes.get(served_key),
+                'best': best,
+                'best_bytes': sizes[best],
+            })
+            if row['served_estimate'] is not None:
+                row['savings'] = row['served_estimate'] - sizes[best]
+            rows.append(row)
+        return rows
+
+    def simulate_bundling(self, assets, bundles=5, resource_type='script'):
+        """Concatenate consecutive assets of one type into ``bundles`` bundles and compare transfer"""
+        files = [asset for asset in assets if asset['type'] == resource_type]
+        if not files:
+            return None
+        groups = contiguous_partition([len(asset['body']) for asset in files], bundles)
+        separator = BUNDLE_SEPARATORS.get(resource_type, b'\n')
+        bundle_bodies = [separator.join(files[i]['body'] for i in np.flatnonzero(groups == group))
+                         for group in range(groups.max() + 1)]
+
+        separate = self.sizes([asset['body'] for asset in files])
+        bundled = self.sizes(bundle_bodies)
+        keys = list(separate[0])
+        separate_bytes = {key: sum(sizes[key] for sizes in separate) for key in keys}
+        bundled_bytes = {key: sum(sizes[key] for sizes in bundled) for key in keys}
+        saved_requests = len(files) - len(bundle_bodies)
+        return {
+            'type': resource_type,
+            'files': len(files),
+            'bundles': len(bundle_bodies),
+            'saved_requests': saved_requests,
+            'separate_bytes': separate_bytes,
+            'bundled_bytes': bundled_bytes,
+            'saved_bytes': {key: separate_bytes[key] - bundled_bytes[key] + saved_requests * REQUEST_OVERHEAD_BYTES
+                            for key in keys},
+        }
+
+    def report(self, assets, bundles=5):
+        started = time.perf_counter()
+        rows = self.measure(assets)
+        rows.sort(key=lambda row: row['sizes']['identity'], reverse=True)
+        keys = list(rows[0]['sizes']) if rows else []
+        totals = {key: sum(row['sizes'][key] for row in rows) for key in keys}
+        served = sum(row['served_estimate'] or 0 for row in rows)
+        best = sum(row['best_bytes'] for row in rows)
+        return {
+            'assets': len(rows),
+            'codecs': self.codecs,
+            'missing_codecs': missing_codecs(),
+            'totals': totals,
+            'served_estimate': served,
+            'best_total': best,
+            'compression_savings': served - best,
+            'bundling': [result for result in (self.simulate_bundling(assets, bundles, resource_type)
+                                               for resource_type in BUNDLE_SEPARATORS) if result],
+            'by_asset': rows,
+            'elapsed': round(time.perf_counter() - started, 3),
+            'stats': dict(self.stats)
+        }
+
+def _fetch_asset(session, url, resource_type, timeout):
+    try:
+        response = session.get(url, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return {'url': url, 'type': resource_type, 'error': str(e)}
+    if response.status_code != 200:
+        return {'url': url, 'type': resource_type, 'error': f'HTTP {response.status_code}'}
+    return {'url': url, 'type': resource_type, 'body': response.content,
+            'served_encoding': response.headers.get('Content-Encoding')}
+
+def fetch_assets(html, base_url, parser=None, session=None, concurrency=8, timeout=30):
+    """The page itself plus its external scripts and stylesheets as asset dicts (and fetch errors)"""
+    features = get_backend(parser).extract(html)
+    targets = [(urljoin(base_url, src), 'script') for src in features.script_urls]
+    targets += [(urljoin(base_url, href), 'stylesheet') for href in features.stylesheet_urls]
+    targets = [target for target in dict.fromkeys(targets) if urlsplit(target[0]).scheme in ('http', 'https')]
+
+    session = session or requests.Session()
+    session.headers.setdefault('User-Agent', USER_AGENT)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        fetched = list(executor.map(lambda target: _fetch_asset(session, *target, timeout), targets))
+
+    body = html.encode('utf-8') if isinstance(html, str) else html
+    assets = [{'url': base_url, 'type': 'document', 'body': body}]
+    assets += [asset for asset in fetched if 'error' not in asset]
+    return assets, [asset for asset in fetched if 'error' in asset]
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Simulate compression and bundling savings')
+    arg_parser.add_argument('html', nargs='?', default='homepage_raw.html')
+    arg_parser.add_argument('--base-url', default='https://www.tln-werbemittel.de/')
+    arg_parser.add_argument('--bundles', type=int, default=5)
+    arg_parser.add_argument('--no-fetch', action='store_true', help='only simulate the HTML document')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    args = arg_parser.parse_args()
+
+    with open(args.html, 'rb') as f:
+        html = f.read()
+    if args.no_fetch:
+        assets, errors = [{'url': args.base_url, 'type': 'document', 'body': html}], []
+    else:
+        assets, errors = fetch_assets(html, args.base_url)
+
+    simulator = CompressionSimulator(workers=args.workers)
+    report = simulator.report(assets, args.bundles)
+    report['fetch_errors'] = errors
+    with open('compression_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if report['missing_codecs']:
+        print(f"WARNING: {', '.join(report['missing_codecs'])} not simulated; "
+              f"pip install brotli zstandard (see requirements.txt)", file=sys.stderr)
+    print(f"Compressed {report['assets']} bodies with {', '.join(simulator.codecs)} in {report['elapsed']:.2f}s "
+          f"({len(errors)} assets could not be fetched)", file=sys.stderr)
+    best_keys = [f'{codec}-{levels[-1]}' for codec, levels in simulator.codecs.items()]
+    print(f"\n{'KB raw':>8} {'served':>8} " + ' '.join(f'{key:>10}' for key in best_keys) + '  asset')
+    for row in report['by_asset'][:15]:
+        sizes = row['sizes']
+        served = f"{row['served_estimate'] / 1024:8.1f}" if row['served_estimate'] is not None else f"{'?':>8}"
+        print(f"{sizes['identity'] / 1024:8.1f} {served} "
+              + ' '.join(f"{sizes[key] / 1024:10.1f}" for key in best_keys) + f"  {row['url'][:70]}")
+    print(f"\nServed (estimated): {report['served_estimate'] / 1024:.0f} KB, best encoding: "
+          f"{report['best_total'] / 1024:.0f} KB (saves {report['compression_savings'] / 1024:.0f} KB)")
+    for bundling in report['bundling']:
+        key = best_keys[0]
+        print(f"Bundling {bundling['files']} {bundling['type']} files into {bundling['bundles']}: "
+              f"{bundling['saved_requests']} fewer requests, {bundling['saved_bytes'][key] / 1024:.1f} KB less with {key}")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Asyncio crawl engine producing the same per-page dicts as SEOAnalyzer.analyze_page"""
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from near_duplicates import MinHasher
+from results_index import content_hash
+from seo_analyzer import USER_AGENT, extract_page_metrics, summarize_response
+
+def _fetch(session, url, timeout):
+    """Blocking fetch, run on the I/O thread pool"""
+    response = session.get(url, timeout=timeout)
+    return summarize_response(url, response), response.text, content_hash(response.content)
+
+def _parse_page(url, host, html, parser, collect_links):
+    """Parse on the worker pool; returns (metrics, {'internal': [...], 'external': [...]} or None)"""
+    if not collect_links:
+        return extract_page_metrics(url, host, html, parser), None
+    links = {'internal': [], 'external': []}
+    return extract_page_metrics(url, host, html, parser, links['internal'], links['external']), links
+
+def _text_signature(hasher, html):
+    return hasher.html_signature(html)
+
+class AsyncCrawler:
+    """Crawl a URL frontier concurrently with global and per-host limits
+
+    Fetching runs on a thread pool sized to ``concurrency`` so the event loop
+    only schedules work; HTML parsing is handed to a separate worker pool
+    (processes by default) so BeautifulSoup never blocks the loop.
+    """
+
+    def __init__(self, concurrency=16, per_host=4, host_budget=None, politeness_delay=0.1,
+                 timeout=10, parse_workers=None, parse_in_processes=True, session=None, parser=None,
+                 results_index=None, dedupe_index=None, hasher=None, link_graph=None, link_targets=None,
+                 robots=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_budget = host_budget
+        self.politeness_delay = politeness_delay
+        self.timeout = timeout
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.parse_in_processes = parse_in_processes
+        self.session = session or self._make_session()
+        self.parser = parser
+        self.results_index = results_index
+        # Optional LSHIndex collecting MinHash fingerprints of every page
+        self.dedupe_index = dedupe_index
+        self.hasher = hasher or (MinHasher(dedupe_index.num_perm) if dedupe_index is not None else None)
+        # Optional LinkGraphBuilder receiving every page's internal links
+        self.link_graph = link_graph
+        # Optional LinkTargets collecting every internal and external href for validation
+        self.link_targets = link_targets
+        # Optional RobotsCache: disallowed URLs are skipped and Crawl-delay spaces the host's requests
+        self.robots = robots
+        self.stats = {}
+
+    def _make_session(self):
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    async def _wait_for_host_slot(self, host, crawl_delay=None):
+        # Space out request starts per host; no await between read and write
+        now = time.monotonic()
+        start_at = max(now, self._next_start[host])
+        self._next_start[host] = start_at + max(self.politeness_delay, crawl_delay or 0.0)
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def _crawl_one(self, url):
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc
+
+        crawl_delay = None
+        if self.robots is not None:
+            # Fetched once per host and TTL; later URLs of the host hit the compiled rules
+            robots = await loop.run_in_executor(self._io_pool, self.robots.get, url)
+            if not robots.allowed(url):
+                self.stats['robots_blocked'] += 1
+                return {'url': url, 'error': 'blocked by robots.txt'}
+            crawl_delay = robots.crawl_delay
+
+        self._host_requests[host] += 1
+        if self.host_budget is not None and self._host_requests[host] > self.host_budget:
+            self.stats['budget_skipped'] += 1
+            return {'url': url, 'error': f'request budget of {self.host_budget} exhausted for {host}'}
+
+        try:
+            async with self._host_limits[host]:
+                await self._wait_for_host_slot(host, crawl_delay)
+                async with self._global_limit:
+                    summary, html, digest = await loop.run_in_executor(
+                        self._io_pool, _fetch, self.session, url, self.timeout
+                    )
+            kind = f'page:{host}'
+            collect_links = self.link_graph is not None or self.link_targets is not None
+            metrics = links = None
+            if self.results_index:
+                metrics = self.results_index.lookup(url, kind, digest)
+                if metrics is not None and collect_links:
+                    links = self.results_index.lookup(url, f'links:{host}', digest)
+            if metrics is not None and (links is not None or not collect_links):
+                self.stats['reused'] += 1
+            else:
+                metrics, links = await loop.run_in_executor(
+                    self._parse_pool, _parse_page, url, host, html, self.parser, collect_links
+                )
+                if self.results_index:
+                    self.results_index.store(url, kind, digest, metrics)
+                    if collect_links:
+                        self.results_index.store(url, f'links:{host}', digest, links)
+            if self.link_graph is not None:
+                self.link_graph.add_page(url, links['internal'])
+            if self.link_targets is not None:
+                self.link_targets.add_page(url, links['internal'] + links['external'])
+            if self.dedupe_index is not None:
+                hasher = self.hasher
+                # Signatures depend on the hasher's parameters, so they are part of the kind; a hasher
+                # without a fixed seed draws new permutations each run, so nothing can be reused
+                signature_index = self.results_index if isinstance(hasher.seed, int) else None
+                signature_kind = f'minhash:{hasher.num_perm}:{hasher.shingle_size}:{hasher.seed}:{host}'
+                stored = signature_index.lookup(url, signature_kind, digest) if signature_index else None
+                if stored is None:
+                    signature = await loop.run_in_executor(self._parse_pool, _text_signature, hasher, html)
+                    if signature_index:
+                        # A page without words is stored as an empty list
+                        signature_index.store(url, signature_kind, digest,
+                                              [] if signature is None else signature.tolist())
+                else:
+                    signature = np.array(stored, dtype=np.uint64) if stored else None
+                self.dedupe_index.add(url, signature)
+        except Exception as e:
+            self.stats['errors'] += 1
+            return {'url': url, 'error': str(e)}
+
+        summary.update(metrics)
+        self.stats['pages'] += 1
+        return summary
+
+    async def _run_task(self, index, url, results, on_result, inflight):
+        try:
+            result = await self._crawl_one(url)
+            results[index] = result
+            if on_result:
+                on_result(result)
+        finally:
+            inflight.release()
+
+    async def crawl(self, urls, on_result=None):
+        """Crawl ``urls`` (any iterable, consumed lazily) and return results in input order"""
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        self._host_requests = defaultdict(int)
+        self._next_start = defaultdict(float)
+        self.stats = {'pages': 0, 'errors': 0, 'budget_skipped': 0, 'robots_blocked': 0, 'reused': 0}
+
+        # Bound the number of scheduled tasks so a huge frontier is never materialized
+        inflight = asyncio.Semaphore(self.concurrency * 4)
+        results = {}
+        tasks = set()
+
+        executor_cls = ProcessPoolExecutor if self.parse_in_processes else ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        frontier = iter(urls)
+        done = object()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as self._io_pool, \
+                ThreadPoolExecutor(max_workers=1) as frontier_pool, \
+                executor_cls(max_workers=self.parse_workers) as self._parse_pool:
+            index = 0
+            while True:
+                await inflight.acquire()
+                # Lazy frontiers such as sitemap streams may block on the network
+                url = await loop.run_in_executor(frontier_pool, next, frontier, done)
+                if url is done:
+                    inflight.release()
+                    break
+                task = asyncio.create_task(self._run_task(index, url, results, on_result, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        elapsed = time.perf_counter() - started
+        self.stats['elapsed'] = elapsed
+        self.stats['pages_per_second'] = len(results) / elapsed if elapsed else 0.0
+        return [results[i] for i in range(len(results))]
+
+def crawl_pages(urls, on_result=None, **options):
+    """Synchronous entry point: crawl ``urls`` and return (results, stats)"""
+    crawler = AsyncCrawler(**options)
+    results = asyncio.run(crawler.crawl(urls, on_result=on_result))
+    return results, crawler.stats
+
+if __name__ == "__main__":
+    domain = "www.tln-werbemittel.de"
+    urls = [
+        f"https://{domain}/",
+        f"https://{domain}/impressum",
+        f"https://{domain}/datenschutz",
+        f"https://{domain}/kontakt"
+    ]
+
+    results, stats = crawl_pages(urls, concurrency=4, per_host=2, politeness_delay=0.5)
+
+    with open('crawl_results.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"Crawled {stats['pages']} pages ({stats['errors']} errors) "
+          f"in {stats['elapsed']:.2f}s - {stats['pages_per_second']:.1f} pages/s")
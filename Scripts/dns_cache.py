@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""TTL-honouring DNS cache with a batched async resolver
+
+CachingResolver answers A/MX/TXT/... lookups from one thread-safe cache
+that keeps each answer for its record TTL and NXDOMAIN/empty answers for
+the negative TTL of the zone's SOA. ``resolve_many`` queries every record
+type of many domains concurrently on asyncio, and identical lookups in
+flight at the same time share one query. ``install_resolver`` makes a
+requests session connect through the same cache, so a host is resolved
+once per TTL across check_dns, page fetches and a whole crawl.
+"""
+import argparse
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+
+import dns.asyncresolver
+import dns.exception
+import dns.rdatatype
+import dns.resolver
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError
+
+# Failures that say something about the name and are cached; timeouts and SERVFAIL are not
+NEGATIVE = {'NXDOMAIN', 'NoAnswer'}
+DEFAULT_RECORD_TYPES = ('A', 'MX', 'TXT')
+
+def is_ip_address(host):
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return False
+    return True
+
+class LookupResult:
+    """Records of one (name, type) lookup, or the reason there are none"""
+    __slots__ = ('records', 'error', 'ttl')
+
+    def __init__(self, records=(), error=None, ttl=0):
+        self.records = tuple(records)
+        self.error = error
+        self.ttl = ttl
+
+    def __repr__(self):
+        return f'LookupResult({len(self.records)} records, error={self.error!r}, ttl={self.ttl})'
+
+class CachingResolver:
+    def __init__(self, nameservers=None, port=53, timeout=5.0, concurrency=64, negative_ttl=300,
+                 min_ttl=0, max_ttl=86400):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        # Used when a negative answer carries no SOA
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self._sync = self._configure(dns.resolver.Resolver, nameservers, port)
+        self._async = self._configure(dns.asyncresolver.Resolver, nameservers, port)
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {'lookups': 0, 'hits': 0, 'negative_hits': 0, 'queries': 0, 'errors': 0}
+
+    def _configure(self, resolver_class, nameservers, port):
+        try:
+            resolver = resolver_class(configure=nameservers is None)
+        except dns.resolver.NoResolverConfiguration:
+            # No /etc/resolv.conf: DNS lookups fail and addresses come from the system resolver
+            resolver = resolver_class(configure=False)
+            nameservers = []
+        if nameservers is not None:
+            resolver.nameservers = list(nameservers)
+            resolver.port = port
+        resolver.lifetime = self.timeout
+        # Answers are cached here, for both the sync and async paths
+        resolver.cache = None
+        return resolver
+
+    def _cached(self, key):
+        with self._lock:
+            self.stats['lookups'] += 1
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, result = entry
+            if expires <= time.monotonic():
+                del self._cache[key]
+                return None
+            self.stats['hits'] += 1
+            self.stats['negative_hits'] += result.error is not None
+            return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self.stats['queries'] += 1
+            if result.error is not None and result.error not in NEGATIVE:
+                self.stats['errors'] += 1
+                return
+            ttl = min(max(result.ttl, self.min_ttl), self.max_ttl)
+            if ttl > 0:
+                self._cache[key] = (time.monotonic() + ttl, result)
+
+    def _negative_ttl(self, response):
+        for rrset in response.authority if response is not None else ():
+            if rrset.rdtype == dns.rdatatype.SOA:
+                # RFC 2308: the smaller of the SOA's own TTL and its minimum field
+                return min(rrset.ttl, rrset[0].minimum)
+        return self.negative_ttl
+
+    def _failure(self, error):
+        if isinstance(error, dns.resolver.NXDOMAIN):
+            responses = list(error.responses().values())
+            return LookupResult(error='NXDOMAIN', ttl=self._negative_ttl(responses[0] if responses else None))
+        if isinstance(error, dns.resolver.NoAnswer):
+            return LookupResult(error='NoAnswer', ttl=self._negative_ttl(error.response()))
+        return LookupResult(error=type(error).__name__)
+
+    def resolve(self, name, record_type='A'):
+        """Blocking lookup through the cache; safe to call from any thread"""
+        key = (name.rstrip('.').lower(), record_type)
+        result = self._cached(key)
+        if result is None:
+            try:
+                answer = self._sync.resolve(name, record_type, search=False)
+            except dns.exception.DNSException as e:
+                result = self._failure(e)
+            else:
+                result = LookupResult(answer.rrset, ttl=answer.rrset.ttl)
+            self._store(key, result)
+        return result
+
+    async def _query_async(self, key, name, record_type):
+        try:
+            answer = await self._async.resolve(name, record_type, search=False)
+        except dns.exception.DNSException as e:
+            result = self._failure(e)
+        else:
+            result = LookupResult(answer.rrset, ttl=answer.rrset.ttl)
+        self._store(key, result)
+        return result
+
+    async def resolve_async(self, name, record_type='A'):
+        key = (name.rstrip('.').lower(), record_type)
+        result = self._cached(key)
+        if result is not None:
+            return result
+        # Concurrent lookups of the same name and type on one event loop share one query
+        flight = (asyncio.get_running_loop(), key)
+        pending = self._in_flight.get(flight)
+        if pending is None:
+            pending = self._in_flight[flight] = asyncio.ensure_future(self._query_async(key, name, record_type))
+            pending.add_done_callback(lambda _: self._in_flight.pop(flight, None))
+        return await asyncio.shield(pending)
+
+    async def resolve_many_async(self, names, record_types=DEFAULT_RECORD_TYPES):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(name, record_type):
+            async with semaphore:
+                return await self.resolve_async(name, record_type)
+
+        pairs = [(name, record_type) for name in dict.fromkeys(names) for record_type in record_types]
+        results = await asyncio.gather(*(lookup(*pair) for pair in pairs))
+        by_name = {}
+        for (name, record_type), result in zip(pairs, results):
+            by_name.setdefault(name, {})[record_type] = result
+        return by_name
+
+    def resolve_many(self, names, record_types=DEFAULT_RECORD_TYPES):
+        """``{name: {type: LookupResult}}`` for every name and record type, queried concurrently"""
+        return asyncio.run(self.resolve_many_async(names, record_types))
+
+    def address(self, host, port=None):
+        """First IPv4 (else IPv6) address of ``host``; raises socket.gaierror like getaddrinfo
+
+        Names DNS does not know (localhost, /etc/hosts entries) fall back to the
+        system resolver.
+        """
+        host = host.strip('[]')
+        if is_ip_address(host):
+            return host
+        for record_type in ('A', 'AAAA'):
+            result = self.resolve(host, record_type)
+            if result.records:
+                return result.records[0].to_text()
+            if result.error == 'NXDOMAIN':
+                break
+        return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+
+def dns_records(results):
+    """check_dns-style dict from the A/MX/TXT results of one name"""
+    a_records = results['A']
+    if a_records.error is not None:
+        return {'error': a_records.error}
+    return {
+        'a_records': [record.to_text() for record in a_records.records],
+        'mx_records': [str(record.exchange) for record in results['MX'].records],
+        'txt_records': [record.to_text() for record in results['TXT'].records]
+    }
+
+class _ResolvingConnection:
+    resolver = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            address = self.resolver.address(host.rstrip('.'), self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        # Only the socket connects to the cached address; SNI, certificate checks
+        # and the Host header keep using the hostname
+        self._dns_host = address
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+def install_resolver(session, resolver):
+    """Make the adapters mounted on ``session`` resolve hosts through ``resolver``
+
+    Works with any HTTPAdapter (including the HTTP cache's); install before the
+    session opens connections.
+    """
+    http_connection = type('ResolvingHTTPConnection', (_ResolvingConnection, HTTPConnection), {'resolver': resolver})
+    https_connection = type('ResolvingHTTPSConnection', (_ResolvingConnection, HTTPSConnection), {'resolver': resolver})
+    pool_classes = {
+        'http': type('ResolvingHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+        'https': type('ResolvingHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+    }
+    for adapter in set(session.adapters.values()):
+        adapter.poolmanager.pool_classes_by_scheme = pool_classes
+        adapter.poolmanager.clear()
+    return resolver
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Resolve record types of many domains concurrently')
+    arg_parser.add_argument('domains', nargs='*', default=['tln-werbemittel.de'])
+    arg_parser.add_argument('--types', default=','.join(DEFAULT_RECORD_TYPES))
+    arg_parser.add_argument('--nameserver', action='append', default=None)
+    args = arg_parser.parse_args()
+
+    resolver = CachingResolver(nameservers=args.nameserver)
+    started = time.perf_counter()
+    results = resolver.resolve_many(args.domains, args.types.split(','))
+    elapsed = time.perf_counter() - started
+    for domain, by_type in results.items():
+        print(domain)
+        for record_type, result in by_type.items():
+            values = ', '.join(record.to_text() for record in result.records) or result.error
+            print(f"  {record_type:5} ttl {result.ttl:>6}  {values}")
+    print(f"\n{len(results)} domains in {elapsed:.2f}s: {resolver.stats}")
@@ -3,7 +3,9 @@ import requests
 from bs4 import BeautifulSoup
 import json
 
-def fetch_and_analyze(url):
+from http_cache import DEFAULT_CACHE_DIR, install_cache
+
+def fetch_and_analyze(url, cache_dir=DEFAULT_CACHE_DIR):
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -14,9 +16,12 @@ def fetch_and_analyze(url):
     }
 
     session = requests.Session()
+    cache = install_cache(session, cache_dir) if cache_dir else None
     response = session.get(url, headers=headers, timeout=30)
 
     print(f"Status Code: {response.status_code}")
+    if cache:
+        print(f"Cache: {response.cache_status}")
     print(f"Response Headers: {dict(response.headers)}")
     print(f"Cookies: {session.cookies.get_dict()}")
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Mergeable log-bucketed latency histogram
+
+Bucket boundaries are fixed by the layout (lowest value, highest value and
+buckets per decade), not by the data, so histograms recorded by different
+threads, processes or runs combine by adding their counts. Percentiles are
+accurate to the bucket width (about 2.3% with the default 100 buckets per
+decade); count, sum, min and max are exact.
+"""
+import numpy as np
+
+class LatencyHistogram:
+    def __init__(self, lowest=0.01, highest=600000.0, buckets_per_decade=100):
+        self.lowest = lowest
+        self.highest = highest
+        self.buckets_per_decade = buckets_per_decade
+        decades = np.log10(highest / lowest)
+        # Bucket 0 holds values below ``lowest``; the last one values above ``highest``
+        self.buckets = int(np.ceil(decades * buckets_per_decade)) + 2
+        self.counts = np.zeros(self.buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    @property
+    def layout(self):
+        return (self.lowest, self.highest, self.buckets_per_decade)
+
+    def _bucket(self, values):
+        scaled = np.log10(np.maximum(values, self.lowest) / self.lowest) * self.buckets_per_decade
+        return np.clip(np.floor(scaled).astype(np.int64) + 1, 0, self.buckets - 1) * (values >= self.lowest)
+
+    def record(self, value):
+        self.record_many([value])
+
+    def record_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.counts += np.bincount(self._bucket(values), minlength=self.buckets)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        """Add another histogram's counts into this one (layouts must match)"""
+        if other.layout != self.layout:
+            raise ValueError(f'Histogram layouts differ: {self.layout} vs {other.layout}')
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _bucket_value(self, index):
+        # Geometric middle of the bucket, clamped to the exact extremes seen
+        if index == 0:
+            return self.min
+        value = self.lowest * 10 ** ((index - 0.5) / self.buckets_per_decade)
+        return min(max(value, self.min), self.max)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = max(int(np.ceil(q / 100 * self.count)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return self._bucket_value(index)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, percentiles=(50, 90, 99), digits=2):
+        if not self.count:
+            return {'count': 0}
+        summary = {'count': self.count, 'mean': round(self.mean, digits),
+                   'min': round(self.min, digits), 'max': round(self.max, digits)}
+        for q in percentiles:
+            summary[f'p{q:g}'] = round(self.percentile(q), digits)
+        return summary
+
+    def to_dict(self):
+        """Sparse JSON-serializable form"""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            'layout': list(self.layout),
+            'buckets': dict(zip(map(str, nonzero.tolist()), self.counts[nonzero].tolist())),
+            'count': self.count, 'total': self.total,
+            'min': self.min if self.count else None, 'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(*data['layout'])
+        for index, count in data['buckets'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        if data['count']:
+            histogram.min, histogram.max = data['min'], data['max']
+        return histogram
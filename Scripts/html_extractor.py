@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Single-pass HTML feature extraction
+
+``HTMLFeatureExtractor`` is a tag-dispatch visitor: it receives
+``start``/``end``/``data`` events and gathers every metric written to
+html_analysis.json (``result``) and by SEOAnalyzer.analyze_page
+(``page_metrics``) while the document is traversed exactly once. The events
+can come from a BeautifulSoup tree (``walk_soup``) or straight from lxml's
+parser target interface.
+"""
+import json
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import CData, NavigableString, Script, Stylesheet, TemplateString
+from bs4.element import RubyParenthesisString, RubyTextString, Tag
+
+SITE_DOMAIN = 'tln-werbemittel.de'
+
+# Text inside these elements is not part of the visible page text
+# (mirrors BeautifulSoup's string containers, which get_text() skips)
+STRING_CONTAINERS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+HEADINGS = ('h1', 'h2', 'h3', 'h4')
+FIRST_META = ('description', 'keywords', 'viewport')
+
+def sink_links(url, domain, hrefs, link_sink=None, external_sink=None):
+    """Resolve every href against ``url`` and collect the HTTP(S) targets
+
+    Targets on ``domain`` go to ``link_sink`` and all others to
+    ``external_sink``. Unlike the link counts, document-relative hrefs
+    (``c.html``, ``../x``) are included; only same-page fragments and
+    non-HTTP links (mailto:, tel:, javascript:) and malformed hrefs are
+    skipped.
+    """
+    if link_sink is None and external_sink is None:
+        return
+    for href in hrefs:
+        href = href.strip()
+        if not href or href.startswith('#'):
+            continue
+        try:
+            target = urljoin(url, href)
+            parts = urlsplit(target)
+        except ValueError:
+            # Malformed hrefs such as 'http://[broken/' are skipped, as the link counts do
+            continue
+        if parts.scheme not in ('http', 'https'):
+            continue
+        sink = link_sink if domain in parts.netloc else external_sink
+        if sink is not None:
+            sink.append(target)
+
+def parse_srcset(srcset):
+    """Candidate URLs of a srcset attribute, without their width/density descriptors"""
+    return [part.split()[0] for part in srcset.split(',') if part.strip()]
+
+class HTMLFeatureExtractor:
+    def __init__(self, site_domain=SITE_DOMAIN, keep_text=False):
+        self.site_domain = site_domain
+        self.keep_text = keep_text
+        self.text_parts = []
+        self._start_handlers = {
+            'title': self._start_title,
+            'meta': self._start_meta,
+            'img': self._start_img,
+            'a': self._start_a,
+            'link': self._start_link,
+            'html': self._start_html,
+            'script': self._start_script,
+            'form': self._start_form,
+        }
+        for heading in HEADINGS:
+            self._start_handlers[heading] = self._start_heading
+        self._end_handlers = {
+            'title': self._end_capture,
+            'script': self._end_script,
+        }
+        for heading in HEADINGS:
+            self._end_handlers[heading] = self._end_capture
+
+        self._containers = []
+        self._captures = []
+        self._last_char_was_word = False
+
+        self.title = None
+        self.meta_tags = {}
+        self.headings = {heading: [] for heading in HEADINGS}
+        self.total_images = 0
+        self.images_without_alt = 0
+        self.images_without_title = 0
+        self.image_urls = []
+        self.script_urls = []
+        self.stylesheet_urls = []
+        self.total_links = 0
+        self.internal_links = 0
+        self.external_links = 0
+        self.nofollow_links = 0
+        self.hrefs = []
+        self.canonical_url = None
+        self._canonical_seen = False
+        self.language = None
+        self._html_seen = False
+        self.schema_scripts = []
+        self.open_graph = {}
+        self.first_meta = {}
+        self.twitter_card = {}
+        self.total_forms = 0
+        self.total_scripts = 0
+        self.inline_scripts = 0
+        self.external_scripts = 0
+        self.total_stylesheets = 0
+        self.has_favicon = False
+        self.word_count = 0
+
+    # Event interface (also the lxml parser target interface)
+
+    def start(self, tag, attrib):
+        handler = self._start_handlers.get(tag)
+        if handler:
+            handler(tag, attrib)
+        if tag in STRING_CONTAINERS:
+            self._containers.append(tag)
+
+    def end(self, tag):
+        if self._containers and self._containers[-1] == tag:
+            self._containers.pop()
+        handler = self._end_handlers.get(tag)
+        if handler:
+            handler(tag)
+
+    def data(self, text):
+        if self._containers:
+            if self._containers[-1] == 'script' and self._captures:
+                # Only the raw script body is captured while inside <script>
+                capture = self._captures[-1]
+                if capture[0] == 'script':
+                    capture[1].append(text)
+            return
+        for capture in self._captures:
+            capture[1].append(text)
+        if self.keep_text:
+            self.text_parts.append(text)
+        self._count_words(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self
+
+    # Handlers
+
+    def _start_title(self, tag, attrib):
+        if self.title is None:
+            self._captures.append(['title', []])
+
+    def _start_heading(self, tag, attrib):
+        self._captures.append([tag, []])
+
+    def _end_capture(self, tag):
+        for index in range(len(self._captures) - 1, -1, -1):
+            if self._captures[index][0] == tag:
+                name, parts = self._captures.pop(index)
+                text = ''.join(parts)
+                if name == 'title':
+                    self.title = text
+                else:
+                    self.headings[name].append(text.strip())
+                return
+
+    def _start_meta(self, tag, attrib):
+        content = attrib.get('content', '')
+        name = attrib.get('name')
+        prop = attrib.get('property')
+        if name:
+            self.meta_tags[name] = content
+        elif prop:
+            self.meta_tags[prop] = content
+        elif attrib.get('http-equiv'):
+            self.meta_tags[attrib['http-equiv']] = content
+
+        if prop is not None and prop.startswith('og:'):
+            self.open_graph[prop] = attrib.get('content')
+        if name is not None:
+            if name.startswith('twitter:'):
+                self.twitter_card[name] = content
+            if name in FIRST_META and name not in self.first_meta:
+                self.first_meta[name] = attrib
+
+    def _start_img(self, tag, attrib):
+        self.total_images += 1
+        src = attrib.get('src')
+        if src:
+            self.image_urls.append(src)
+        srcset = attrib.get('srcset')
+        if srcset:
+            self.image_urls.extend(parse_srcset(srcset))
+        if not attrib.get('alt'):
+            self.images_without_alt += 1
+        if not attrib.get('title'):
+            self.images_without_title += 1
+
+    def _start_a(self, tag, attrib):
+        href = attrib.get('href')
+        if href is None:
+            return
+        self.total_links += 1
+        self.hrefs.append(href)
+        if not href.startswith('http') or self.site_domain in href:
+            self.internal_links += 1
+        else:
+            self.external_links += 1
+        if 'nofollow' in attrib.get('rel', '').split():
+            self.nofollow_links += 1
+
+    def _start_link(self, tag, attrib):
+        rel = attrib.get('rel')
+        if rel is None:
+            return
+        tokens = rel.split()
+        if not self._canonical_seen and 'canonical' in tokens:
+            self._canonical_seen = True
+            self.canonical_url = attrib.get('href')
+        if 'stylesheet' in tokens:
+            self.total_stylesheets += 1
+            if attrib.get('href'):
+                self.stylesheet_urls.append(attrib['href'])
+        if not self.has_favicon and any('icon' in token for token in tokens):
+            self.has_favicon = True
+
+    def _start_html(self, tag, attrib):
+        if not self._html_seen:
+            self._html_seen = True
+            self.language = attrib.get('lang')
+
+    def _start_script(self, tag, attrib):
+        self.total_scripts += 1
+        if attrib.get('src'):
+            self.external_scripts += 1
+            self.script_urls.append(attrib['src'])
+        else:
+            self.inline_scripts += 1
+        if attrib.get('type') == 'application/ld+json':
+            self._captures.append(['script', []])
+
+    def _end_script(self, tag):
+        if self._captures and self._captures[-1][0] == 'script':
+            self.schema_scripts.append(''.join(self._captures.pop()[1]) or None)
+
+    def _start_form(self, tag, attrib):
+        self.total_forms += 1
+
+    def _count_words(self, text):
+        # Equivalent to len(''.join(all_text).split()) computed incrementally
+        if not text:
+            return
+        words = len(text.split())
+        if words and self._last_char_was_word and not text[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._last_char_was_word = not text[-1].isspace()
+
+    def visible_text(self):
+        """The page text as soup.get_text() sees it, up to whitespace runs (requires keep_text)"""
+        return ''.join(self.text_parts)
+
+    def _first_meta_content(self, name):
+        meta = self.first_meta.get(name)
+        return meta.get('content') if meta is not None else None
+
+    def result(self):
+        """Metrics in the html_analysis.json layout"""
+        title = self.title.strip() if self.title is not None else None
+        analysis = {}
+        analysis['title'] = title
+        analysis['title_length'] = len(title) if title else 0
+        analysis['meta_tags'] = self.meta_tags
+        analysis['h1'] = self.headings['h1']
+        analysis['h2'] = self.headings['h2']
+        analysis['h3'] = self.headings['h3']
+        analysis['h4'] = self.headings['h4']
+        analysis['total_images'] = self.total_images
+        analysis['images_without_alt'] = self.images_without_alt
+        analysis['images_without_title'] = self.images_without_title
+        analysis['total_links'] = self.total_links
+        analysis['internal_links'] = self.internal_links
+        analysis['external_links'] = self.external_links
+        analysis['nofollow_links'] = self.nofollow_links
+        analysis['canonical_url'] = self.canonical_url
+        analysis['language'] = self.language
+        analysis['schema_markup_count'] = len(self.schema_scripts)
+        if self.schema_scripts:
+            analysis['schema_types'] = []
+            for script in self.schema_scripts:
+                try:
+                    schema_data = json.loads(script)
+                    if '@type' in schema_data:
+                        analysis['schema_types'].append(schema_data['@type'])
+                except:
+                    pass
+        analysis['open_graph'] = {prop: content or '' for prop, content in self.open_graph.items()}
+        analysis['twitter_card'] = self.twitter_card
+        analysis['total_forms'] = self.total_forms
+        analysis['total_scripts'] = self.total_scripts
+        analysis['inline_scripts'] = self.inline_scripts
+        analysis['external_scripts'] = self.external_scripts
+        analysis['total_stylesheets'] = self.total_stylesheets
+        analysis['has_viewport'] = 'viewport' in self.first_meta
+        analysis['viewport_content'] = self._first_meta_content('viewport')
+        analysis['has_favicon'] = self.has_favicon
+        analysis['word_count'] = self.word_count
+        return analysis
+
+    def page_metrics(self, url, domain, link_sink=None, external_sink=None):
+        """Metrics in the SEOAnalyzer.analyze_page layout
+
+        Every link target, resolved against ``url``, is appended to ``link_sink``
+        (internal) or ``external_sink`` (external) when given; see sink_links.
+        """
+        internal_links = []
+        external_links = []
+        for href in self.hrefs:
+            if href.startswith('http'):
+                if domain in href:
+                    internal_links.append(href)
+                else:
+                    external_links.append(href)
+            elif href.startswith('/'):
+                internal_links.append(urljoin(url, href))
+
+        analysis = {}
+        analysis['title'] = self.title
+        analysis['title_length'] = len(self.title) if self.title else 0
+        analysis['meta_description'] = self._first_meta_content('description')
+        analysis['meta_description_length'] = len(analysis['meta_description']) if analysis['meta_description'] else 0
+        analysis['meta_keywords'] = self._first_meta_content('keywords')
+        analysis['canonical_url'] = self.canonical_url
+        analysis['language'] = self.language
+        analysis['h1_tags'] = self.headings['h1']
+        analysis['h2_tags'] = self.headings['h2']
+        analysis['h3_tags'] = self.headings['h3']
+        analysis['total_images'] = self.total_images
+        analysis['images_without_alt'] = self.images_without_alt
+        analysis['internal_links'] = len(internal_links)
+        sink_links(url, domain, self.hrefs, link_sink, external_sink)
+        analysis['external_links'] = len(external_links)
+        analysis['total_links'] = self.total_links
+        analysis['open_graph_tags'] = dict(self.open_graph)
+        analysis['schema_markup_count'] = len(self.schema_scripts)
+        analysis['viewport_meta'] = self._first_meta_content('viewport')
+        return analysis
+
+_TEXT_TYPES = (NavigableString, CData, Script, Stylesheet, TemplateString,
+               RubyTextString, RubyParenthesisString)
+
+def _plain_attrs(attrs):
+    # BeautifulSoup splits multi-valued attributes such as rel into lists
+    return {name: ' '.join(value) if isinstance(value, list) else value for name, value in attrs.items()}
+
+def walk_soup(root, visitor):
+    """Feed a BeautifulSoup tree to ``visitor`` as start/end/data events in one traversal"""
+    stack = [iter(root.contents)]
+    names = [None]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                visitor.start(node.name, _plain_attrs(node.attrs))
+                stack.append(iter(node.contents))
+                names.append(node.name)
+                break
+            if type(node) in _TEXT_TYPES:
+                visitor.data(str(node))
+        else:
+            stack.pop()
+            name = names.pop()
+            if name is not None:
+                visitor.end(name)
+    return visitor.close()
+
+def extract_features(html, site_domain=SITE_DOMAIN, parser=None):
+    """Parse ``html`` with the chosen backend and extract all features in a single traversal"""
+    from parser_backends import get_backend
+
+    return get_backend(parser).html_features(html, site_domain)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""On-disk HTTP cache with conditional revalidation for requests sessions
+
+The cache is a transport adapter mounted under a ``requests.Session``, so
+every ``session.get`` goes through it unchanged. Bodies are stored as files
+next to a SQLite index holding ETag / Last-Modified validators; stale
+entries are revalidated with If-None-Match / If-Modified-Since and a 304
+is answered from disk. Entries are evicted least-recently-used once the
+byte budget is exceeded.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def cache_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+def _cache_directives(headers):
+    directives = {}
+    for part in headers.get('Cache-Control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+def freshness_deadline(headers, now=None):
+    """Return the epoch time until which a response may be reused without revalidation"""
+    now = now or time.time()
+    directives = _cache_directives(headers)
+    if 'no-cache' in directives or 'no-store' in directives:
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return now + int(directives[name])
+            except ValueError:
+                return 0.0
+    if headers.get('Expires'):
+        try:
+            return parsedate_to_datetime(headers['Expires']).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+def stored_headers(headers, size):
+    """Headers describing a decoded body of ``size`` bytes, as the cache keeps it on disk"""
+    headers = CaseInsensitiveDict(headers)
+    headers.pop('Content-Encoding', None)
+    headers.pop('Transfer-Encoding', None)
+    headers['Content-Length'] = str(size)
+    return headers
+
+class HTTPCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'stores': 0,
+                      'evictions': 0, 'bytes_saved': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, 'index.sqlite3'), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                status INTEGER,
+                reason TEXT,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fresh_until REAL,
+                size INTEGER,
+                last_access REAL
+            )
+        """)
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)')
+
+    def body_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def lookup(self, url):
+        key = cache_key(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, reason, headers, etag, last_modified, fresh_until, size '
+                'FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None or not os.path.exists(self.body_path(key)):
+            return None
+        status, reason, headers, etag, last_modified, fresh_until, size = row
+        return {
+            'key': key,
+            'status': status,
+            'reason': reason,
+            'headers': json.loads(headers),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh_until': fresh_until,
+            'size': size
+        }
+
+    def touch(self, key, headers=None):
+        with self._lock:
+            if headers is None:
+                self._db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            else:
+                self._db.execute(
+                    'UPDATE entries SET last_access = ?, headers = ?, fresh_until = ? WHERE key = ?',
+                    (time.time(), json.dumps(dict(headers)), freshness_deadline(headers), key)
+                )
+
+    def store(self, url, response, temp_path, size):
+        key = cache_key(url)
+        path = self.body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        # Bodies are written decoded, so the encoding headers no longer apply
+        headers = stored_headers(response.headers, size)
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, response.status_code, response.reason, json.dumps(dict(headers)),
+                 headers.get('ETag'), headers.get('Last-Modified'), freshness_deadline(headers),
+                 size, time.time())
+            )
+            self.stats['stores'] += 1
+        self.evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def evict(self):
+        """Drop least-recently-used entries until the byte budget is met"""
+        with self._lock:
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                try:
+                    os.remove(self.body_path(key))
+                except OSError:
+                    pass
+                total -= size
+                self.stats['evictions'] += 1
+
+    def temp_file(self):
+        return tempfile.NamedTemporaryFile(dir=self.directory, prefix='.partial-', delete=False)
+
+class _TeeRaw:
+    """Wrap a urllib3 response so the decoded body is written to the cache as it is read"""
+
+    def __init__(self, raw, cache, url, response):
+        self._raw = raw
+        self._cache = cache
+        self._url = url
+        self._response = response
+        self._file = cache.temp_file()
+        self._size = 0
+        self._done = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _write(self, data):
+        if data and not self._done:
+            self._file.write(data)
+            self._size += len(data)
+
+    def _finish(self):
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        self._cache.store(self._url, self._response, self._file.name, self._size)
+
+    def _discard(self):
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        try:
+            os.remove(self._file.name)
+        except OSError:
+            pass
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        data = self._raw.read(amt, decode_content=True, **kwargs)
+        self._write(data)
+        if amt is None or not data:
+            self._finish()
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=True):
+            self._write(chunk)
+            yield chunk
+        self._finish()
+
+    def close(self):
+        self._discard()
+        return self._raw.close()
+
+    def release_conn(self):
+        self._discard()
+        return self._raw.release_conn()
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter that answers GETs from an HTTPCache when possible"""
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def _cached_response(self, request, entry, cache_status):
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = open(self.cache.body_path(entry['key']), 'rb')
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        response.cache_status = cache_status
+        self.cache._count('bytes_saved', entry['size'])
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or 'no-store' in _cache_directives(request.headers):
+            return super().send(request, **kwargs)
+
+        entry = self.cache.lookup(request.url)
+        if entry and entry['fresh_until'] > time.time():
+            self.cache._count('hits')
+            self.cache.touch(entry['key'])
+            return self._cached_response(request, entry, 'hit')
+
+        if entry:
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if entry and response.status_code == 304:
+            headers = CaseInsensitiveDict(entry['headers'])
+            headers.update(response.headers)
+            response.close()
+            headers = dict(stored_headers(headers, entry['size']))
+            entry['headers'] = headers
+            self.cache._count('revalidations')
+            self.cache.touch(entry['key'], CaseInsensitiveDict(headers))
+            return self._cached_response(request, entry, 'revalidated')
+
+        self.cache._count('misses')
+        response.from_cache = False
+        response.cache_status = 'miss'
+        if (response.status_code == 200
+                and 'no-store' not in _cache_directives(response.headers)
+                and (response.headers.get('ETag') or response.headers.get('Last-Modified')
+                     or freshness_deadline(response.headers))):
+            response.raw = _TeeRaw(response.raw, self.cache, request.url, response)
+        return response
+
+def install_cache(session, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, cache=None, **adapter_options):
+    """Mount a caching adapter on ``session`` and return the HTTPCache behind it
+
+    ``adapter_options`` (e.g. ``pool_connections``, ``pool_maxsize``) size the connection pools.
+    """
+    cache = cache or HTTPCache(directory, max_bytes)
+    adapter = CachingAdapter(cache, **adapter_options)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return cache
+
+if __name__ == "__main__":
+    import requests
+
+    session = requests.Session()
+    cache = install_cache(session)
+    for _ in range(2):
+        response = session.get("https://www.tln-werbemittel.de", timeout=30)
+        print(f"{response.status_code} {response.cache_status}: {len(response.content)} bytes")
+    print(f"Cache stats: {cache.stats}")
+    print(f"Cache size: {cache.total_bytes() / 1024:.0f} KB")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Header-only image weight audit
+
+Every img src/srcset candidate is probed with a single small Range request:
+the Content-Range (or Content-Length) header gives the transfer size and
+the first few KB are enough to sniff the format and intrinsic dimensions,
+so full image bodies are never downloaded. Probes run concurrently over a
+pooled session, and images are ranked by bytes with legacy formats flagged
+as WebP/AVIF candidates.
+"""
+import asyncio
+import json
+import re
+import struct
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from link_checker import LinkTargets
+from parser_backends import get_backend
+from seo_analyzer import USER_AGENT
+
+PROBE_BYTES = 16384
+IMAGE_ACCEPT = 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'
+CONTENT_RANGE_RE = re.compile(r'bytes \d+-\d+/(\d+)')
+LEGACY_FORMATS = {'jpeg', 'png', 'gif', 'bmp'}
+# Images below this size are not worth converting
+MIN_CANDIDATE_BYTES = 4096
+# WebP is typically 25-35% smaller than JPEG/PNG at equal quality (AVIF more)
+WEBP_SIZE_RATIO = 0.7
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            i += 2
+            continue
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+def _avif_size(data):
+    # Image spatial extents property: 4 bytes version/flags, then width and height
+    at = data.find(b'ispe')
+    if at < 0 or at + 16 > len(data):
+        return None
+    return struct.unpack('>II', data[at + 8:at + 16])
+
+def sniff_image(data, content_type=None):
+    """``(format, (width, height) or None)`` from the first bytes of an image"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        return 'png', struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return 'gif', struct.unpack('<HH', data[6:10])
+    if data.startswith(b'\xff\xd8'):
+        return 'jpeg', _jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp', _webp_size(data)
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return 'avif', _avif_size(data)
+    if data.startswith(b'BM') and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return 'bmp', (width, abs(height))
+    if b'<svg' in data[:4096].lower():
+        return 'svg', None
+    if content_type:
+        return content_type.split(';')[0].strip().split('/')[-1] or None, None
+    return None, None
+
+def page_image_urls(html, parser=None):
+    """Raw src/srcset values of every img on the page"""
+    return get_backend(parser).extract(html).image_urls
+
+def _probe(session, url, timeout):
+    """Range-request the first PROBE_BYTES; returns (status, total bytes, content type, head)"""
+    headers = {'Range': f'bytes=0-{PROBE_BYTES - 1}', 'Accept': IMAGE_ACCEPT, 'Accept-Encoding': 'identity'}
+    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    with response:
+        content_type = response.headers.get('Content-Type')
+        if response.status_code == 206:
+            # Fully reading the short body hands the connection back to the pool
+            head = response.content
+            match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+            total = int(match.group(1)) if match else None
+        elif response.status_code == 200:
+            # Range ignored: read the prefix only and drop the connection
+            head = next(response.iter_content(PROBE_BYTES), b'')
+            length = response.headers.get('Content-Length')
+            total = int(length) if length and length.isdigit() else None
+        else:
+            head, total = b'', None
+    return response.status_code, total, content_type, head
+
+def describe_image(url, status, total, content_type, head):
+    image_format, dimensions = sniff_image(head, content_type)
+    result = {
+        'url': url,
+        'status': status,
+        'bytes': total,
+        'content_type': content_type,
+        'format': image_format,
+        'width': dimensions[0] if dimensions else None,
+        'height': dimensions[1] if dimensions else None,
+        'modern_format_candidate': False
+    }
+    if status not in (200, 206):
+        result['error'] = f'HTTP {status}'
+        return result
+    if total and dimensions and dimensions[0] and dimensions[1]:
+        result['bits_per_pixel'] = round(total * 8 / (dimensions[0] * dimensions[1]), 2)
+    if image_format in LEGACY_FORMATS and total and total >= MIN_CANDIDATE_BYTES:
+        result['modern_format_candidate'] = True
+        result['estimated_savings'] = int(total * (1 - WEBP_SIZE_RATIO))
+    return result
+
+class ImageAuditor:
+    def __init__(self, concurrency=16, per_host=6, timeout=10, session=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.session = session or self._make_session()
+        self._results = {}
+        self.stats = {'images': 0, 'requests': 0, 'bytes_downloaded': 0, 'range_ignored': 0}
+
+    def _make_session(self):
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    async def _audit_one(self, url):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._host_limits[urlsplit(url).netloc]:
+                async with self._global_limit:
+                    self.stats['requests'] += 1
+                    status, total, content_type, head = await loop.run_in_executor(
+                        self._io_pool, _probe, self.session, url, self.timeout
+                    )
+            self.stats['bytes_downloaded'] += len(head)
+            self.stats['range_ignored'] += status == 200
+            result = describe_image(url, status, total, content_type, head)
+        except requests.exceptions.RequestException as e:
+            result = {'url': url, 'error': str(e), 'bytes': None, 'modern_format_candidate': False}
+        self._results[url] = result
+
+    async def audit(self, urls):
+        """Probe each unique image URL once and return ``{url: result}``"""
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        unique = list(dict.fromkeys(urls))
+        self.stats['images'] += len(unique)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as self._io_pool:
+            await asyncio.gather(*(self._audit_one(url) for url in unique if url not in self._results))
+        return {url: self._results[url] for url in unique}
+
+    def audit_all(self, urls):
+        """Synchronous entry point for ``audit``"""
+        return asyncio.run(self.audit(urls))
+
+def audit_image_targets(targets, auditor=None, **options):
+    """Audit all image URLs collected in a LinkTargets and rank them by bytes"""
+    auditor = auditor or ImageAuditor(**options)
+    started = time.perf_counter()
+    results = auditor.audit_all(targets.references)
+    elapsed = time.perf_counter() - started
+
+    images = [dict(result, references=targets.references[url], used_on=targets.sources[url])
+              for url, result in results.items()]
+    images.sort(key=lambda image: image['bytes'] or 0, reverse=True)
+    candidates = [image for image in images if image['modern_format_candidate']]
+    return {
+        'images': len(images),
+        'total_bytes': sum(image['bytes'] or 0 for image in images),
+        'modern_format_candidates': len(candidates),
+        'estimated_savings': sum(image.get('estimated_savings', 0) for image in candidates),
+        'errors': sum('error' in image for image in images),
+        'elapsed': elapsed,
+        'ranked': images,
+        'stats': dict(auditor.stats)
+    }
+
+def audit_pages(pages, parser=None, **options):
+    """Audit the images of ``(url, html)`` pages"""
+    targets = LinkTargets()
+    for url, html in pages:
+        targets.add_page(url, page_image_urls(html, parser))
+    return audit_image_targets(targets, **options)
+
+if __name__ == "__main__":
+    from seo_analyzer import SEOAnalyzer
+
+    urls = sys.argv[1:] or None
+    analyzer = SEOAnalyzer("https://www.tln-werbemittel.de")
+    report = analyzer.audit_images(urls)
+
+    with open('image_audit_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    stats = report['stats']
+    print(f"Audited {report['images']} images ({report['total_bytes'] / 1024:.0f} KB) in {report['elapsed']:.2f}s, "
+          f"downloading only {stats['bytes_downloaded'] / 1024:.0f} KB")
+    print(f"WebP/AVIF candidates: {report['modern_format_candidates']}, "
+          f"estimated savings {report['estimated_savings'] / 1024:.0f} KB")
+    print("\nLargest images:")
+    for image in report['ranked'][:15]:
+        size = f"{image['width']}x{image['height']}" if image.get('width') else '?'
+        flag = ' -> WebP/AVIF' if image['modern_format_candidate'] else ''
+        print(f"  {(image['bytes'] or 0) / 1024:8.1f} KB  {image.get('format') or '?':5} {size:>10}  {image['url']}{flag}")
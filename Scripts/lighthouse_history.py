@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Columnar Lighthouse history store
+
+Each Lighthouse run is flattened into one row of fixed-width columns
+(category scores, Core Web Vitals numericValues, per-resource-type bytes
+and request counts). Every column is an append-only little-endian binary
+file next to a small meta.json holding the committed row count, so new
+reports are appended incrementally and trend queries run as vectorized
+NumPy operations over memory-mapped columns without touching report JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from lighthouse_loader import find_reports, load_reports
+
+DEFAULT_HISTORY_DIR = 'lighthouse_history'
+
+CATEGORIES = ('performance', 'accessibility', 'best-practices', 'seo')
+METRIC_AUDITS = {
+    'fcp': 'first-contentful-paint',
+    'lcp': 'largest-contentful-paint',
+    'cls': 'cumulative-layout-shift',
+    'tbt': 'total-blocking-time',
+    'si': 'speed-index',
+    'tti': 'interactive',
+    'ttfb': 'server-response-time',
+}
+RESOURCE_TYPES = ('total', 'document', 'script', 'stylesheet', 'image', 'font', 'media', 'other', 'third-party')
+
+def _column_name(prefix, name):
+    return f"{prefix}_{name.replace('-', '_')}"
+
+COLUMNS = {'fetch_time': '<f8', 'url': '<i4'}
+COLUMNS.update({_column_name('score', category): '<f4' for category in CATEGORIES})
+COLUMNS.update({metric: '<f8' for metric in METRIC_AUDITS})
+COLUMNS.update({_column_name('bytes', rtype): '<i8' for rtype in RESOURCE_TYPES})
+COLUMNS.update({_column_name('requests', rtype): '<i4' for rtype in RESOURCE_TYPES})
+
+# Missing values: NaN for floats, -1 for integer columns
+MISSING = {'<f8': np.nan, '<f4': np.nan, '<i8': -1, '<i4': -1}
+
+HISTORY_AUDITS = {audit_id: {'numericValue': True} for audit_id in METRIC_AUDITS.values()}
+HISTORY_AUDITS['resource-summary'] = {
+    'details': {'items': {'resourceType': True, 'transferSize': True, 'requestCount': True}}
+}
+HISTORY_SPEC = {
+    'requestedUrl': True,
+    'finalUrl': True,
+    'fetchTime': True,
+    'categories': {'*': {'score': True}},
+    'audits': HISTORY_AUDITS,
+}
+
+PERIODS = {'day': 86400, 'week': 7 * 86400}
+# 1970-01-05 was a Monday, so weeks are aligned to start on Mondays
+WEEK_ORIGIN = 4 * 86400
+
+def parse_fetch_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+def flatten_report(report):
+    """One history row (column name -> value) from a selectively loaded report"""
+    row = {'fetch_time': parse_fetch_time(report['fetchTime']),
+           'url': report.get('finalUrl') or report.get('requestedUrl')}
+    categories = report.get('categories', {})
+    for category in CATEGORIES:
+        score = categories.get(category, {}).get('score')
+        if score is not None:
+            row[_column_name('score', category)] = score
+    audits = report.get('audits', {})
+    for metric, audit_id in METRIC_AUDITS.items():
+        value = audits.get(audit_id, {}).get('numericValue')
+        if value is not None:
+            row[metric] = value
+    summary = (audits.get('resource-summary', {}).get('details') or {}).get('items', [])
+    for item in summary:
+        rtype = item.get('resourceType')
+        if rtype in RESOURCE_TYPES:
+            row[_column_name('bytes', rtype)] = item.get('transferSize', -1)
+            row[_column_name('requests', rtype)] = item.get('requestCount', -1)
+    return row
+
+class LighthouseHistory:
+    def __init__(self, directory=DEFAULT_HISTORY_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        else:
+            meta = {'rows': 0, 'columns': COLUMNS, 'urls': []}
+        self.rows = meta['rows']
+        self.dtypes = meta['columns']
+        self.urls = meta['urls']
+        self._url_ids = {url: i for i, url in enumerate(self.urls)}
+        self._seen = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def _commit(self):
+        # Columns are written first; the row count only moves forward once they are on disk
+        temp = self._meta_path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'rows': self.rows, 'columns': self.dtypes, 'urls': self.urls}, f)
+        os.replace(temp, self._meta_path)
+
+    def column(self, name):
+        """Read-only memory map of a committed column"""
+        dtype = np.dtype(self.dtypes[name])
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def _seen_runs(self):
+        if self._seen is None:
+            self._seen = set(zip(self.column('url').tolist(), self.column('fetch_time').tolist()))
+        return self._seen
+
+    def append(self, rows):
+        """Append flattened rows, skipping runs (URL + fetch time) already stored"""
+        seen = self._seen_runs()
+        fresh = []
+        for row in rows:
+            url = row['url']
+            url_id = self._url_ids.get(url)
+            if url_id is None:
+                url_id = self._url_ids[url] = len(self.urls)
+                self.urls.append(url)
+            key = (url_id, row['fetch_time'])
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append(dict(row, url=url_id))
+        if not fresh:
+            return 0
+
+        for name, dtype in self.dtypes.items():
+            missing = MISSING[dtype]
+            values = np.array([row.get(name, missing) for row in fresh], dtype=dtype)
+            offset = self.rows * values.itemsize
+            path = self._path(name)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                # Drop bytes of an earlier append that never got committed
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(values.tobytes())
+        self.rows += len(fresh)
+        self._commit()
+        return len(fresh)
+
+    def ingest(self, paths, workers=None, batch_size=1000):
+        """Load reports in parallel and append them; returns (appended, errors)"""
+        appended = errors = 0
+        batch = []
+        for report in load_reports(paths, HISTORY_SPEC, workers):
+            if 'error' in report or 'fetchTime' not in report:
+                errors += 1
+                continue
+            batch.append(flatten_report(report))
+            if len(batch) >= batch_size:
+                appended += self.append(batch)
+                batch = []
+        appended += self.append(batch)
+        return appended, errors
+
+    def percentile_by_period(self, metric, q=75, period='week', since=None, url=None):
+        """``q``-th percentile of ``metric`` per period as (period starts, values, run counts)
+
+        ``since`` is a Unix timestamp; ``url`` restricts the query to one page.
+        """
+        times = np.asarray(self.column('fetch_time'))
+        raw = np.asarray(self.column(metric))
+        values = raw.astype(np.float64)
+        mask = raw >= 0 if raw.dtype.kind == 'i' else ~np.isnan(values)
+        if since is not None:
+            mask &= times >= since
+        if url is not None:
+            url_id = self._url_ids.get(url, -2)
+            mask &= np.asarray(self.column('url')) == url_id
+        times, values = times[mask], values[mask]
+        if not len(values):
+            return np.empty(0, dtype='datetime64[s]'), np.empty(0), np.empty(0, dtype=np.int64)
+
+        width = PERIODS[period]
+        origin = WEEK_ORIGIN if period == 'week' else 0
+        groups = np.floor((times - origin) / width).astype(np.int64)
+
+        # Sort by period, then value, and interpolate each group's percentile like np.percentile
+        order = np.lexsort((values, groups))
+        groups, values = groups[order], values[order]
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        counts = np.diff(np.r_[starts, len(groups)])
+        rank = q / 100 * (counts - 1)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        fraction = rank - lower
+        result = values[starts + lower] * (1 - fraction) + values[starts + upper] * fraction
+
+        period_starts = (groups[starts] * width + origin).astype('datetime64[s]')
+        return period_starts, result, counts
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Columnar Lighthouse history')
+    arg_parser.add_argument('--store', default=DEFAULT_HISTORY_DIR)
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    ingest_parser = commands.add_parser('ingest', help='append reports from a file or directory')
+    ingest_parser.add_argument('source')
+    ingest_parser.add_argument('--workers', type=int, default=None)
+    query_parser = commands.add_parser('query', help='percentile of a metric per period')
+    query_parser.add_argument('metric', choices=[name for name in COLUMNS if name not in ('fetch_time', 'url')])
+    query_parser.add_argument('--percentile', type=float, default=75)
+    query_parser.add_argument('--period', choices=sorted(PERIODS), default='week')
+    query_parser.add_argument('--days', type=int, default=365, help='look-back window')
+    query_parser.add_argument('--url', default=None)
+    args = arg_parser.parse_args()
+
+    history = LighthouseHistory(args.store)
+    if args.command == 'ingest':
+        started = time.perf_counter()
+        appended, errors = history.ingest(find_reports(args.source), args.workers)
+        print(f"Appended {appended} runs ({errors} unreadable) in {time.perf_counter() - started:.2f}s; "
+              f"{history.rows} runs stored")
+    else:
+        since = datetime.now(timezone.utc).timestamp() - args.days * 86400
+        started = time.perf_counter()
+        periods, values, counts = history.percentile_by_period(
+            args.metric, args.percentile, args.period, since, args.url
+        )
+        elapsed = time.perf_counter() - started
+        print(f"{args.metric} p{args.percentile:g} per {args.period} over {counts.sum()} runs "
+              f"({elapsed * 1000:.1f} ms)")
+        for start, value, count in zip(periods, values, counts):
+            print(f"  {str(start)[:10]}  {value:12.2f}  ({count} runs)")
+        if not len(counts):
+            print("  no runs in range", file=sys.stderr)
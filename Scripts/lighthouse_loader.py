@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Streaming, selective Lighthouse report loader
+
+A Lighthouse report is mostly screenshots, traces and i18n strings, while
+the analysis reads a few dozen audits. The loader scans the raw bytes of a
+(memory-mapped) report and only decodes the values named by a selection
+spec; everything else is skipped without decoding, either with a ``find``
+for the closing line of a pretty-printed container (checked by one regex
+scan for a line outside it) or with regex jumps between brackets, so
+base64 screenshot blobs are never turned into Python objects. A batch mode loads a directory of reports on a process pool.
+
+Selection specs are nested dicts: ``True`` decodes a value completely, a
+dict keeps only the listed keys of an object (``'*'`` matches any key not
+listed) and is applied to every element of an array.
+"""
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+WHITESPACE_RE = re.compile(rb'[ \t\n\r]*')
+STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Everything up to and including the next bracket outside a string, in one match
+BRACKET_RE = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*[\[\]{}]')
+SCALAR_END_RE = re.compile(rb'[,\]}\s]')
+# Per member indentation: a line that does not start with it
+_SHALLOW_LINE_RES = {}
+
+# Containers up to this size are decoded whole and pruned afterwards
+SMALL_VALUE_BYTES = 4096
+
+QUOTE, COMMA, COLON = ord('"'), ord(','), ord(':')
+OPEN_OBJECT, CLOSE_OBJECT = ord('{'), ord('}')
+OPEN_ARRAY, CLOSE_ARRAY = ord('['), ord(']')
+
+# Small top-level fields that identify a run
+REPORT_FIELDS = ('lighthouseVersion', 'requestedUrl', 'finalUrl', 'finalDisplayedUrl', 'fetchTime',
+                 'gatherMode', 'runWarnings', 'userAgent', 'configSettings')
+CATEGORY_FIELDS = {'id': True, 'title': True, 'score': True}
+# Enough of every audit for score listings and the opportunity ranking
+AUDIT_SUMMARY_FIELDS = {
+    'id': True, 'title': True, 'score': True, 'scoreDisplayMode': True, 'displayValue': True,
+    'numericValue': True, 'numericUnit': True,
+    'details': {'type': True, 'overallSavingsMs': True, 'overallSavingsBytes': True}
+}
+CORE_WEB_VITALS = ('first-contentful-paint', 'largest-contentful-paint', 'cumulative-layout-shift',
+                   'total-blocking-time', 'speed-index', 'interactive')
+
+def _error(message, pos):
+    return json.JSONDecodeError(message, '', pos)
+
+def _skip_ws(buf, pos):
+    return WHITESPACE_RE.match(buf, pos).end()
+
+def _string_end(buf, pos):
+    match = STRING_RE.match(buf, pos)
+    if match is None:
+        raise _error('Unterminated string', pos)
+    return match.end()
+
+def _skip_indented(buf, pos, char):
+    """End of a pretty-printed container, or None if it is not laid out one member per line
+
+    Lighthouse writes reports with two-space indentation, and raw newlines
+    cannot occur inside JSON strings, so a container opened on a line with
+    indentation N closes at the first later newline followed by the same N
+    whitespace characters (spaces or tabs) and the closing bracket; a
+    ``find`` jumps straight there, and one regex scan confirms that every
+    line in between is indented as a member. Containers whose members are not indented
+    deeper than the opening line, or that close on their last member's line,
+    fall back to bracket matching.
+    """
+    if buf[pos + 1:pos + 2] != b'\n':
+        return None
+    line_start = buf.rfind(b'\n', 0, pos) + 1
+    line = buf[line_start:pos]
+    indent = line[:len(line) - len(line.lstrip(b' \t'))]
+    member = buf[pos + 2:pos + 3 + len(indent)]
+    if not member.startswith(indent) or member[len(indent):] not in (b' ', b'\t'):
+        return None
+    closing = b'}' if char == OPEN_OBJECT else b']'
+    at = buf.find(b'\n' + indent + closing, pos)
+    if at < 0:
+        return None
+    # A container may also close on its last member's line ("2],"); then the bracket found
+    # belongs to a later container and some line in between is not indented as a member
+    prefix = member[:len(indent) + 1]
+    shallow = _SHALLOW_LINE_RES.get(prefix)
+    if shallow is None:
+        shallow = _SHALLOW_LINE_RES[prefix] = re.compile(b'\n(?!' + re.escape(prefix) + b')')
+    if shallow.search(buf, pos, at):
+        return None
+    return at + len(indent) + 2
+
+def _skip_value(buf, pos):
+    """End offset of the JSON value starting at ``pos``, without decoding it"""
+    char = buf[pos]
+    if char == QUOTE:
+        return _string_end(buf, pos)
+    if char == OPEN_OBJECT or char == OPEN_ARRAY:
+        end = _skip_indented(buf, pos, char)
+        if end is not None:
+            return end
+        depth = 0
+        while True:
+            match = BRACKET_RE.match(buf, pos)
+            if match is None:
+                raise _error('Unterminated container', pos)
+            pos = match.end()
+            char = buf[pos - 1]
+            depth += 1 if char == OPEN_OBJECT or char == OPEN_ARRAY else -1
+            if depth == 0:
+                return pos
+    # Number, true, false or null
+    match = SCALAR_END_RE.search(buf, pos)
+    return match.start() if match else len(buf)
+
+def _decode(buf, pos):
+    end = _skip_value(buf, pos)
+    return json.loads(buf[pos:end]), end
+
+def _prune(value, spec):
+    """Apply ``spec`` to an already decoded value"""
+    if spec is True:
+        return value
+    if isinstance(value, list):
+        return [_prune(item, spec) for item in value]
+    if not isinstance(value, dict):
+        return value
+    default = spec.get('*')
+    pruned = {}
+    for key, item in value.items():
+        sub_spec = spec.get(key, default)
+        if sub_spec is not None:
+            pruned[key] = _prune(item, sub_spec)
+    return pruned
+
+def _after_member(buf, pos, close):
+    """Skip to the next member; returns (pos, finished)"""
+    pos = _skip_ws(buf, pos)
+    if buf[pos] == COMMA:
+        return _skip_ws(buf, pos + 1), False
+    if buf[pos] == close:
+        return pos + 1, True
+    raise _error('Expecting , delimiter', pos)
+
+def _select(buf, pos, spec, stop_early=False):
+    """Decode the value at ``pos`` keeping only what ``spec`` selects; returns (value, end)
+
+    With ``stop_early`` an object stops being scanned once every key named
+    in ``spec`` has been read, and the returned end offset is None.
+    """
+    char = buf[pos]
+    if spec is True or (char != OPEN_OBJECT and char != OPEN_ARRAY):
+        return _decode(buf, pos)
+    if not stop_early:
+        # Small containers are cheaper to decode in C and prune than to walk key by key
+        end = _skip_value(buf, pos)
+        if end - pos <= SMALL_VALUE_BYTES:
+            return _prune(json.loads(buf[pos:end]), spec), end
+
+    if char == OPEN_ARRAY:
+        items = []
+        pos = _skip_ws(buf, pos + 1)
+        if buf[pos] == CLOSE_ARRAY:
+            return items, pos + 1
+        while True:
+            item, pos = _select(buf, pos, spec)
+            items.append(item)
+            pos, finished = _after_member(buf, pos, CLOSE_ARRAY)
+            if finished:
+                return items, pos
+
+    result = {}
+    default = spec.get('*')
+    remaining = len(spec) if stop_early and default is None else None
+    pos = _skip_ws(buf, pos + 1)
+    if buf[pos] == CLOSE_OBJECT:
+        return result, pos + 1
+    while True:
+        key_end = _string_end(buf, pos)
+        key = json.loads(buf[pos:key_end])
+        pos = _skip_ws(buf, key_end)
+        if buf[pos] != COLON:
+            raise _error('Expecting : delimiter', pos)
+        pos = _skip_ws(buf, pos + 1)
+        sub_spec = spec.get(key, default)
+        if sub_spec is None:
+            pos = _skip_value(buf, pos)
+        else:
+            result[key], pos = _select(buf, pos, sub_spec)
+            if remaining is not None:
+                remaining -= 1
+                if not remaining:
+                    return result, None
+        pos, finished = _after_member(buf, pos, CLOSE_OBJECT)
+        if finished:
+            return result, pos
+
+def select_json(buf, spec):
+    """Selectively decode a JSON document held in a bytes-like object"""
+    # Trailing top-level members (screenshots, i18n strings) need not be scanned at all
+    try:
+        value, _ = _select(buf, _skip_ws(buf, 0), spec, stop_early=True)
+    except IndexError:
+        raise _error('Unexpected end of data', len(buf))
+    return value
+
+def report_spec(audit_ids=CORE_WEB_VITALS, audit_summary=False, fields=REPORT_FIELDS):
+    """Selection spec for a report: the given audits in full, category scores and run fields"""
+    audits = {'*': AUDIT_SUMMARY_FIELDS} if audit_summary else {}
+    for audit_id in audit_ids:
+        audits[audit_id] = True
+    spec = {field: True for field in fields}
+    spec['categories'] = {'*': CATEGORY_FIELDS}
+    spec['audits'] = audits
+    return spec
+
+def load_report(path, audit_ids=CORE_WEB_VITALS, audit_summary=False, spec=None):
+    """Load only the selected parts of a Lighthouse report (.json or .json.gz)"""
+    spec = spec or report_spec(audit_ids, audit_summary)
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return select_json(f.read(), spec)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise _error('Empty report', 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return select_json(buf, spec)
+
+def find_reports(source):
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names if name.endswith(('.json', '.json.gz'))
+        )
+    return [source]
+
+def _load_chunk(paths, spec):
+    records = []
+    for path in paths:
+        try:
+            record = load_report(path, spec=spec)
+            record['file'] = path
+        except (OSError, ValueError) as e:
+            record = {'file': path, 'error': str(e)}
+        records.append(record)
+    return records
+
+def load_reports(paths, spec=None, workers=None, chunksize=8):
+    """Yield selectively loaded reports, spread over a process pool, in input order"""
+    from batch_analyze import available_cores
+
+    spec = spec or report_spec()
+    workers = workers or available_cores()
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for records in executor.map(_load_chunk, chunks, [spec] * len(chunks)):
+            yield from records
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Selectively load Lighthouse reports into JSONL')
+    arg_parser.add_argument('source', help='report file or directory of reports')
+    arg_parser.add_argument('output', nargs='?', default='lighthouse_reports.jsonl')
+    arg_parser.add_argument('--audits', default=','.join(CORE_WEB_VITALS),
+                            help='comma-separated audit IDs to load in full')
+    arg_parser.add_argument('--summary', action='store_true', help='also keep the score fields of every audit')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    args = arg_parser.parse_args()
+
+    paths = find_reports(args.source)
+    spec = report_spec([a for a in args.audits.split(',') if a], args.summary)
+    started = time.perf_counter()
+    errors = 0
+    with open(args.output, 'w', encoding='utf-8') as out:
+        for record in load_reports(paths, spec, args.workers):
+            errors += 'error' in record
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {len(paths)} reports ({errors} errors) in {elapsed:.2f}s "
+          f"({len(paths) / elapsed if elapsed else 0:.1f} reports/s) -> {args.output}", file=sys.stderr)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Broken-link and redirect-chain validation of crawled link targets
+
+Every href found during a crawl is resolved and normalized, so a target
+linked from thousands of pages is checked with a single request. Targets
+are probed with HEAD (falling back to GET for servers that reject HEAD)
+on a bounded pool with per-host limits, and redirects are followed hop by
+hop so the full chain is recorded. Results are memoized per checker, and
+redirect hops already resolved are reused instead of requested again.
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from link_graph import normalize_url
+from seo_analyzer import USER_AGENT
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Statuses some servers send for HEAD although GET would succeed
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 406, 501}
+
+def link_target(page_url, href):
+    """Absolute, normalized target of ``href`` on ``page_url``, or None for non-HTTP or malformed links"""
+    try:
+        target = urljoin(page_url, href.strip())
+        if urlsplit(target).scheme not in ('http', 'https'):
+            return None
+        return normalize_url(target)
+    except ValueError:
+        # e.g. 'http://[broken/': Invalid IPv6 URL
+        return None
+
+class LinkTargets:
+    """Unique link targets of a crawl with their reference counts and first few source pages"""
+
+    def __init__(self, max_sources=10):
+        self.max_sources = max_sources
+        self.references = defaultdict(int)
+        self.sources = defaultdict(list)
+        self.links = 0
+
+    def __len__(self):
+        return len(self.references)
+
+    def add_page(self, url, links):
+        for href in links:
+            target = link_target(url, href)
+            if target is None:
+                continue
+            self.links += 1
+            self.references[target] += 1
+            sources = self.sources[target]
+            if len(sources) < self.max_sources and url not in sources:
+                sources.append(url)
+
+def _probe(session, method, url, timeout):
+    """One request without following redirects; the body is never downloaded"""
+    response = session.request(method, url, allow_redirects=False, timeout=timeout, stream=True)
+    response.close()
+    return response.status_code, response.headers.get('Location')
+
+class LinkChecker:
+    def __init__(self, concurrency=32, per_host=4, timeout=10, max_redirects=10, session=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.session = session or self._make_session()
+        self._results = {}
+        self.stats = {'targets': 0, 'memoized': 0, 'requests': 0, 'get_fallbacks': 0, 'hops_reused': 0}
+
+    def _make_session(self):
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    async def _request(self, method, url):
+        loop = asyncio.get_running_loop()
+        async with self._host_limits[urlsplit(url).netloc]:
+            async with self._global_limit:
+                self.stats['requests'] += 1
+                return await loop.run_in_executor(self._io_pool, _probe, self.session, method, url, self.timeout)
+
+    async def _hop(self, url):
+        status, location = await self._request('HEAD', url)
+        if status in HEAD_FALLBACK_STATUSES:
+            self.stats['get_fallbacks'] += 1
+            status, location = await self._request('GET', url)
+            return status, location, 'GET'
+        return status, location, 'HEAD'
+
+    def _remember(self, url, chain, outcome):
+        result = {'url': url}
+        result.update(outcome)
+        result['redirects'] = max(len(chain) - 1, 0)
+        result['chain'] = chain
+        result['ok'] = 'error' not in result and result['status'] is not None and result['status'] < 400
+        self._results.setdefault(url, result)
+        return result
+
+    async def _check(self, url):
+        chain = []
+        current = url
+        try:
+            while True:
+                status, location, method = await self._hop(current)
+                chain.append({'url': current, 'status': status, 'method': method})
+                if status not in REDIRECT_STATUSES or not location:
+                    outcome = {'status': status, 'final_url': current}
+                    break
+                next_url = normalize_url(urljoin(current, location))
+                if any(hop['url'] == next_url for hop in chain):
+                    outcome = {'status': status, 'final_url': next_url, 'error': 'redirect loop'}
+                    break
+                if len(chain) > self.max_redirects:
+                    outcome = {'status': status, 'final_url': next_url, 'error': 'too many redirects'}
+                    break
+                known = self._results.get(next_url)
+                if known is not None:
+                    # The rest of the chain was already resolved for another link
+                    self.stats['hops_reused'] += 1
+                    chain.extend(known['chain'])
+                    outcome = {k: known[k] for k in ('status', 'final_url', 'error') if k in known}
+                    break
+                current = next_url
+        except requests.exceptions.RequestException as e:
+            outcome = {'status': None, 'final_url': current, 'error': str(e)}
+
+        # Every hop of the chain is itself a resolved target now
+        for i, hop in enumerate(chain[1:], 1):
+            self._remember(hop['url'], chain[i:], outcome)
+        return self._remember(url, chain, outcome)
+
+    async def check(self, urls):
+        """Check ``urls`` (normalized and deduplicated) and return ``{url: result}``"""
+        self._global_limit = asyncio.Semaphore(self.concurrency)
+        self._host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+
+        unique = list(dict.fromkeys(normalize_url(url) for url in urls))
+        pending = [url for url in unique if url not in self._results]
+        self.stats['targets'] += len(unique)
+        self.stats['memoized'] += len(unique) - len(pending)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as self._io_pool:
+            await asyncio.gather(*(self._check(url) for url in pending))
+        return {url: self._results[url] for url in unique}
+
+    def check_all(self, urls):
+        """Synchronous entry point for ``check``"""
+        return asyncio.run(self.check(urls))
+
+def check_link_targets(targets, checker=None, **options):
+    """Validate all targets collected by a LinkTargets and build a report"""
+    checker = checker or LinkChecker(**options)
+    started = time.perf_counter()
+    results = checker.check_all(targets.references)
+    elapsed = time.perf_counter() - started
+
+    broken = []
+    redirected = []
+    for url, result in results.items():
+        entry = dict(result, references=targets.references[url], linked_from=targets.sources[url])
+        if not result['ok']:
+            broken.append(entry)
+        elif result['redirects']:
+            redirected.append(entry)
+    broken.sort(key=lambda entry: entry['references'], reverse=True)
+    redirected.sort(key=lambda entry: (entry['redirects'], entry['references']), reverse=True)
+
+    return {
+        'links': targets.links,
+        'unique_targets': len(results),
+        'requests': checker.stats['requests'],
+        'elapsed': elapsed,
+        'broken': broken,
+        'redirected': redirected,
+        'stats': dict(checker.stats)
+    }
+
+if __name__ == "__main__":
+    from seo_analyzer import SEOAnalyzer
+
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    analyzer = SEOAnalyzer("https://www.tln-werbemittel.de")
+    report = analyzer.check_links(limit=limit)
+
+    with open('link_check_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Checked {report['unique_targets']} unique targets of {report['links']} links "
+          f"with {report['requests']} requests in {report['elapsed']:.2f}s")
+    print(f"Broken: {len(report['broken'])}, redirected: {len(report['redirected'])}")
+    for entry in report['broken'][:20]:
+        print(f"  {entry.get('status')}  {entry['url']}  ({entry['references']} links) {entry.get('error', '')}")
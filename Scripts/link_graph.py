@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Internal link graph in compact CSR form
+
+URLs are interned to integer IDs while crawling and edges are kept as two
+flat int32 arrays. ``LinkGraphBuilder.build`` turns them into a CSR
+adjacency (``indptr``/``indices`` NumPy arrays) on which PageRank, click
+depth, orphan and dead-end detection run as vectorized array operations,
+so millions of edges fit comfortably in memory.
+"""
+import json
+import sys
+from array import array
+from functools import lru_cache
+from urllib.parse import urldefrag, urlsplit, urlunsplit
+
+import numpy as np
+
+@lru_cache(maxsize=65536)
+def normalize_url(url):
+    """Drop the fragment and lowercase scheme and host so equivalent links share an ID"""
+    url = urldefrag(url)[0]
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+class URLInterner:
+    def __init__(self):
+        self.ids = {}
+        self.urls = []
+
+    def __len__(self):
+        return len(self.urls)
+
+    def intern(self, url):
+        url = normalize_url(url)
+        url_id = self.ids.get(url)
+        if url_id is None:
+            url_id = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        return url_id
+
+class LinkGraphBuilder:
+    """Collects pages and their internal links during a crawl"""
+
+    def __init__(self):
+        self.interner = URLInterner()
+        self._sources = array('i')
+        self._targets = array('i')
+        self._crawled = array('i')
+
+    def add_page(self, url, internal_links):
+        source = self.interner.intern(url)
+        self._crawled.append(source)
+        intern = self.interner.intern
+        for link in internal_links:
+            self._sources.append(source)
+            self._targets.append(intern(link))
+
+    def build(self):
+        n = len(self.interner)
+        sources = np.frombuffer(self._sources, dtype=np.int32)
+        targets = np.frombuffer(self._targets, dtype=np.int32)
+
+        # Deduplicate parallel edges and drop self-links, then sort by source
+        keep = sources != targets
+        pairs = np.unique(sources[keep].astype(np.int64) * n + targets[keep])
+        sources = (pairs // n).astype(np.int32)
+        targets = (pairs % n).astype(np.int32)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        crawled = np.zeros(n, dtype=bool)
+        crawled[np.frombuffer(self._crawled, dtype=np.int32)] = True
+        return LinkGraph(list(self.interner.urls), indptr, targets, crawled)
+
+class LinkGraph:
+    def __init__(self, urls, indptr, indices, crawled):
+        self.urls = urls
+        self.indptr = indptr
+        self.indices = indices
+        self.crawled = crawled
+        self._ids = None
+
+    @property
+    def num_nodes(self):
+        return len(self.urls)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def url_id(self, url):
+        """Node id of ``url``, or None if it was neither crawled nor linked"""
+        if self._ids is None:
+            self._ids = {u: i for i, u in enumerate(self.urls)}
+        return self._ids.get(normalize_url(url))
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=self.num_nodes)
+
+    def pagerank(self, damping=0.85, tol=1e-10, max_iter=100):
+        """Internal PageRank by power iteration; dangling pages spread their rank evenly"""
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0)
+        out_degree = self.out_degree()
+        edge_sources = np.repeat(np.arange(n), out_degree)
+        dangling = out_degree == 0
+        safe_degree = np.where(dangling, 1, out_degree)
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            share = rank / safe_degree
+            incoming = np.bincount(self.indices, weights=share[edge_sources], minlength=n)
+            new_rank = (1 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def click_depth(self, start_url):
+        """BFS click depth from ``start_url``; -1 for pages it cannot reach (all of them if it is not in the graph)"""
+        depth = np.full(self.num_nodes, -1, dtype=np.int32)
+        start = self.url_id(start_url)
+        if start is None:
+            return depth
+        frontier = np.array([start], dtype=np.int64)
+        depth[frontier] = 0
+        level = 0
+        while frontier.size:
+            starts = self.indptr[frontier]
+            lengths = self.indptr[frontier + 1] - starts
+            if not lengths.sum():
+                break
+            # Gather all neighbour slices of the frontier in one vectorized step
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            neighbours = self.indices[offsets + np.arange(lengths.sum())]
+            neighbours = np.unique(neighbours[depth[neighbours] < 0])
+            level += 1
+            depth[neighbours] = level
+            frontier = neighbours.astype(np.int64)
+        return depth
+
+    def orphan_pages(self, start_url=None):
+        """Crawled pages without internal inlinks (the start page is exempt)"""
+        orphans = self.crawled & (self.in_degree() == 0)
+        start = self.url_id(start_url) if start_url is not None else None
+        if start is not None:
+            orphans[start] = False
+        return [self.urls[i] for i in np.flatnonzero(orphans)]
+
+    def dead_end_pages(self):
+        """Crawled pages that link to no other internal page"""
+        return [self.urls[i] for i in np.flatnonzero(self.crawled & (self.out_degree() == 0))]
+
+    def report(self, start_url, top=20):
+        rank = self.pagerank()
+        depth = self.click_depth(start_url)
+        crawled_depth = depth[self.crawled]
+        reachable = crawled_depth[crawled_depth >= 0]
+        top_ids = np.argsort(rank)[::-1][:top]
+        return {
+            'pages': int(self.crawled.sum()),
+            'urls': self.num_nodes,
+            'edges': self.num_edges,
+            # False: the start URL was neither crawled nor linked, so no page counts as reachable
+            'start_url_in_graph': self.url_id(start_url) is not None,
+            'top_pagerank': [{'url': self.urls[i], 'pagerank': float(rank[i])} for i in top_ids],
+            'click_depth_histogram': {int(d): int(c) for d, c in zip(*np.unique(reachable, return_counts=True))},
+            'unreachable_from_start': int((crawled_depth < 0).sum()),
+            'orphan_pages': self.orphan_pages(start_url),
+            'dead_end_pages': self.dead_end_pages()
+        }
+
+    def save(self, path):
+        np.savez_compressed(path, urls=np.array(self.urls, dtype=object), indptr=self.indptr,
+                            indices=self.indices, crawled=self.crawled)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        return cls([str(u) for u in data['urls']], data['indptr'], data['indices'], data['crawled'])
+
+if __name__ == "__main__":
+    from seo_analyzer import SEOAnalyzer
+
+    start_url = "https://www.tln-werbemittel.de/"
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    builder = LinkGraphBuilder()
+    analyzer = SEOAnalyzer(start_url)
+    analyzer.crawl_sitemap(limit=limit, link_graph=builder)
+    graph = builder.build()
+    graph.save('link_graph.npz')
+
+    report = graph.report(start_url)
+    with open('link_graph_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Pages: {report['pages']}, URLs: {report['urls']}, internal edges: {report['edges']}")
+    print("\nTop internal PageRank:")
+    for entry in report['top_pagerank'][:10]:
+        print(f"  {entry['pagerank']:.4f}  {entry['url']}")
+    print(f"\nClick depth: {report['click_depth_histogram']}")
+    if not report['start_url_in_graph']:
+        print(f"Start URL {start_url} is not in the graph (neither crawled nor linked)")
+    print(f"Unreachable from homepage: {report['unreachable_from_start']}")
+    print(f"Orphan pages: {len(report['orphan_pages'])}")
+    print(f"Dead-end pages: {len(report['dead_end_pages'])}")
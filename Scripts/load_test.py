@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Closed- and open-loop HTTP load generation
+
+Closed loop: N virtual users each send a request, wait for the response
+(and an optional think time) and repeat, so throughput adapts to the
+origin. Open loop: requests arrive at a fixed rate regardless of how fast
+the origin answers, and latency is measured from the scheduled arrival
+time so queueing in a saturated origin or client is not hidden
+(coordinated omission). Requests run on a pooled session through a thread
+pool driven by asyncio; results are bucketed into per-interval
+histograms for throughput, error rate and latency percentiles over time.
+"""
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from histogram import LatencyHistogram
+from seo_analyzer import USER_AGENT
+
+class LoadTest:
+    def __init__(self, url, duration=10.0, users=None, rate=None, think_time=0.0, interval=1.0,
+                 timeout=30, verify=True, max_workers=64, session=None):
+        if (users is None) == (rate is None):
+            raise ValueError('Give either users (closed loop) or rate (open loop)')
+        self.url = url
+        self.duration = duration
+        self.users = users
+        self.rate = rate
+        self.think_time = think_time
+        self.interval = interval
+        self.timeout = timeout
+        self.verify = verify
+        self.max_workers = users or max_workers
+        self.session = session or self._make_session()
+        self._windows = {}
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def mode(self):
+        return 'closed' if self.users is not None else 'open'
+
+    def _make_session(self):
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _fetch(self):
+        response = self.session.get(self.url, timeout=self.timeout, verify=self.verify)
+        response.content
+        return response.status_code
+
+    def _window(self, scheduled):
+        # Requests are bucketed by when they were due, so windows exactly cover the run
+        index = int((scheduled - self._started) / self.interval)
+        window = self._windows.get(index)
+        if window is None:
+            window = self._windows[index] = {'requests': 0, 'errors': 0, 'latency': LatencyHistogram()}
+        return window
+
+    async def _timed(self, scheduled):
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            status = await loop.run_in_executor(self._io_pool, self._fetch)
+            self.statuses[status] += 1
+            failed = status >= 400
+        except requests.exceptions.RequestException as e:
+            self.errors[type(e).__name__] += 1
+            failed = True
+        finally:
+            self.in_flight -= 1
+        finished = time.perf_counter()
+        window = self._window(scheduled)
+        window['requests'] += 1
+        window['errors'] += failed
+        window['latency'].record((finished - scheduled) * 1000)
+
+    async def _user(self, deadline):
+        while time.perf_counter() < deadline:
+            await self._timed(time.perf_counter())
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+
+    async def _arrivals(self, deadline):
+        period = 1 / self.rate
+        next_at = self._started
+        pending = set()
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._timed(next_at))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            next_at += period
+        await asyncio.gather(*pending)
+
+    async def run_async(self):
+        self._started = time.perf_counter()
+        deadline = self._started + self.duration
+        with ThreadPoolExecutor(max_workers=self.max_workers) as self._io_pool:
+            if self.mode == 'closed':
+                await asyncio.gather(*(self._user(deadline) for _ in range(self.users)))
+            else:
+                await self._arrivals(deadline)
+        self.elapsed = time.perf_counter() - self._started
+        return self.report()
+
+    def run(self):
+        """Synchronous entry point for ``run_async``"""
+        return asyncio.run(self.run_async())
+
+    def report(self):
+        overall = LatencyHistogram()
+        timeline = []
+        requests_total = errors_total = 0
+        for index in sorted(self._windows):
+            window = self._windows[index]
+            overall.merge(window['latency'])
+            requests_total += window['requests']
+            errors_total += window['errors']
+            # The last window may be cut short by the end of the run
+            span = min(self.interval, self.duration - index * self.interval)
+            timeline.append(dict(
+                window['latency'].summary(digits=1),
+                t=round(index * self.interval, 3),
+                throughput=round(window['requests'] / span, 1),
+                error_rate=round(window['errors'] / window['requests'], 4)
+            ))
+        return {
+            'url': self.url,
+            'mode': self.mode,
+            'users': self.users,
+            'rate': self.rate,
+            'duration': self.duration,
+            'elapsed': round(self.elapsed, 3),
+            'requests': requests_total,
+            'throughput': round(requests_total / self.elapsed, 1) if self.elapsed else 0,
+            'error_rate': round(errors_total / requests_total, 4) if requests_total else 0,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'exceptions': dict(self.errors),
+            'max_in_flight': self.max_in_flight,
+            'latency_ms': overall.summary(digits=1),
+            'timeline': timeline
+        }
+
+def print_load_report(report):
+    target = f"{report['users']} users" if report['mode'] == 'closed' else f"{report['rate']:g} req/s offered"
+    print(f"{report['mode'].title()}-loop load test of {report['url']} ({target}, {report['elapsed']:.1f}s)")
+    latency = report['latency_ms']
+    print(f"Requests: {report['requests']}, throughput {report['throughput']} req/s, "
+          f"errors {report['error_rate'] * 100:.2f}%, max in flight {report['max_in_flight']}")
+    if latency['count']:
+        print(f"Latency: p50 {latency['p50']}ms, p90 {latency['p90']}ms, p99 {latency['p99']}ms, max {latency['max']}ms")
+    print(f"\n{'t (s)':>6} {'req/s':>8} {'err %':>6} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for window in report['timeline']:
+        print(f"{window['t']:6.1f} {window['throughput']:8.1f} {window['error_rate'] * 100:6.2f} "
+              f"{window['p50']:8.1f} {window['p90']:8.1f} {window['p99']:8.1f}")
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Continuous monitoring daemon with a compact time-series store
+
+The daemon runs check_performance, the page metrics and the site checks
+(robots.txt, sitemaps, SSL) for each URL on their own schedules and appends
+every numeric result to a local time-series store instead of overwriting a
+JSON report.
+
+The store keeps fixed-width binary records in one append-only segment file
+per UTC day. Raw samples are rolled up into 5-minute buckets once they are
+older than a few days, and 5-minute buckets into hourly buckets (one segment
+per month) after a few weeks; hourly months are dropped after about a year.
+Rollups keep count, sum, min and max. Each
+compaction step writes its output with an atomic replace before deleting
+its input, so it is safe to rerun after a crash. Storage and query cost
+stay bounded by the retention windows, however long the daemon runs.
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+
+DEFAULT_STORE_DIR = 'monitoring_data'
+
+RAW_RECORD = np.dtype([('t', '<f8'), ('series', '<u4'), ('value', '<f8')])
+ROLLUP_RECORD = np.dtype([('t', '<f8'), ('series', '<u4'), ('count', '<u4'),
+                          ('sum', '<f8'), ('min', '<f8'), ('max', '<f8')])
+# Tier name -> bucket width in seconds (0 = raw samples)
+TIERS = {'raw': 0, '5m': 300, '1h': 3600}
+DAY = 86400
+
+# Job name -> default interval in seconds
+JOB_INTERVALS = {'performance': 60, 'page': 300, 'site': 900}
+# Days each tier is kept before it is rolled up (raw, 5m) or deleted (1h)
+RETENTION_DAYS = {'raw': 3, '5m': 30, '1h': 400}
+
+def _day_name(t):
+    return datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%d')
+
+def _parse_segment(name):
+    # Daily segments are named YYYY-MM-DD, monthly ones YYYY-MM
+    return datetime.strptime(name, '%Y-%m-%d' if len(name) == 10 else '%Y-%m').replace(tzinfo=timezone.utc)
+
+def _segment_start(name):
+    return _parse_segment(name).timestamp()
+
+def _segment_end(name):
+    start = _parse_segment(name)
+    if len(name) == 10:
+        return start.timestamp() + DAY
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1).timestamp()
+
+def rollup(records, width):
+    """Aggregate raw or rollup records into ``width``-second buckets per series"""
+    if not len(records):
+        return np.empty(0, dtype=ROLLUP_RECORD)
+    buckets = np.floor(records['t'] / width) * width
+    if records.dtype == RAW_RECORD:
+        count = np.ones(len(records), dtype=np.uint32)
+        total = low = high = records['value']
+    else:
+        count, total, low, high = records['count'], records['sum'], records['min'], records['max']
+    order = np.lexsort((buckets, records['series']))
+    keys = np.stack([records['series'][order].astype(np.float64), buckets[order]])
+    starts = np.flatnonzero(np.r_[True, np.any(keys[:, 1:] != keys[:, :-1], axis=0)])
+
+    result = np.empty(len(starts), dtype=ROLLUP_RECORD)
+    result['t'] = buckets[order][starts]
+    result['series'] = records['series'][order][starts]
+    result['count'] = np.add.reduceat(count[order], starts)
+    result['sum'] = np.add.reduceat(total[order], starts)
+    result['min'] = np.minimum.reduceat(low[order], starts)
+    result['max'] = np.maximum.reduceat(high[order], starts)
+    return result
+
+class TimeSeriesStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR, raw_days=RETENTION_DAYS['raw'],
+                 five_minute_days=RETENTION_DAYS['5m'], hourly_days=RETENTION_DAYS['1h']):
+        # hourly_days=None keeps hourly rollups forever, so storage is no longer bounded
+        self.directory = directory
+        self.raw_days = raw_days
+        self.five_minute_days = five_minute_days
+        self.hourly_days = hourly_days
+        for tier in TIERS:
+            os.makedirs(os.path.join(directory, tier), exist_ok=True)
+        self._catalog_path = os.path.join(directory, 'series.json')
+        if os.path.exists(self._catalog_path):
+            with open(self._catalog_path, 'r', encoding='utf-8') as f:
+                self.series = [tuple(entry) for entry in json.load(f)]
+        else:
+            self.series = []
+        self._series_ids = {entry: i for i, entry in enumerate(self.series)}
+
+    def _path(self, tier, name):
+        return os.path.join(self.directory, tier, f'{name}.bin')
+
+    def _segments(self, tier):
+        return sorted(name[:-4] for name in os.listdir(os.path.join(self.directory, tier)) if name.endswith('.bin'))
+
+    def _replace(self, tier, name, records):
+        path = self._path(tier, name)
+        records.tofile(path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def series_id(self, url, metric):
+        key = (url, metric)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            series_id = self._series_ids[key] = len(self.series)
+            self.series.append(key)
+            temp = self._catalog_path + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self.series, f)
+            os.replace(temp, self._catalog_path)
+        return series_id
+
+    def append(self, url, metrics, t=None):
+        """Append one sample per metric (name -> number) for ``url``"""
+        t = time.time() if t is None else t
+        records = np.empty(len(metrics), dtype=RAW_RECORD)
+        records['t'] = t
+        records['series'] = [self.series_id(url, metric) for metric in metrics]
+        records['value'] = list(metrics.values())
+        with open(self._path('raw', _day_name(t)), 'ab') as f:
+            f.write(records.tobytes())
+        return len(records)
+
+    def _read(self, tier, name):
+        dtype = RAW_RECORD if tier == 'raw' else ROLLUP_RECORD
+        path = self._path(tier, name)
+        # A record cut short by a crash mid-append is ignored
+        count = os.path.getsize(path) // dtype.itemsize
+        return np.fromfile(path, dtype=dtype, count=count)
+
+    def compact(self, now=None):
+        """Roll expired raw days into 5-minute days and expired 5-minute days into hourly months"""
+        now = time.time() if now is None else now
+        today = _segment_start(_day_name(now))
+        done = {'raw': 0, '5m': 0, '1h': 0}
+
+        for name in self._segments('raw'):
+            if _segment_start(name) < today - self.raw_days * DAY:
+                self._replace('5m', name, rollup(self._read('raw', name), TIERS['5m']))
+                os.remove(self._path('raw', name))
+                done['raw'] += 1
+
+        hourly = {}
+        for name in self._segments('5m'):
+            if _segment_start(name) < today - self.five_minute_days * DAY:
+                hourly.setdefault(name[:7], []).append(name)
+        for month, days in hourly.items():
+            parts = [rollup(self._read('5m', name), TIERS['1h']) for name in days]
+            if os.path.exists(self._path('1h', month)):
+                parts.insert(0, self._read('1h', month))
+            merged = np.concatenate(parts)
+            # A rerun after a crash may see the same day twice; identical buckets are kept once
+            _, first = np.unique(np.stack([merged['series'].astype(np.float64), merged['t']]), axis=1,
+                                 return_index=True)
+            self._replace('1h', month, merged[np.sort(first)])
+            for name in days:
+                os.remove(self._path('5m', name))
+                done['5m'] += 1
+
+        if self.hourly_days is not None:
+            for name in self._segments('1h'):
+                if _segment_end(name) < today - self.hourly_days * DAY:
+                    os.remove(self._path('1h', name))
+                    done['1h'] += 1
+        return done
+
+    def query(self, url, metric, start=None, end=None):
+        """Samples of one series as ``t``, ``mean``, ``min``, ``max`` and ``count`` arrays in time order
+
+        Old data comes from the rollup tiers; only segments overlapping ``[start, end)`` are read.
+        """
+        series_id = self._series_ids.get((url, metric))
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        columns = {'t': [], 'mean': [], 'min': [], 'max': [], 'count': []}
+        if series_id is None:
+            return {key: np.empty(0) for key in columns}
+        for tier in ('1h', '5m', 'raw'):
+            for name in self._segments(tier):
+                if _segment_end(name) <= start or _segment_start(name) >= end:
+                    continue
+                records = self._read(tier, name)
+                records = records[(records['series'] == series_id) & (records['t'] >= start) & (records['t'] < end)]
+                columns['t'].append(records['t'])
+                if tier == 'raw':
+                    for key in ('mean', 'min', 'max'):
+                        columns[key].append(records['value'])
+                    columns['count'].append(np.ones(len(records)))
+                else:
+                    columns['mean'].append(records['sum'] / records['count'])
+                    columns['min'].append(records['min'])
+                    columns['max'].append(records['max'])
+                    columns['count'].append(records['count'].astype(np.float64))
+        result = {key: np.concatenate(parts) if parts else np.empty(0) for key, parts in columns.items()}
+        order = np.argsort(result['t'], kind='stable')
+        return {key: values[order] for key, values in result.items()}
+
+    def size(self):
+        total = 0
+        for tier in TIERS:
+            for name in self._segments(tier):
+                total += os.path.getsize(self._path(tier, name))
+        return total
+
+def numeric_metrics(values, prefix=''):
+    """Numbers (and booleans as 0/1) of a check result, nested dicts flattened with dots"""
+    metrics = {}
+    for key, value in values.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, bool):
+            metrics[name] = float(value)
+        elif isinstance(value, (int, float)):
+            metrics[name] = float(value)
+        elif isinstance(value, list):
+            metrics[f'{name}_count'] = float(len(value))
+        elif isinstance(value, dict):
+            metrics.update(numeric_metrics(value, f'{name}.'))
+    return metrics
+
+def performance_metrics(url, samples=3):
+    from performance_check import check_performance
+
+    results = check_performance(url, samples=samples, concurrency=samples, simulate_compression=False)
+    metrics = {'up': float('error' not in results)}
+    for phase, summary in results.get('phases_ms', {}).items():
+        if summary.get('count'):
+            metrics[f'{phase}_p50_ms'] = summary['p50']
+    for key in ('page_size_bytes', 'transfer_size_bytes', 'uses_compression'):
+        if key in results:
+            metrics[key] = float(results[key])
+    return metrics
+
+def page_metrics(url, analyzer=None):
+    from seo_analyzer import SEOAnalyzer
+
+    analyzer = analyzer or SEOAnalyzer(url, cache_dir=None, index_path=None)
+    return numeric_metrics(analyzer.analyze_page())
+
+def site_metrics(url, analyzer=None):
+    from seo_analyzer import SEOAnalyzer
+
+    analyzer = analyzer or SEOAnalyzer(url, cache_dir=None, index_path=None)
+    sitemaps = analyzer.check_sitemap()
+    certificate = analyzer.check_ssl()
+    metrics = {
+        'robots_txt': float(analyzer.check_robots_txt()['exists']),
+        'sitemaps': float(len(sitemaps)),
+        'sitemap_urls': float(sum(sitemap.get('urls', 0) for sitemap in sitemaps)),
+        'ssl_enabled': float(certificate['ssl_enabled']),
+        'ssl_verified': float(certificate['verified']),
+    }
+    if certificate.get('expires_at'):
+        metrics['ssl_days_left'] = (certificate['expires_at'] - time.time()) / DAY
+    if certificate.get('handshake_ms') is not None:
+        metrics['tls_handshake_ms'] = certificate['handshake_ms']
+    return metrics
+
+JOBS = {'performance': performance_metrics, 'page': page_metrics, 'site': site_metrics}
+# Jobs that take an SEOAnalyzer, which the monitor keeps per job and target across runs
+ANALYZER_JOBS = ('page', 'site')
+
+class Monitor:
+    """Runs every job for every URL on its interval and appends the results to a store"""
+
+    def __init__(self, urls, store, intervals=None, workers=4, compact_every=3600, jobs=JOBS):
+        self.urls = urls
+        self.store = store
+        self.intervals = dict(JOB_INTERVALS, **(intervals or {}))
+        self.workers = workers
+        self.compact_every = compact_every
+        self.jobs = jobs
+        self.stats = {'runs': 0, 'failures': 0, 'samples': 0, 'compactions': 0}
+        self._analyzers = {}
+
+    def _analyzer(self, job, url):
+        analyzer = self._analyzers.get((job, url))
+        if analyzer is None:
+            from seo_analyzer import SEOAnalyzer
+
+            # One session, resolver and robots cache per target instead of new ones every run
+            analyzer = self._analyzers[(job, url)] = SEOAnalyzer(url, cache_dir=None, index_path=None)
+            if job == 'site':
+                # The site check reports whether robots.txt exists, so it is fetched every run
+                analyzer.robots.ttl = 0
+        return analyzer
+
+    def _submit(self, executor, job, url):
+        if job in ANALYZER_JOBS:
+            return executor.submit(self.jobs[job], url, self._analyzer(job, url))
+        return executor.submit(self.jobs[job], url)
+
+    def close(self):
+        for analyzer in self._analyzers.values():
+            analyzer.session.close()
+        self._analyzers.clear()
+
+    def _targets(self, job):
+        if job != 'site':
+            return self.urls
+        # Site checks run once per origin
+        return list(dict.fromkeys(f'{urlsplit(url).scheme}://{urlsplit(url).netloc}/' for url in self.urls))
+
+    def _record(self, job, url, future):
+        self.stats['runs'] += 1
+        try:
+            metrics = future.result()
+        except Exception as e:
+            self.stats['failures'] += 1
+            print(f"{job} check of {url} failed: {e}", file=sys.stderr)
+            metrics = {'up': 0.0} if job == 'performance' else {}
+        if metrics:
+            self.stats['samples'] += self.store.append(url, {f'{job}.{name}': value for name, value in metrics.items()})
+
+    def run(self, duration=None):
+        """Run until interrupted (or for ``duration`` seconds); jobs never overlap for the same target"""
+        started = time.time()
+        queue = [(started, job, url) for job in self.jobs for url in self._targets(job)]
+        heapq.heapify(queue)
+        next_compaction = started
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while duration is None or time.time() - started < duration:
+                    now = time.time()
+                    for key, future in list(running.items()):
+                        if future.done():
+                            self._record(*key, future)
+                            del running[key]
+                    while queue and queue[0][0] <= now:
+                        due, job, url = heapq.heappop(queue)
+                        if (job, url) not in running:
+                            running[(job, url)] = self._submit(executor, job, url)
+                        # Fixed-rate schedule; a slow run skips ahead instead of bunching up
+                        next_due = due + self.intervals[job]
+                        while next_due <= now:
+                            next_due += self.intervals[job]
+                        heapq.heappush(queue, (next_due, job, url))
+                    if now >= next_compaction:
+                        self.store.compact(now)
+                        self.stats['compactions'] += 1
+                        next_compaction = now + self.compact_every
+                    time.sleep(max(0.0, min(queue[0][0] - time.time(), 1.0)) if queue else 1.0)
+            except KeyboardInterrupt:
+                pass
+            for key, future in running.items():
+                self._record(*key, future)
+        self.close()
+        return self.stats
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Continuous SEO/performance monitoring')
+    arg_parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    retention = argparse.ArgumentParser(add_help=False)
+    retention.add_argument('--raw-days', type=float, default=RETENTION_DAYS['raw'],
+                           help='days of raw samples before they are rolled up into 5-minute buckets')
+    retention.add_argument('--five-minute-days', type=float, default=RETENTION_DAYS['5m'],
+                           help='days of 5-minute buckets before they are rolled up into hourly buckets')
+    retention.add_argument('--hourly-days', type=float, default=RETENTION_DAYS['1h'],
+                           help='days hourly buckets are kept before they are deleted')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', parents=[retention], help='run the monitoring daemon')
+    run_parser.add_argument('urls', nargs='*', default=['https://www.tln-werbemittel.de/'])
+    run_parser.add_argument('--interval', type=float, default=JOB_INTERVALS['performance'],
+                            help='performance check interval in seconds')
+    run_parser.add_argument('--page-interval', type=float, default=JOB_INTERVALS['page'])
+    run_parser.add_argument('--site-interval', type=float, default=JOB_INTERVALS['site'])
+    run_parser.add_argument('--workers', type=int, default=4)
+    run_parser.add_argument('--duration', type=float, default=None, help='stop after this many seconds')
+    query_parser = commands.add_parser('query', help='print one series')
+    query_parser.add_argument('url')
+    query_parser.add_argument('metric', help='e.g. performance.ttfb_p50_ms')
+    query_parser.add_argument('--hours', type=float, default=24)
+    commands.add_parser('compact', parents=[retention], help='roll up and expire old data now')
+    commands.add_parser('series', help='list stored series')
+    args = arg_parser.parse_args()
+
+    if args.command in ('run', 'compact'):
+        store = TimeSeriesStore(args.store, args.raw_days, args.five_minute_days, args.hourly_days)
+    else:
+        store = TimeSeriesStore(args.store)
+    if args.command == 'run':
+        intervals = {'performance': args.interval, 'page': args.page_interval, 'site': args.site_interval}
+        monitor = Monitor(args.urls, store, intervals, args.workers)
+        print(f"Monitoring {len(args.urls)} URLs into {args.store} (Ctrl+C to stop)")
+        print(monitor.run(args.duration))
+    elif args.command == 'query':
+        result = store.query(args.url, args.metric, start=time.time() - args.hours * 3600)
+        for t, mean, low, high, count in zip(*(result[key] for key in ('t', 'mean', 'min', 'max', 'count'))):
+            stamp = datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{stamp}  {mean:12.2f}  (min {low:.2f}, max {high:.2f}, n={count:.0f})")
+    elif args.command == 'compact':
+        print(store.compact(), f"{store.size() / 1024 / 1024:.1f} MB stored")
+    else:
+        for url, metric in store.series:
+            print(f"{url}  {metric}")
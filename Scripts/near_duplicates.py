@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Near-duplicate content detection with MinHash and an LSH index
+
+The visible text of each page is split into word shingles, fingerprinted
+with a MinHash signature and bucketed by LSH bands. Only pages sharing a
+bucket are compared, so clustering a large catalogue of near-identical
+variant pages stays far below the O(n^2) cost of comparing every pair.
+"""
+import re
+import sys
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from parser_backends import get_backend
+
+# Prime just above 2**32: with 32-bit shingle hashes and coefficients,
+# a * x + b stays below 2**64, so the permutations are exact in uint64
+HASH_PRIME = np.uint64(4294967311)
+WORD_RE = re.compile(r'\w+')
+
+def visible_text(html):
+    """Visible page text (script/style/template excluded), via the lxml event backend"""
+    return get_backend('lxml').extract(html, keep_text=True).visible_text()
+
+def shingles(text, size=5):
+    """Set of hashed word n-grams of the normalized text"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """MinHash signature of ``text``, or None when it has no words"""
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return None
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        permuted = (self._a[:, None] * x[None, :] + self._b[:, None]) % HASH_PRIME
+        return permuted.min(axis=1)
+
+    def html_signature(self, html):
+        return self.signature(visible_text(html))
+
+def estimated_similarity(sig_a, sig_b):
+    """Jaccard similarity estimate of two MinHash signatures"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+class LSHIndex:
+    """Banded LSH index over MinHash signatures"""
+
+    def __init__(self, num_perm=128, bands=16, max_bucket_pairs=64):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Buckets above this size are verified against one representative
+        # instead of all pairs, which keeps masses of identical pages linear
+        self.max_bucket_pairs = max_bucket_pairs
+        self.keys = []
+        self._signatures = []
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, signature):
+        if signature is None:
+            return
+        doc_id = len(self.keys)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        for band, buckets in enumerate(self._buckets):
+            band_hash = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            buckets[band_hash].append(doc_id)
+
+    def candidate_pairs(self):
+        """Yield doc-id pairs that share at least one band bucket"""
+        seen = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                if len(members) * (len(members) - 1) // 2 > self.max_bucket_pairs:
+                    pairs = ((members[0], other) for other in members[1:])
+                else:
+                    pairs = ((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+                for pair in pairs:
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+
+    def clusters(self, threshold=0.8):
+        """Near-duplicate clusters as lists of ``(key, similarity_to_first)``, largest first"""
+        union_find = _UnionFind()
+        for a, b in self.candidate_pairs():
+            if estimated_similarity(self._signatures[a], self._signatures[b]) >= threshold:
+                union_find.union(a, b)
+
+        groups = defaultdict(list)
+        for doc_id in list(union_find.parent):
+            groups[union_find.find(doc_id)].append(doc_id)
+
+        clusters = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            members.sort()
+            first = self._signatures[members[0]]
+            clusters.append([
+                (self.keys[doc_id], round(estimated_similarity(first, self._signatures[doc_id]), 3))
+                for doc_id in members
+            ])
+        clusters.sort(key=len, reverse=True)
+        return clusters
+
+    def save(self, path):
+        signatures = np.vstack(self._signatures) if self._signatures else np.empty((0, self.num_perm), np.uint64)
+        np.savez_compressed(path, keys=np.array(self.keys, dtype=object), signatures=signatures,
+                            bands=self.bands)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        data = np.load(path, allow_pickle=True)
+        signatures = data['signatures']
+        index = cls(num_perm=signatures.shape[1], bands=int(data['bands']), **kwargs)
+        for key, signature in zip(data['keys'], signatures):
+            index.add(str(key), signature)
+        return index
+
+def find_near_duplicates(pages, threshold=0.8, hasher=None, index=None):
+    """Cluster ``(key, html)`` pairs into near-duplicate groups"""
+    hasher = hasher or MinHasher()
+    if index is None:
+        index = LSHIndex(num_perm=hasher.num_perm)
+    for key, html in pages:
+        index.add(key, hasher.html_signature(html))
+    return index.clusters(threshold)
+
+if __name__ == "__main__":
+    from batch_analyze import find_html_files
+
+    source = sys.argv[1] if len(sys.argv) > 1 else '.'
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+
+    def pages():
+        for path in find_html_files(source):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                yield path, f.read()
+
+    clusters = find_near_duplicates(pages(), threshold)
+    print(f"Found {len(clusters)} near-duplicate clusters (Jaccard >= {threshold})")
+    for i, cluster in enumerate(clusters, 1):
+        print(f"\n{i}. {len(cluster)} pages")
+        for key, similarity in cluster[:10]:
+            print(f"   {similarity:.2f}  {key}")
+        if len(cluster) > 10:
+            print(f"   ... and {len(cluster) - 10} more")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Pluggable HTML parser backends
+
+``bs4`` builds a full BeautifulSoup tree (the original code path). ``lxml``
+drives the single-pass HTMLFeatureExtractor straight from lxml's parser
+target events, so no Python object is created per node. Both backends
+produce identical results; pick one per run with the ``parser`` argument
+or the SEO_PARSER environment variable.
+"""
+import os
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from html_extractor import SITE_DOMAIN, HTMLFeatureExtractor, sink_links, walk_soup
+
+DEFAULT_PARSER = os.environ.get('SEO_PARSER', 'bs4')
+
+class BeautifulSoupBackend:
+    name = 'bs4'
+
+    def extract(self, html, site_domain=SITE_DOMAIN, keep_text=False):
+        """Run the feature extractor over a BeautifulSoup tree"""
+        soup = BeautifulSoup(html, 'lxml')
+        return walk_soup(soup, HTMLFeatureExtractor(site_domain, keep_text))
+
+    def html_features(self, html, site_domain=SITE_DOMAIN):
+        return self.extract(html, site_domain).result()
+
+    def page_metrics(self, url, domain, html, link_sink=None, external_sink=None):
+        soup = BeautifulSoup(html, 'lxml')
+        analysis = {}
+
+        # Meta tags
+        analysis['title'] = soup.find('title').text if soup.find('title') else None
+        analysis['title_length'] = len(analysis['title']) if analysis['title'] else 0
+
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        analysis['meta_description'] = meta_desc.get('content') if meta_desc else None
+        analysis['meta_description_length'] = len(analysis['meta_description']) if analysis['meta_description'] else 0
+
+        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+        analysis['meta_keywords'] = meta_keywords.get('content') if meta_keywords else None
+
+        # Canonical URL
+        canonical = soup.find('link', attrs={'rel': 'canonical'})
+        analysis['canonical_url'] = canonical.get('href') if canonical else None
+
+        # Language
+        analysis['language'] = soup.find('html').get('lang') if soup.find('html') else None
+
+        # Headings
+        analysis['h1_tags'] = [h1.text.strip() for h1 in soup.find_all('h1')]
+        analysis['h2_tags'] = [h2.text.strip() for h2 in soup.find_all('h2')]
+        analysis['h3_tags'] = [h3.text.strip() for h3 in soup.find_all('h3')]
+
+        # Images
+        images = soup.find_all('img')
+        analysis['total_images'] = len(images)
+        analysis['images_without_alt'] = len([img for img in images if not img.get('alt')])
+
+        # Links
+        links = soup.find_all('a', href=True)
+        internal_links = []
+        external_links = []
+
+        for link in links:
+            href = link['href']
+            if href.startswith('http'):
+                if domain in href:
+                    internal_links.append(href)
+                else:
+                    external_links.append(href)
+            elif href.startswith('/'):
+                internal_links.append(urljoin(url, href))
+
+        analysis['internal_links'] = len(internal_links)
+        sink_links(url, domain, (link['href'] for link in links), link_sink, external_sink)
+        analysis['external_links'] = len(external_links)
+        analysis['total_links'] = len(links)
+
+        # Open Graph tags
+        og_tags = {}
+        for tag in soup.find_all('meta', property=True):
+            if tag['property'].startswith('og:'):
+                og_tags[tag['property']] = tag.get('content')
+        analysis['open_graph_tags'] = og_tags
+
+        # Schema markup
+        schema_scripts = soup.find_all('script', type='application/ld+json')
+        analysis['schema_markup_count'] = len(schema_scripts)
+
+        # Mobile viewport
+        viewport = soup.find('meta', attrs={'name': 'viewport'})
+        analysis['viewport_meta'] = viewport.get('content') if viewport else None
+
+        return analysis
+
+class LxmlEventBackend:
+    name = 'lxml'
+
+    def extract(self, html, site_domain=SITE_DOMAIN, keep_text=False):
+        """Feed lxml parser events straight into the feature extractor"""
+        parser = etree.HTMLParser(target=HTMLFeatureExtractor(site_domain, keep_text))
+        parser.feed(html)
+        return parser.close()
+
+    def html_features(self, html, site_domain=SITE_DOMAIN):
+        return self.extract(html, site_domain).result()
+
+    def page_metrics(self, url, domain, html, link_sink=None, external_sink=None):
+        return self.extract(html).page_metrics(url, domain, link_sink, external_sink)
+
+BACKENDS = {
+    BeautifulSoupBackend.name: BeautifulSoupBackend(),
+    LxmlEventBackend.name: LxmlEventBackend(),
+}
+
+def get_backend(name=None):
+    name = name or DEFAULT_PARSER
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {name!r}, choose from {sorted(BACKENDS)}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Phase-level HTTP timing probe
+
+Each sample opens a fresh connection and times the request phases the way
+the browser's Navigation Timing does: redirects, DNS lookup, TCP connect,
+TLS handshake, time to first byte (request sent until the response headers
+are in) and body transfer. Samples run on a thread pool with configurable
+concurrency and every phase is recorded in a mergeable histogram, so
+p50/p90/p99 per phase come out of one pass and probes from several runs or
+machines can be combined.
+"""
+import argparse
+import http.client
+import socket
+import ssl
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from histogram import LatencyHistogram
+from seo_analyzer import USER_AGENT
+
+PHASES = ('redirect', 'dns', 'connect', 'tls', 'ttfb', 'transfer', 'total')
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+DEFAULT_HEADERS = {'User-Agent': USER_AGENT, 'Accept': '*/*', 'Accept-Encoding': 'gzip, deflate'}
+
+def ssl_context(verify=True):
+    """Client context; ``verify`` may also be the path of a CA bundle (e.g. a stand-in certificate)"""
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+    return ssl.create_default_context(cafile=verify if isinstance(verify, str) else None)
+
+def _timed_request(url, context, headers, timeout):
+    """One request on a new connection; returns (phase ms, response, body)"""
+    parts = urlsplit(url)
+    https = parts.scheme == 'https'
+    port = parts.port or (443 if https else 80)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    phases = {}
+
+    started = time.perf_counter()
+    family, kind, proto, _, address = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)[0]
+    resolved = time.perf_counter()
+    phases['dns'] = (resolved - started) * 1000
+
+    sock = socket.socket(family, kind, proto)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        connected = time.perf_counter()
+        phases['connect'] = (connected - resolved) * 1000
+        if https:
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+        secured = time.perf_counter()
+        phases['tls'] = (secured - connected) * 1000
+
+        # The connection class only decides the Host header (no port when it is the
+        # scheme's default, like browsers); the socket is already connected and wrapped
+        connection_class = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        connection = connection_class(parts.hostname, port, timeout=timeout)
+        connection.sock = sock
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        first_byte = time.perf_counter()
+        phases['ttfb'] = (first_byte - secured) * 1000
+
+        body = response.read()
+        finished = time.perf_counter()
+        phases['transfer'] = (finished - first_byte) * 1000
+        phases['total'] = (finished - started) * 1000
+    finally:
+        sock.close()
+    return phases, response, body
+
+def probe_once(url, context=None, headers=None, timeout=30, max_redirects=5):
+    """Time one page load on fresh connections, following redirects
+
+    Phases are those of the final response; time spent on earlier hops is
+    reported as ``redirect`` and included in ``total``.
+    """
+    context = context or ssl_context()
+    headers = headers or DEFAULT_HEADERS
+    redirect_ms = 0.0
+    chain = []
+    try:
+        while True:
+            phases, response, body = _timed_request(url, context, headers, timeout)
+            location = response.getheader('Location')
+            if response.status not in REDIRECT_STATUSES or not location or len(chain) >= max_redirects:
+                break
+            chain.append({'url': url, 'status': response.status})
+            redirect_ms += phases['total']
+            url = urljoin(url, location)
+    except (OSError, http.client.HTTPException) as e:
+        return {'url': url, 'redirects': chain, 'error': f'{type(e).__name__}: {e}'}
+
+    phases['redirect'] = redirect_ms
+    phases['total'] += redirect_ms
+    return {
+        'url': url,
+        'redirects': chain,
+        'status': response.status,
+        'version': response.version,
+        'phases': phases,
+        'headers': response.headers,
+        'body': body
+    }
+
+def decode_body(body, content_encoding):
+    """Body after gzip/deflate content decoding, or None if it cannot be decoded here (e.g. brotli)"""
+    encoding = (content_encoding or '').lower()
+    try:
+        if 'gzip' in encoding:
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        if 'deflate' in encoding:
+            return zlib.decompress(body)
+    except zlib.error:
+        return None
+    if encoding and encoding != 'identity':
+        return None
+    return body
+
+def decoded_size(body, content_encoding):
+    """Size of the body after content decoding (bodies that cannot be decoded are left as they are)"""
+    decoded = decode_body(body, content_encoding)
+    return len(decoded if decoded is not None else body)
+
+class PhaseProbe:
+    def __init__(self, samples=10, concurrency=1, timeout=30, verify=True, headers=None, max_redirects=5):
+        self.samples = samples
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.max_redirects = max_redirects
+        self.context = ssl_context(verify)
+        self.histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.errors = []
+        # First successful sample, kept for header checks
+        self.response = None
+
+    def _sample(self, url):
+        return probe_once(url, self.context, self.headers, self.timeout, self.max_redirects)
+
+    def run(self, url):
+        """Take ``samples`` samples of ``url`` and return a phase report"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for sample in executor.map(self._sample, [url] * self.samples):
+                if 'error' in sample:
+                    self.errors.append(sample['error'])
+                    continue
+                if self.response is None:
+                    self.response = sample
+                for phase, value in sample['phases'].items():
+                    self.histograms[phase].record(value)
+        elapsed = time.perf_counter() - started
+        return self.report(url, elapsed)
+
+    def report(self, url, elapsed=None):
+        report = {
+            'url': url,
+            'samples': self.samples,
+            'concurrency': self.concurrency,
+            'errors': len(self.errors),
+            'phases_ms': {phase: histogram.summary() for phase, histogram in self.histograms.items()},
+        }
+        if self.errors:
+            report['first_error'] = self.errors[0]
+        if self.response is not None:
+            report['final_url'] = self.response['url']
+            report['redirects'] = self.response['redirects']
+        if elapsed is not None:
+            report['elapsed'] = round(elapsed, 3)
+        return report
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Phase-level HTTP timing probe')
+    arg_parser.add_argument('url', nargs='?', default='https://www.tln-werbemittel.de')
+    arg_parser.add_argument('--samples', type=int, default=20)
+    arg_parser.add_argument('--concurrency', type=int, default=4)
+    arg_parser.add_argument('--timeout', type=float, default=30)
+    arg_parser.add_argument('--insecure', action='store_true', help='do not verify TLS certificates')
+    args = arg_parser.parse_args()
+
+    probe = PhaseProbe(args.samples, args.concurrency, args.timeout, verify=not args.insecure)
+    report = probe.run(args.url)
+    print(f"{report['samples']} samples of {report.get('final_url', args.url)} "
+          f"({report['concurrency']} concurrent, {report['errors']} errors) in {report.get('elapsed', 0):.2f}s")
+    print(f"\n{'Phase':10} {'p50':>10} {'p90':>10} {'p99':>10}")
+    for phase, summary in report['phases_ms'].items():
+        if summary['count']:
+            print(f"{phase:10} {summary['p50']:8.1f}ms {summary['p90']:8.1f}ms {summary['p99']:8.1f}ms")
+    if report['errors']:
+        print(f"\nFirst error: {report['first_error']}")
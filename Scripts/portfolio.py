@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Portfolio audits: run_full_analysis for many domains in parallel
+
+Every domain gets its own SEOAnalyzer, so no per-domain state is shared
+between threads, while the HTTP session (connection pools and cache), the
+results index, the DNS cache (warmed for every domain in one concurrent
+batch up front) and the TLS scanner are shared by all of them. Only a
+bounded number of domains is in flight at a time; each report is written
+to its own JSON file as soon as the domain finishes and a one-line summary
+is appended to portfolio_summary.jsonl, so memory does not grow with the
+portfolio and an interrupted run can resume where it stopped. Certificate
+expiry dates are collected in tls_expiry_index.json.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dns_cache import CachingResolver, install_resolver, is_ip_address
+from http_cache import DEFAULT_CACHE_DIR, install_cache
+from results_index import DEFAULT_INDEX_PATH, ResultsIndex
+from seo_analyzer import USER_AGENT, SEOAnalyzer
+from tls_scan import ExpiryIndex, TLSScanner, print_expiring
+
+DEFAULT_OUTPUT_DIR = 'portfolio_reports'
+SUMMARY_FILE = 'portfolio_summary.jsonl'
+EXPIRY_INDEX_FILE = 'tls_expiry_index.json'
+
+def read_domains(path):
+    """Domains (or URLs) from a text file, one per line; blank lines and # comments are skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+def domain_url(domain):
+    return domain if '://' in domain else f'https://{domain}/'
+
+def report_filename(domain):
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', urlparse(domain_url(domain)).netloc) + '.json'
+
+def summarize_report(report):
+    """The headline fields of one domain report for the summary file"""
+    home = report.get('homepage_analysis') or {}
+    timings = report.get('task_timings', {})
+    return {
+        'domain': report['domain'],
+        'status_code': home.get('status_code'),
+        'title_length': home.get('title_length'),
+        'meta_description_length': home.get('meta_description_length'),
+        'images_without_alt': home.get('images_without_alt'),
+        'robots_txt': report.get('robots_txt', {}).get('exists'),
+        'sitemaps': len(report.get('sitemaps') or []),
+        'sitemap_urls_blocked': (report.get('sitemap_robots') or {}).get('blocked'),
+        'ssl_enabled': report.get('ssl_certificate', {}).get('ssl_enabled'),
+        'ssl_verified': report.get('ssl_certificate', {}).get('verified'),
+        'ssl_expires': report.get('ssl_certificate', {}).get('expires'),
+        'failed_checks': [name for name, timing in timings.get('tasks', {}).items() if timing['status'] != 'ok'],
+        'elapsed': timings.get('elapsed'),
+    }
+
+class PortfolioRunner:
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, workers=8, cache_dir=DEFAULT_CACHE_DIR,
+                 index_path=DEFAULT_INDEX_PATH, parser=None, session=None, resolver=None, **analysis_options):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.parser = parser
+        self.analysis_options = analysis_options
+        self.cache = None
+        self.resolver = resolver or CachingResolver()
+        self.session = session or self._make_session(cache_dir)
+        self.results_index = ResultsIndex(index_path) if index_path else None
+        self.tls_scanner = TLSScanner(resolver=self.resolver)
+        self.expiry_index = ExpiryIndex.load(os.path.join(output_dir, EXPIRY_INDEX_FILE))
+        self.stats = {'domains': 0, 'done': 0, 'errors': 0, 'resumed': 0}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _make_session(self, cache_dir):
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        # Every domain in flight runs several checks and crawls at once
+        pool = dict(pool_connections=self.workers * 4, pool_maxsize=self.workers * 4)
+        if cache_dir:
+            self.cache = install_cache(session, cache_dir, **pool)
+        else:
+            adapter = HTTPAdapter(**pool)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        install_resolver(session, self.resolver)
+        return session
+
+    def analyze_domain(self, domain):
+        # index_path=None: the shared index (or none at all), never a private one per domain
+        analyzer = SEOAnalyzer(domain_url(domain), parser=self.parser, index_path=None, session=self.session,
+                               results_index=self.results_index, resolver=self.resolver,
+                               tls_scanner=self.tls_scanner)
+        return analyzer.run_full_analysis(**self.analysis_options)
+
+    def _write(self, domain, report, summary_file):
+        path = os.path.join(self.output_dir, report_filename(domain))
+        temp = path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(temp, path)
+        summary = summarize_report(report) if 'error' not in report else {'domain': domain, 'error': report['error']}
+        summary_file.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        summary_file.flush()
+        certificate = report.get('ssl_certificate') or {}
+        if certificate.get('expires_at'):
+            self.expiry_index.add(certificate)
+
+    def run(self, domains, resume=False):
+        """Analyze every domain, writing each report as it finishes; returns the run stats"""
+        # Inputs naming the same host (a bare domain and a URL on it) share one report
+        unique = {}
+        for domain in domains:
+            unique.setdefault(report_filename(domain), domain)
+        domains = list(unique.values())
+        self.stats['domains'] += len(domains)
+        if resume:
+            todo = [domain for domain in domains
+                    if not os.path.exists(os.path.join(self.output_dir, report_filename(domain)))]
+            self.stats['resumed'] += len(domains) - len(todo)
+            domains = todo
+
+        started = time.perf_counter()
+        # check_dns and every fetch then find their answers in the cache
+        hostnames = [urlparse(domain_url(domain)).hostname for domain in domains]
+        self.resolver.resolve_many([hostname for hostname in hostnames if not is_ip_address(hostname)])
+        queue = iter(domains)
+        with open(os.path.join(self.output_dir, SUMMARY_FILE), 'a' if resume else 'w', encoding='utf-8') as summary_file, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            while True:
+                # Only ``workers`` domains are in flight, so finished reports never pile up
+                for domain in queue:
+                    pending[executor.submit(self.analyze_domain, domain)] = domain
+                    if len(pending) >= self.workers:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    domain = pending.pop(future)
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        report = {'domain': domain, 'error': f'{type(e).__name__}: {e}'}
+                        self.stats['errors'] += 1
+                    self._write(domain, report, summary_file)
+                    self.stats['done'] += 1
+                    print(f"[{self.stats['done']}/{len(domains)}] {domain} done", file=sys.stderr)
+
+        self.stats['elapsed'] = time.perf_counter() - started
+        self.expiry_index.save(os.path.join(self.output_dir, EXPIRY_INDEX_FILE))
+        if self.cache:
+            self.stats['http_cache'] = dict(self.cache.stats)
+        self.stats['dns'] = dict(self.resolver.stats)
+        return self.stats
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Full SEO analysis of a portfolio of domains')
+    arg_parser.add_argument('domains', help='text file with one domain or URL per line')
+    arg_parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR)
+    arg_parser.add_argument('--workers', type=int, default=8, help='domains analyzed at once')
+    arg_parser.add_argument('--timeout', type=float, default=300, help='deadline per domain in seconds')
+    arg_parser.add_argument('--sitemap-pages', type=int, default=0)
+    arg_parser.add_argument('--parser', choices=['bs4', 'lxml'], default=None)
+    arg_parser.add_argument('--resume', action='store_true', help='skip domains that already have a report')
+    args = arg_parser.parse_args()
+
+    runner = PortfolioRunner(args.output, args.workers, parser=args.parser, timeout=args.timeout,
+                             sitemap_pages=args.sitemap_pages)
+    stats = runner.run(read_domains(args.domains), resume=args.resume)
+    print(f"Analyzed {stats['done']} domains ({stats['errors']} failed, {stats['resumed']} already done) "
+          f"in {stats['elapsed']:.1f}s with {args.workers} workers")
+    print(f"Reports in {args.output}/, summary in {os.path.join(args.output, SUMMARY_FILE)}")
+    expiring = runner.expiry_index.expiring_within(14)
+    if expiring:
+        print(f"\n{len(expiring)} certificates expire within 14 days:")
+        print_expiring(expiring)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Shared PageSpeed Insights client
+
+Runs mobile and desktop (for any number of URLs) concurrently instead of
+one blocking call after another. Requests pass a token-bucket rate limiter
+sized to the API quota, transient failures (429, 5xx, timeouts) are
+retried with exponential backoff honouring Retry-After, and successful
+results are cached on disk per URL, strategy and UTC day, so re-running an
+analysis the same day costs no API calls.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PSI_ENDPOINT = 'https://www.googleapis.com/pagespeedonline/v5/runPagespeed'
+STRATEGIES = ('mobile', 'desktop')
+CATEGORIES = ('performance', 'accessibility', 'best-practices', 'seo')
+DEFAULT_PSI_CACHE_DIR = '.psi_cache'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CORE_WEB_VITALS = {
+    'first_contentful_paint': 'first-contentful-paint',
+    'largest_contentful_paint': 'largest-contentful-paint',
+    'cumulative_layout_shift': 'cumulative-layout-shift',
+    'total_blocking_time': 'total-blocking-time',
+    'speed_index': 'speed-index',
+}
+
+class TokenBucket:
+    """Thread-safe token bucket; ``reserve`` books a token and returns how long to wait for it"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is paid back by waiting until it refills
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+class PSICache:
+    """Gzipped PSI responses on disk, one file per URL, strategy, categories and UTC day"""
+
+    def __init__(self, directory=DEFAULT_PSI_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, strategy, categories, day=None):
+        day = day or time.strftime('%Y-%m-%d', time.gmtime())
+        key = '\n'.join([url, strategy, ','.join(categories), day])
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json.gz')
+
+    def get(self, url, strategy, categories):
+        try:
+            with gzip.open(self._path(url, strategy, categories), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, strategy, categories, data):
+        path = self._path(url, strategy, categories)
+        temp = f'{path}.{threading.get_ident()}.tmp'
+        with gzip.open(temp, 'wt', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp, path)
+
+class PSIClient:
+    def __init__(self, api_key=None, endpoint=PSI_ENDPOINT, rate=1.0, burst=2, concurrency=4, timeout=120,
+                 retries=3, backoff=2.0, categories=CATEGORIES, cache_dir=DEFAULT_PSI_CACHE_DIR, session=None):
+        self.api_key = api_key or os.environ.get('PSI_API_KEY')
+        self.endpoint = endpoint
+        self.limiter = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.categories = tuple(categories)
+        self.cache = PSICache(cache_dir) if cache_dir else None
+        self.session = session or self._make_session()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _count(self, name):
+        # fetch() runs on worker threads
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def _request(self, url, strategy):
+        params = {'url': url, 'strategy': strategy, 'category': list(self.categories)}
+        if self.api_key:
+            params['key'] = self.api_key
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            self._count('requests')
+            try:
+                response = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error, response = f'{type(e).__name__}: {e}', None
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        # Quota and captcha pages come back as 200 HTML
+                        error = f"HTTP 200 with a non-JSON body ({response.headers.get('Content-Type', 'no content type')})"
+                        break
+                error = f'HTTP {response.status_code}'
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            if attempt < self.retries:
+                self._count('retries')
+                time.sleep(self._retry_delay(attempt, response))
+        self._count('errors')
+        return {'error': error}
+
+    def fetch(self, url, strategy='mobile'):
+        """PSI response for one URL and strategy, from the day's cache when available"""
+        if self.cache:
+            cached = self.cache.get(url, strategy, self.categories)
+            if cached is not None:
+                self._count('cache_hits')
+                return cached
+        data = self._request(url, strategy)
+        if self.cache and 'error' not in data:
+            self.cache.put(url, strategy, self.categories, data)
+        return data
+
+    async def run(self, urls, strategies=STRATEGIES):
+        """Fetch every URL/strategy pair concurrently; returns ``{url: {strategy: response}}``"""
+        loop = asyncio.get_running_loop()
+        pairs = [(url, strategy) for url in dict.fromkeys(urls) for strategy in strategies]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            responses = await asyncio.gather(*(
+                loop.run_in_executor(executor, self.fetch, url, strategy) for url, strategy in pairs
+            ))
+        results = {}
+        for (url, strategy), data in zip(pairs, responses):
+            results.setdefault(url, {})[strategy] = data
+        return results
+
+    def run_all(self, urls, strategies=STRATEGIES):
+        """Synchronous entry point for ``run``"""
+        return asyncio.run(self.run(urls, strategies))
+
+def summarize(data):
+    """Category scores and Core Web Vitals display values of a PSI response"""
+    if 'error' in data:
+        return {'error': data['error']}
+    lighthouse = data.get('lighthouseResult', {})
+    categories = lighthouse.get('categories', {})
+    audits = lighthouse.get('audits', {})
+    summary = {
+        'performance_score': (categories.get('performance', {}).get('score') or 0) * 100,
+        'accessibility_score': (categories.get('accessibility', {}).get('score') or 0) * 100,
+        'seo_score': (categories.get('seo', {}).get('score') or 0) * 100,
+        'best_practices_score': (categories.get('best-practices', {}).get('score') or 0) * 100,
+        'core_web_vitals': {name: audits.get(audit_id, {}).get('displayValue', 'N/A')
+                            for name, audit_id in CORE_WEB_VITALS.items()}
+    }
+    field = data.get('loadingExperience', {}).get('metrics')
+    if field:
+        summary['field_data'] = {name: metric.get('percentile') for name, metric in field.items()}
+    return summary
+
+def psi_standin_app(lighthouse_result, throttle_first=0):
+    """Stand-in server app for the PSI endpoint, answering with a fixed Lighthouse result
+
+    The first ``throttle_first`` requests get a 429 with ``Retry-After: 0``.
+    """
+    state = {'requests': 0}
+    lock = threading.Lock()
+
+    def app(method, path, headers):
+        with lock:
+            state['requests'] += 1
+            throttled = state['requests'] <= throttle_first
+        if throttled:
+            return 429, {'Content-Type': 'application/json', 'Retry-After': '0'}, b'{"error": {"code": 429}}'
+        query = parse_qs(urlsplit(path).query)
+        strategy = query.get('strategy', ['mobile'])[0]
+        result = dict(lighthouse_result, requestedUrl=query.get('url', [''])[0],
+                      configSettings={'formFactor': strategy})
+        body = json.dumps({'id': result['requestedUrl'], 'lighthouseResult': result, 'loadingExperience': {}})
+        return 200, {'Content-Type': 'application/json'}, body.encode('utf-8')
+    return app
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='PageSpeed Insights for many URLs')
+    arg_parser.add_argument('urls', nargs='*', default=['https://www.tln-werbemittel.de'])
+    arg_parser.add_argument('--strategies', default=','.join(STRATEGIES))
+    arg_parser.add_argument('--rate', type=float, default=1.0, help='requests per second')
+    arg_parser.add_argument('--concurrency', type=int, default=4)
+    arg_parser.add_argument('--endpoint', default=PSI_ENDPOINT)
+    arg_parser.add_argument('--no-cache', action='store_true')
+    args = arg_parser.parse_args()
+
+    client = PSIClient(endpoint=args.endpoint, rate=args.rate, concurrency=args.concurrency,
+                       cache_dir=None if args.no_cache else DEFAULT_PSI_CACHE_DIR)
+    started = time.perf_counter()
+    results = client.run_all(args.urls, args.strategies.split(','))
+    summaries = {url: {strategy: summarize(data) for strategy, data in by_strategy.items()}
+                 for url, by_strategy in results.items()}
+    with open('pagespeed_insights.json', 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, indent=2)
+    print(json.dumps(summaries, indent=2))
+    print(f"\n{len(args.urls)} URLs in {time.perf_counter() - started:.1f}s: {client.stats}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Persistent analysis results keyed by URL, content hash and analyzer version
+
+Pages whose bytes are unchanged since the last run reuse the stored
+analysis without being parsed again. Bump ANALYZER_VERSION whenever the
+extracted metrics change so old results are recomputed.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+ANALYZER_VERSION = '4'
+DEFAULT_INDEX_PATH = '.seo_results.sqlite3'
+# Kinds holding a page's analysis; stats counts these, so each page counts once
+# however many auxiliary results (links, signatures, compression sizes) it has
+PAGE_KINDS = ('page:', 'html:')
+
+def content_hash(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+class ResultsIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, version=ANALYZER_VERSION):
+        self.path = path
+        self.version = version
+        self.stats = {'skipped': 0, 'recomputed': 0}
+        # The same counters per kind prefix ('page', 'links', 'minhash', ...)
+        self.kind_stats = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT,
+                kind TEXT,
+                content_hash TEXT,
+                analyzer_version TEXT,
+                result TEXT,
+                updated_at REAL,
+                PRIMARY KEY (url, kind)
+            )
+        """)
+
+    def lookup(self, url, kind, digest):
+        """Return the stored result if the content and analyzer version are unchanged"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT result FROM results WHERE url = ? AND kind = ? AND content_hash = ? '
+                'AND analyzer_version = ?', (url, kind, digest, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+            self._count(kind, 'skipped')
+        return json.loads(row[0])
+
+    def store(self, url, kind, digest, result):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                (url, kind, digest, self.version, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._count(kind, 'recomputed')
+
+    def _count(self, kind, name):
+        # Called with the lock held
+        counters = self.kind_stats.setdefault(kind.split(':', 1)[0], {'skipped': 0, 'recomputed': 0})
+        counters[name] += 1
+        if kind.startswith(PAGE_KINDS):
+            self.stats[name] += 1
+
+    def get_or_compute(self, url, kind, content, compute):
+        """Reuse the stored result for ``content`` or run ``compute()`` and store it"""
+        digest = content_hash(content)
+        result = self.lookup(url, kind, digest)
+        if result is None:
+            result = compute()
+            self.store(url, kind, digest, result)
+        return result
+
+    def summary(self):
+        total = self.stats['skipped'] + self.stats['recomputed']
+        return f"{self.stats['skipped']}/{total} pages unchanged and skipped, {self.stats['recomputed']} recomputed"
+
+    def close(self):
+        self._db.close()
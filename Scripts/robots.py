@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Compiled robots.txt rules, cached per host, for the crawler and sitemap audits
+
+robots.txt is parsed once per scheme and host (RFC 9309 groups, Allow,
+Disallow, Crawl-delay and Sitemap lines) and the group of our user agent is
+compiled into a RobotsMatcher: plain path prefixes go into a hash table
+probed once per distinct prefix length, and wildcard rules (``*`` and a
+trailing ``$``) become precompiled regular expressions, each gated by a
+substring test for its longest literal part. A typical check is a few dict
+lookups and substring tests plus at most a regex or two, however many rules
+the file has. As in Google's and the RFC's matching, the longest matching
+rule wins and Allow wins a tie. RobotsCache keeps the compiled rules for a
+day; a missing robots.txt (4xx) allows everything, while a server error or
+an unreachable host disallows everything for a few minutes.
+"""
+import argparse
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+import requests
+
+DAY = 86400
+# RFC 9309: crawlers must parse at least 500 KiB; the rest is ignored
+MAX_ROBOTS_BYTES = 500 * 1024
+# Characters kept as they are when normalizing paths and patterns; everything else is percent-encoded
+_SAFE = "/?=&;:@!$'()*+,%~-._[]"
+
+def _normalize(path):
+    return path if path.isascii() and ' ' not in path else quote(path, safe=_SAFE)
+
+def path_of(url):
+    """Path and query of an absolute URL (or a path), as robots rules see it"""
+    if not url.startswith('/'):
+        scheme_end = url.find('//')
+        start = url.find('/', scheme_end + 2 if scheme_end >= 0 else 0)
+        if start < 0:
+            query = url.find('?', scheme_end + 2 if scheme_end >= 0 else 0)
+            url = '/' + url[query:] if query >= 0 else '/'
+        else:
+            url = url[start:]
+    fragment = url.find('#')
+    return _normalize(url if fragment < 0 else url[:fragment])
+
+def parse_robots(text):
+    """robots.txt -> (groups, sitemaps); a group is {'agents', 'rules': [(allow, pattern)], 'crawl_delay'}"""
+    groups = []
+    sitemaps = []
+    group = None
+    in_agents = False
+    for line in text[:MAX_ROBOTS_BYTES].splitlines():
+        key, separator, value = line.split('#', 1)[0].partition(':')
+        if not separator:
+            continue
+        key = key.strip().lower()
+        value = value.strip()
+        if key == 'user-agent':
+            # Consecutive user-agent lines share one group
+            if not in_agents:
+                group = {'agents': [], 'rules': [], 'crawl_delay': None}
+                groups.append(group)
+                in_agents = True
+            group['agents'].append(value.lower())
+            continue
+        if key == 'sitemap':
+            if value:
+                sitemaps.append(value)
+            continue
+        in_agents = False
+        if group is None:
+            continue
+        if key in ('allow', 'disallow'):
+            group['rules'].append((key == 'allow', _normalize(value)))
+        elif key == 'crawl-delay':
+            try:
+                group['crawl_delay'] = max(float(value), 0.0)
+            except ValueError:
+                pass
+    return groups, sitemaps
+
+def product_token(user_agent):
+    """'Mozilla/5.0 (...)' -> 'mozilla'; groups are selected by this token"""
+    return user_agent.split('/', 1)[0].split(None, 1)[0].lower() if user_agent.strip() else '*'
+
+def _translate(pattern):
+    body = pattern[:-1] if pattern.endswith('$') else pattern
+    regex = '.*?'.join(re.escape(part) for part in re.sub(r'\*+', '*', body).split('*'))
+    return regex + r'\Z' if pattern.endswith('$') else regex
+
+class RobotsMatcher:
+    """The Allow/Disallow rules of one group, compiled for fast is-allowed checks"""
+
+    def __init__(self, rules):
+        literal = {}
+        wildcard = {}
+        for allow, pattern in rules:
+            # An empty Disallow (or Allow) matches nothing
+            if not pattern:
+                continue
+            table = wildcard if '*' in pattern or pattern.endswith('$') else literal
+            table[pattern] = table.get(pattern, False) or allow
+        self._literal = literal
+        self._lengths = sorted({len(pattern) for pattern in literal}, reverse=True)
+        # Most specific first, so the first wildcard rule that matches is the best one
+        self._wildcard = [(len(pattern), allow, pattern, re.compile(_translate(pattern)))
+                          for pattern, allow in sorted(wildcard.items(), key=lambda rule: (-len(rule[0]), not rule[1]))]
+        self._longest_wildcard = self._wildcard[0][0] if self._wildcard else 0
+        # A wildcard rule only matches paths containing its longest literal part; the
+        # substring tests rule out almost every rule before any regex runs
+        self._fragments = {}
+        for index, (_, _, pattern, _) in enumerate(self._wildcard):
+            fragment = max((pattern[:-1] if pattern.endswith('$') else pattern).split('*'), key=len)
+            self._fragments.setdefault(fragment, []).append(index)
+
+    def __len__(self):
+        return len(self._literal) + len(self._wildcard)
+
+    def match(self, path):
+        """The winning rule for ``path`` as (length, allow, pattern), or None when no rule matches"""
+        best = None
+        size = len(path)
+        for length in self._lengths:
+            if length <= size:
+                prefix = path[:length]
+                allow = self._literal.get(prefix)
+                if allow is not None:
+                    best = (length, allow, prefix)
+                    break
+        if self._wildcard and (best is None or best[0] <= self._longest_wildcard):
+            candidates = [index for fragment, indexes in self._fragments.items() if fragment in path
+                          for index in indexes]
+            for index in sorted(candidates):
+                length, allow, pattern, regex = self._wildcard[index]
+                if best is not None and (length, allow) < best[:2]:
+                    break
+                if regex.match(path):
+                    if best is None or (length, allow) > best[:2]:
+                        best = (length, allow, pattern)
+                    break
+        return best
+
+    def allowed(self, path):
+        best = self.match(path)
+        return best is None or best[1]
+
+class RobotsTxt:
+    """The rules of one robots.txt that apply to ``user_agent``"""
+
+    def __init__(self, text='', user_agent='*', status=200):
+        self.status = status
+        self.text = text[:MAX_ROBOTS_BYTES]
+        groups, self.sitemaps = parse_robots(self.text)
+        token = product_token(user_agent)
+        selected = [group for group in groups if token in group['agents']] or \
+                   [group for group in groups if '*' in group['agents']]
+        # Several groups naming the same agent are combined
+        self.rules = [rule for group in selected for rule in group['rules']]
+        delays = [group['crawl_delay'] for group in selected if group['crawl_delay'] is not None]
+        self.crawl_delay = delays[0] if delays else None
+        self.matcher = RobotsMatcher(self.rules)
+
+    @classmethod
+    def disallow_all(cls, status=None):
+        return cls('User-agent: *\nDisallow: /', status=status)
+
+    def match(self, url):
+        """(allow, pattern) of the rule deciding ``url`` (a URL or a path), or None if no rule applies"""
+        path = path_of(url)
+        if path == '/robots.txt':
+            return None
+        best = self.matcher.match(path)
+        return best[1:] if best else None
+
+    def allowed(self, url):
+        path = path_of(url)
+        return path == '/robots.txt' or self.matcher.allowed(path)
+
+    def allowed_many(self, urls):
+        """Is-allowed flags of many URLs of this host, in input order"""
+        allowed = self.matcher.allowed
+        return [allowed(path_of(url)) for url in urls]
+
+class RobotsCache:
+    """Compiled robots.txt per scheme and host, refetched after ``ttl`` seconds; thread-safe"""
+
+    def __init__(self, session=None, user_agent=None, ttl=DAY, error_ttl=300, timeout=5):
+        self.session = session or requests.Session()
+        self.user_agent = user_agent or self.session.headers.get('User-Agent', '*')
+        self.ttl = ttl
+        # Unreachable robots.txt disallow everything, so they are retried sooner
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self._cache = {}
+        self._fetching = {}
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'fetches': 0, 'missing': 0, 'errors': 0}
+
+    def _fetch(self, origin):
+        try:
+            response = self.session.get(origin + '/robots.txt', timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            self.stats['errors'] += 1
+            return RobotsTxt.disallow_all(), self.error_ttl
+        if 200 <= response.status_code < 300:
+            return RobotsTxt(response.text, self.user_agent, response.status_code), self.ttl
+        if 400 <= response.status_code < 500:
+            # No robots.txt (or not for us): everything may be crawled
+            self.stats['missing'] += 1
+            return RobotsTxt('', self.user_agent, response.status_code), self.ttl
+        self.stats['errors'] += 1
+        return RobotsTxt.disallow_all(response.status_code), self.error_ttl
+
+    def get(self, url):
+        """RobotsTxt of the host of ``url``, fetched once per TTL even with many threads asking"""
+        parts = urlsplit(url)
+        origin = f'{parts.scheme}://{parts.netloc}'.lower()
+        with self._lock:
+            self.stats['lookups'] += 1
+        while True:
+            with self._lock:
+                entry = self._cache.get(origin)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.stats['hits'] += 1
+                    return entry[1]
+                fetching = self._fetching.get(origin)
+                if fetching is None:
+                    fetching = self._fetching[origin] = threading.Event()
+                    break
+            # Another thread is fetching this host's robots.txt
+            fetching.wait()
+        try:
+            robots, ttl = self._fetch(origin)
+            with self._lock:
+                self.stats['fetches'] += 1
+                self._cache[origin] = (time.monotonic() + ttl, robots)
+        finally:
+            with self._lock:
+                del self._fetching[origin]
+            fetching.set()
+        return robots
+
+    def allowed(self, url):
+        return self.get(url).allowed(url)
+
+    def crawl_delay(self, url):
+        return self.get(url).crawl_delay
+
+def robots_report(cache, urls, examples=100):
+    """Check ``urls`` (e.g. a sitemap stream) against their hosts' robots.txt
+
+    Counts the blocked URLs per blocking rule and keeps the first ``examples``.
+    """
+    checked = 0
+    blocked = []
+    by_rule = Counter()
+    for url in urls:
+        checked += 1
+        rule = cache.get(url).match(url)
+        if rule is not None and not rule[0]:
+            by_rule[rule[1]] += 1
+            if len(blocked) < examples:
+                blocked.append({'url': url, 'rule': f'Disallow: {rule[1]}'})
+    return {
+        'checked': checked,
+        'blocked': sum(by_rule.values()),
+        'blocked_by_rule': {f'Disallow: {pattern}': count for pattern, count in by_rule.most_common()},
+        'blocked_urls': blocked,
+    }
+
+if __name__ == "__main__":
+    from seo_analyzer import USER_AGENT
+    from sitemap import sitemap_frontier
+
+    arg_parser = argparse.ArgumentParser(description='Check URLs against robots.txt')
+    arg_parser.add_argument('urls', nargs='*', help='URLs to check')
+    arg_parser.add_argument('--file', help='text file with one URL per line')
+    arg_parser.add_argument('--sitemap', action='append', default=[], help='check every URL of this sitemap')
+    arg_parser.add_argument('--user-agent', default=USER_AGENT)
+    args = arg_parser.parse_args()
+
+    session = requests.Session()
+    session.headers.update({'User-Agent': args.user_agent})
+    cache = RobotsCache(session)
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not urls and not args.sitemap:
+        args.sitemap = ['https://www.tln-werbemittel.de/sitemap.xml']
+
+    for url in urls:
+        robots = cache.get(url)
+        rule = robots.match(url)
+        verdict = 'allowed' if rule is None or rule[0] else 'BLOCKED'
+        print(f"{verdict:8} {url}" + (f"  ({'Allow' if rule[0] else 'Disallow'}: {rule[1]})" if rule else '')
+              + (f"  [crawl-delay {robots.crawl_delay}s]" if robots.crawl_delay else ''))
+
+    if args.sitemap:
+        started = time.perf_counter()
+        report = robots_report(cache, sitemap_frontier(session, args.sitemap))
+        print(f"\n{report['checked']} sitemap URLs checked in {time.perf_counter() - started:.2f}s, "
+              f"{report['blocked']} blocked by robots.txt")
+        for rule, count in report['blocked_by_rule'].items():
+            print(f"  {count:>7}  {rule}")
+        for entry in report['blocked_urls'][:20]:
+            print(f"  {entry['url']}")
+    print(f"\n{cache.stats}", file=sys.stderr)
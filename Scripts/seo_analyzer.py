@@ -1,173 +1,216 @@
 #!/usr/bin/env python3
 import requests
-from bs4 import BeautifulSoup
 import json
-from urllib.parse import urlparse, urljoin
-import time
-import dns.resolver
+from urllib.parse import urlparse
 import whois
 from datetime import datetime
-import ssl
-import socket
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dns_cache import CachingResolver, dns_records, install_resolver
+from http_cache import DEFAULT_CACHE_DIR, install_cache
+from parser_backends import get_backend
+from results_index import DEFAULT_INDEX_PATH, ResultsIndex
+from robots import RobotsCache, robots_report
+from sitemap import STREAM_ERRORS, SitemapStats, CountingReader, parse_sitemap_stream, sitemap_frontier
+from task_graph import TaskGraph
+from tls_scan import TLSScanner
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Deadlines (seconds) of the run_full_analysis tasks; None = only the run deadline applies
+CHECK_TIMEOUTS = {
+    'homepage_analysis': 20,
+    'robots_txt': 10,
+    'sitemaps': 20,
+    'sitemap_robots': 60,
+    'ssl_certificate': 10,
+    'dns_records': 15,
+    'domain_info': 30,
+    'additional_pages': 60,
+    'sitemap_crawl': None,
+    'link_check': None,
+    'image_audit': None,
+}
+
+def summarize_response(url, response):
+    """Collect the transport-level fields of a page analysis"""
+    return {
+        'url': url,
+        'status_code': response.status_code,
+        'response_time': response.elapsed.total_seconds(),
+        'page_size': len(response.content),
+        'encoding': response.encoding,
+    }
+
+def extract_page_metrics(url, domain, html, parser=None, link_sink=None, external_sink=None):
+    """Extract the on-page SEO metrics of an HTML document"""
+    return get_backend(parser).page_metrics(url, domain, html, link_sink, external_sink)
 
 class SEOAnalyzer:
-    def __init__(self, url):
+    def __init__(self, url, cache_dir=DEFAULT_CACHE_DIR, parser=None, index_path=DEFAULT_INDEX_PATH,
+                 session=None, results_index=None, resolver=None, tls_scanner=None):
+        """A ``session`` (and ``results_index``, ``resolver`` and ``tls_scanner``) may be shared by analyzers on several threads
+
+        A shared session is used as it is, so its owner installs any HTTP cache and DNS resolver.
+        """
         self.url = url
+        self.parser = parser
         self.domain = urlparse(url).netloc
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-
-    def analyze_page(self):
-        print(f"Analyzing {self.url}...")
-        response = self.session.get(self.url, timeout=10)
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        analysis = {
-            'url': self.url,
-            'status_code': response.status_code,
-            'response_time': response.elapsed.total_seconds(),
-            'page_size': len(response.content),
-            'encoding': response.encoding,
-        }
-
-        # Meta tags
-        analysis['title'] = soup.find('title').text if soup.find('title') else None
-        analysis['title_length'] = len(analysis['title']) if analysis['title'] else 0
-
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        analysis['meta_description'] = meta_desc.get('content') if meta_desc else None
-        analysis['meta_description_length'] = len(analysis['meta_description']) if analysis['meta_description'] else 0
-
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        analysis['meta_keywords'] = meta_keywords.get('content') if meta_keywords else None
-
-        # Canonical URL
-        canonical = soup.find('link', attrs={'rel': 'canonical'})
-        analysis['canonical_url'] = canonical.get('href') if canonical else None
-
-        # Language
-        analysis['language'] = soup.find('html').get('lang') if soup.find('html') else None
-
-        # Headings
-        analysis['h1_tags'] = [h1.text.strip() for h1 in soup.find_all('h1')]
-        analysis['h2_tags'] = [h2.text.strip() for h2 in soup.find_all('h2')]
-        analysis['h3_tags'] = [h3.text.strip() for h3 in soup.find_all('h3')]
-
-        # Images
-        images = soup.find_all('img')
-        analysis['total_images'] = len(images)
-        analysis['images_without_alt'] = len([img for img in images if not img.get('alt')])
-
-        # Links
-        links = soup.find_all('a', href=True)
-        internal_links = []
-        external_links = []
-
-        for link in links:
-            href = link['href']
-            if href.startswith('http'):
-                if self.domain in href:
-                    internal_links.append(href)
-                else:
-                    external_links.append(href)
-            elif href.startswith('/'):
-                internal_links.append(urljoin(self.url, href))
-
-        analysis['internal_links'] = len(internal_links)
-        analysis['external_links'] = len(external_links)
-        analysis['total_links'] = len(links)
-
-        # Open Graph tags
-        og_tags = {}
-        for tag in soup.find_all('meta', property=True):
-            if tag['property'].startswith('og:'):
-                og_tags[tag['property']] = tag.get('content')
-        analysis['open_graph_tags'] = og_tags
-
-        # Schema markup
-        schema_scripts = soup.find_all('script', type='application/ld+json')
-        analysis['schema_markup_count'] = len(schema_scripts)
-
-        # Mobile viewport
-        viewport = soup.find('meta', attrs={'name': 'viewport'})
-        analysis['viewport_meta'] = viewport.get('content') if viewport else None
-
+        # Site-level URLs (robots.txt, sitemaps, legal pages) keep the scheme of ``url``
+        self.origin = f"{urlparse(url).scheme or 'https'}://{self.domain}"
+        if session is None:
+            self.session = requests.Session()
+            self.session.headers.update({
+                'User-Agent': USER_AGENT
+            })
+            self.cache = install_cache(self.session, cache_dir) if cache_dir else None
+        else:
+            self.session = session
+            self.cache = None
+        self.resolver = resolver or CachingResolver()
+        if session is None:
+            install_resolver(self.session, self.resolver)
+        self.tls_scanner = tls_scanner
+        # Compiled robots.txt rules per host, honoured by every crawl of this analyzer
+        self.robots = RobotsCache(self.session, USER_AGENT)
+        self.results_index = results_index or (ResultsIndex(index_path) if index_path else None)
+
+    def analyze_page(self, url=None):
+        """Analyze ``url`` (default: the analyzer's URL); reads no per-call state, so it is thread-safe"""
+        url = url or self.url
+        domain = urlparse(url).netloc
+        print(f"Analyzing {url}...")
+        response = self.session.get(url, timeout=10)
+        analysis = summarize_response(url, response)
+
+        def compute():
+            return extract_page_metrics(url, domain, response.text, self.parser)
+
+        if self.results_index:
+            # Unchanged bytes reuse the stored metrics without parsing
+            metrics = self.results_index.get_or_compute(url, f'page:{domain}', response.content, compute)
+        else:
+            metrics = compute()
+        analysis.update(metrics)
         return analysis
 
     def check_robots_txt(self):
-        robots_url = f"https://{self.domain}/robots.txt"
+        robots = self.robots.get(f"{self.origin}/")
+        exists = robots.status == 200
+        return {
+            'exists': exists,
+            'content': robots.text if exists else None,
+            'rules': len(robots.matcher),
+            'crawl_delay': robots.crawl_delay,
+            'sitemaps': robots.sitemaps
+        }
+
+    def sitemap_candidates(self):
+        return [
+            f"{self.origin}/sitemap.xml",
+            f"{self.origin}/sitemap_index.xml",
+            f"{self.origin}/export/sitemap_de.xml"
+        ]
+
+    def _check_sitemap_url(self, url):
         try:
-            response = self.session.get(robots_url, timeout=5)
+            response = self.session.get(url, timeout=5, stream=True)
+        except requests.exceptions.RequestException:
+            return None
+        with response:
+            if response.status_code != 200:
+                return None
+            response.raw.decode_content = True
+            reader = CountingReader(response.raw)
+            try:
+                kinds = Counter(kind for kind, _, _ in parse_sitemap_stream(reader))
+            except STREAM_ERRORS as e:
+                # The sitemap exists but is malformed or was cut off; its size counts what arrives
+                error = f'{type(e).__name__}: {e}'
+                try:
+                    while reader.read(65536):
+                        pass
+                except STREAM_ERRORS:
+                    pass
+                return {'url': url, 'exists': True, 'size': reader.bytes_read, 'error': error}
             return {
-                'exists': response.status_code == 200,
-                'content': response.text if response.status_code == 200 else None
+                'url': url,
+                'exists': True,
+                'size': reader.bytes_read,
+                'urls': kinds['url'],
+                'child_sitemaps': kinds['sitemap']
             }
-        except:
-            return {'exists': False, 'content': None}
 
     def check_sitemap(self):
-        sitemap_urls = [
-            f"https://{self.domain}/sitemap.xml",
-            f"https://{self.domain}/sitemap_index.xml",
-            f"https://{self.domain}/export/sitemap_de.xml"
-        ]
+        candidates = self.sitemap_candidates()
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            return [sitemap for sitemap in executor.map(self._check_sitemap_url, candidates) if sitemap]
+
+    def crawl_sitemap(self, limit=None, sitemap_urls=None, **crawl_options):
+        """Stream sitemap URLs straight into the crawler"""
+        from crawler import crawl_pages
+
+        stats = SitemapStats()
+        frontier = sitemap_frontier(self.session, sitemap_urls or self.sitemap_candidates(), limit=limit, stats=stats)
+        crawl_options.setdefault('robots', self.robots)
+        results, crawl_stats = crawl_pages(
+            frontier, session=self.session, parser=self.parser, results_index=self.results_index, **crawl_options
+        )
+        return results, {'sitemap': stats.as_dict(), 'crawl': crawl_stats}
+
+    def check_sitemap_robots(self, sitemap_urls=None, limit=None):
+        """Which sitemap URLs robots.txt blocks: sitemaps should only list crawlable pages"""
+        stats = SitemapStats()
+        frontier = sitemap_frontier(self.session, sitemap_urls or self.sitemap_candidates(), limit=limit, stats=stats)
+        report = robots_report(self.robots, frontier)
+        report['sitemap'] = stats.as_dict()
+        return report
 
-        sitemaps = []
-        for url in sitemap_urls:
-            try:
-                response = self.session.get(url, timeout=5)
-                if response.status_code == 200:
-                    sitemaps.append({
-                        'url': url,
-                        'exists': True,
-                        'size': len(response.content)
-                    })
-            except:
-                pass
-
-        return sitemaps
+    def check_links(self, urls=None, limit=None, **checker_options):
+        """Crawl ``urls`` (or up to ``limit`` sitemap pages) and validate every unique link target once"""
+        from crawler import crawl_pages
+        from link_checker import LinkTargets, check_link_targets
 
-    def check_ssl(self):
-        try:
-            context = ssl.create_default_context()
-            with socket.create_connection((self.domain, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=self.domain) as ssock:
-                    cert = ssock.getpeercert()
-                    return {
-                        'ssl_enabled': True,
-                        'issuer': dict(x[0] for x in cert['issuer']),
-                        'expires': cert['notAfter']
-                    }
-        except:
-            return {'ssl_enabled': False}
+        targets = LinkTargets()
+        if urls is None:
+            self.crawl_sitemap(limit=limit, link_targets=targets)
+        else:
+            crawl_pages(urls, session=self.session, parser=self.parser, results_index=self.results_index,
+                        link_targets=targets, robots=self.robots)
+        return check_link_targets(targets, **checker_options)
 
-    def check_dns(self):
-        try:
-            dns_info = {}
+    def audit_images(self, urls=None, **auditor_options):
+        """Rank the images of ``urls`` (default: the homepage) by bytes using header-only probes"""
+        from image_audit import audit_pages
 
-            # A records
-            a_records = dns.resolver.resolve(self.domain, 'A')
-            dns_info['a_records'] = [str(r) for r in a_records]
+        def pages():
+            for url in urls or [self.url]:
+                try:
+                    yield url, self.session.get(url, timeout=10).text
+                except requests.exceptions.RequestException:
+                    pass
 
-            # MX records
-            try:
-                mx_records = dns.resolver.resolve(self.domain, 'MX')
-                dns_info['mx_records'] = [str(r.exchange) for r in mx_records]
-            except:
-                dns_info['mx_records'] = []
+        return audit_pages(pages(), self.parser, **auditor_options)
 
-            # TXT records
-            try:
-                txt_records = dns.resolver.resolve(self.domain, 'TXT')
-                dns_info['txt_records'] = [str(r) for r in txt_records]
-            except:
-                dns_info['txt_records'] = []
+    def check_ssl(self):
+        """Certificate chain, SANs, protocol, cipher and handshake latency of the HTTPS port
+
+        ``ssl_enabled`` means a TLS handshake worked; ``verified`` that the chain and
+        hostname validated. Failures are described in ``error``.
+        """
+        scanner = self.tls_scanner or TLSScanner(resolver=self.resolver)
+        parts = urlparse(self.url)
+        port = parts.port if parts.scheme == 'https' and parts.port else 443
+        host = f'[{parts.hostname}]' if ':' in parts.hostname else parts.hostname
+        result = scanner.scan_host(f'{host}:{port}')
+        result['expires'] = result.get('not_after')
+        return result
 
-            return dns_info
-        except Exception as e:
-            return {'error': str(e)}
+    def check_dns(self):
+        # A, MX and TXT are queried concurrently and cached for their TTL, also for the HTTP fetches
+        hostname = urlparse(self.url).hostname
+        return dns_records(self.resolver.resolve_many([hostname])[hostname])
 
     def check_domain_info(self):
         try:
@@ -181,40 +224,91 @@ class SEOAnalyzer:
         except Exception as e:
             return {'error': str(e)}
 
-    def analyze_multiple_pages(self, urls):
-        results = []
-        for url in urls:
-            try:
-                self.url = url
-                results.append(self.analyze_page())
-                time.sleep(1)  # Be polite
-            except Exception as e:
-                results.append({'url': url, 'error': str(e)})
+    def analyze_multiple_pages(self, urls, concurrency=8, per_host=2, politeness_delay=0.5):
+        from crawler import crawl_pages
+
+        results, stats = crawl_pages(
+            urls,
+            session=self.session,
+            parser=self.parser,
+            results_index=self.results_index,
+            concurrency=concurrency,
+            per_host=per_host,
+            politeness_delay=politeness_delay,
+            robots=self.robots
+        )
+        print(f"Crawled {stats['pages']} pages in {stats['elapsed']:.2f}s ({stats['pages_per_second']:.1f} pages/s)")
         return results
 
-    def run_full_analysis(self):
+    def run_full_analysis(self, sitemap_pages=0, check_links=False, audit_images=False, timeout=300,
+                          check_timeouts=None, sitemap_robots_limit=100000):
+        """Run every check concurrently as a task graph
+
+        ``timeout`` bounds the whole run and ``check_timeouts`` overrides entries of
+        CHECK_TIMEOUTS; a check that fails or runs out of time is reported with its
+        default value and its error in ``task_timings``. Up to ``sitemap_robots_limit``
+        sitemap URLs are checked against robots.txt (0 skips the check).
+        """
         print("Starting comprehensive SEO analysis...")
+        timeouts = dict(CHECK_TIMEOUTS, **(check_timeouts or {}))
 
+        # Check a few more important pages
+        additional_urls = [
+            f"{self.origin}/impressum",
+            f"{self.origin}/datenschutz",
+            f"{self.origin}/kontakt"
+        ]
+
+        graph = TaskGraph(timeout=timeout)
+        graph.add('homepage_analysis', self.analyze_page, timeout=timeouts['homepage_analysis'], default={})
+        graph.add('robots_txt', self.check_robots_txt, timeout=timeouts['robots_txt'],
+                  default={'exists': False, 'content': None})
+        graph.add('sitemaps', self.check_sitemap, timeout=timeouts['sitemaps'], default=[])
+        graph.add('ssl_certificate', self.check_ssl, timeout=timeouts['ssl_certificate'], default={'ssl_enabled': False})
+        graph.add('dns_records', self.check_dns, timeout=timeouts['dns_records'], default={})
+        graph.add('domain_info', self.check_domain_info, timeout=timeouts['domain_info'], default={})
+        graph.add('additional_pages', self.analyze_multiple_pages, additional_urls,
+                  timeout=timeouts['additional_pages'], default=[])
+
+        if sitemap_robots_limit:
+            def sitemap_robots(sitemaps):
+                if not sitemaps:
+                    return {}
+                return self.check_sitemap_robots([sitemap['url'] for sitemap in sitemaps], limit=sitemap_robots_limit)
+
+            graph.add('sitemap_robots', sitemap_robots, after=['sitemaps'], timeout=timeouts['sitemap_robots'],
+                      default={})
+
+        if sitemap_pages:
+            # Only the sitemaps that were found are crawled, instead of probing every candidate again
+            def crawl(sitemaps):
+                print(f"Crawling up to {sitemap_pages} pages from the sitemaps...")
+                return self.crawl_sitemap(limit=sitemap_pages, sitemap_urls=[sitemap['url'] for sitemap in sitemaps])
+
+            graph.add('sitemap_crawl', crawl, after=['sitemaps'], timeout=timeouts['sitemap_crawl'], default=([], {}))
+
+        if check_links:
+            graph.add('link_check', self.check_links, [self.url] + additional_urls,
+                      timeout=timeouts['link_check'], default={})
+
+        if audit_images:
+            graph.add('image_audit', self.audit_images, [self.url] + additional_urls,
+                      timeout=timeouts['image_audit'], default={})
+
+        results = graph.run()
         report = {
             'timestamp': datetime.now().isoformat(),
             'domain': self.domain,
-            'homepage_analysis': self.analyze_page(),
-            'robots_txt': self.check_robots_txt(),
-            'sitemaps': self.check_sitemap(),
-            'ssl_certificate': self.check_ssl(),
-            'dns_records': self.check_dns(),
-            'domain_info': self.check_domain_info()
         }
+        report.update(results)
+        if sitemap_pages:
+            report['sitemap_pages'], report['sitemap_crawl_stats'] = report.pop('sitemap_crawl')
+        report['task_timings'] = graph.report()
 
-        # Check a few more important pages
-        additional_urls = [
-            f"https://{self.domain}/impressum",
-            f"https://{self.domain}/datenschutz",
-            f"https://{self.domain}/kontakt"
-        ]
-
-        print("Analyzing additional pages...")
-        report['additional_pages'] = self.analyze_multiple_pages(additional_urls)
+        if self.cache:
+            report['http_cache'] = dict(self.cache.stats)
+        if self.results_index:
+            report['incremental'] = dict(self.results_index.stats)
 
         return report
 
@@ -236,6 +330,22 @@ if __name__ == "__main__":
     print(f"Meta Description Length: {home.get('meta_description_length')} chars")
     print(f"H1 Tags: {len(home.get('h1_tags', []))}")
     print(f"Images without ALT: {home.get('images_without_alt')} / {home.get('total_images')}")
-    print(f"SSL: {report['ssl_certificate'].get('ssl_enabled')}")
+    certificate = report['ssl_certificate']
+    print(f"SSL: {certificate.get('ssl_enabled')} (verified: {certificate.get('verified')}, "
+          f"expires in {certificate.get('days_left', '?')} days)")
     print(f"Robots.txt: {report['robots_txt'].get('exists')}")
     print(f"Sitemaps found: {len(report.get('sitemaps', []))}")
+    blocked = report.get('sitemap_robots') or {}
+    if blocked:
+        print(f"Sitemap URLs blocked by robots.txt: {blocked['blocked']} / {blocked['checked']}")
+    timings = report['task_timings']
+    print(f"Checks: {timings['elapsed']:.1f}s wall time for {timings['sum_of_tasks']:.1f}s of work")
+    for name, timing in timings['tasks'].items():
+        if timing['status'] != 'ok':
+            print(f"  {name}: {timing['status']} ({timing['error']})")
+    if 'http_cache' in report:
+        cache_stats = report['http_cache']
+        print(f"HTTP cache: {cache_stats['hits']} hits, {cache_stats['revalidations']} revalidated, "
+              f"{cache_stats['misses']} misses")
+    if analyzer.results_index:
+        print(f"Incremental: {analyzer.results_index.summary()}")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Streaming sitemap ingestion
+
+Sitemaps and sitemap indexes are parsed incrementally with lxml's iterparse
+straight off the HTTP response, so even a 50k-URL / 50 MB sitemap never sits
+fully in memory. Gzipped sitemaps are detected by their magic bytes.
+"""
+import gzip
+import io
+import resource
+import time
+from collections import namedtuple
+from itertools import islice
+
+import requests
+import urllib3
+from lxml import etree
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+GZIP_MAGIC = b'\x1f\x8b'
+READ_CHUNK = 64 * 1024
+# A sitemap that breaks off mid-stream (dropped connection, truncated gzip) is
+# recorded in the stats and the walk continues with the next one
+STREAM_ERRORS = (etree.XMLSyntaxError, requests.exceptions.RequestException, urllib3.exceptions.HTTPError,
+                 OSError, EOFError)
+
+SitemapEntry = namedtuple('SitemapEntry', ['loc', 'lastmod', 'sitemap'])
+
+class CountingReader(io.RawIOBase):
+    """File-like wrapper that counts the bytes pulled from the network"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        self.bytes_read += len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+class SitemapStats:
+    def __init__(self):
+        self.sitemaps = 0
+        self.urls = 0
+        self.bytes = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        elapsed = self.elapsed or 1e-9
+        return {
+            'sitemaps': self.sitemaps,
+            'urls': self.urls,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'elapsed': self.elapsed,
+            'urls_per_second': self.urls / elapsed,
+            'mb_per_second': self.bytes / 1024 / 1024 / elapsed,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        }
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def open_sitemap_stream(stream):
+    """Return a binary stream of sitemap XML, transparently gunzipping it"""
+    buffered = io.BufferedReader(stream, READ_CHUNK) if not hasattr(stream, 'peek') else stream
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=buffered)
+    return buffered
+
+def parse_sitemap_stream(stream):
+    """Yield ``(kind, loc, lastmod)`` tuples from a sitemap or sitemap index
+
+    ``kind`` is ``'url'`` for page entries and ``'sitemap'`` for child
+    sitemaps of an index. Elements are cleared as soon as they are consumed.
+    """
+    context = etree.iterparse(
+        open_sitemap_stream(stream),
+        events=('end',),
+        tag=(f'{{{SITEMAP_NS}}}url', f'{{{SITEMAP_NS}}}sitemap', 'url', 'sitemap'),
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True
+    )
+    for _, element in context:
+        loc = None
+        lastmod = None
+        for child in element:
+            name = _local(child.tag)
+            if name == 'loc':
+                loc = (child.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = (child.text or '').strip() or None
+        kind = _local(element.tag)
+
+        # Free the element and already-processed siblings
+        element.clear()
+        parent = element.getparent()
+        while element.getprevious() is not None:
+            del parent[0]
+
+        if loc:
+            yield kind, loc, lastmod
+
+def iter_sitemap_urls(session, sitemap_url, max_depth=5, timeout=30, stats=None):
+    """Lazily yield SitemapEntry objects, following sitemap indexes recursively"""
+    stats = stats if stats is not None else SitemapStats()
+    seen = set()
+    started = time.perf_counter()
+
+    def walk(url, depth):
+        if url in seen or depth > max_depth:
+            return
+        seen.add(url)
+        try:
+            response = session.get(url, timeout=timeout, stream=True)
+        except Exception as e:
+            stats.errors.append({'url': url, 'error': str(e)})
+            return
+
+        with response:
+            if response.status_code != 200:
+                stats.errors.append({'url': url, 'error': f'HTTP {response.status_code}'})
+                return
+            response.raw.decode_content = True
+            reader = CountingReader(response.raw)
+            stats.sitemaps += 1
+            try:
+                for kind, loc, lastmod in parse_sitemap_stream(reader):
+                    if kind == 'sitemap':
+                        yield from walk(loc, depth + 1)
+                    else:
+                        stats.urls += 1
+                        yield SitemapEntry(loc, lastmod, url)
+            except STREAM_ERRORS as e:
+                stats.errors.append({'url': url, 'error': f'{type(e).__name__}: {e}'})
+            finally:
+                stats.bytes += reader.bytes_read
+                stats.elapsed = time.perf_counter() - started
+
+    yield from walk(sitemap_url, 0)
+
+def sitemap_frontier(session, sitemap_urls, limit=None, stats=None):
+    """Yield page URLs from one or more sitemaps for the crawler, deduplicated"""
+    stats = stats if stats is not None else SitemapStats()
+    seen = set()
+
+    def locs():
+        for sitemap_url in sitemap_urls:
+            for entry in iter_sitemap_urls(session, sitemap_url, stats=stats):
+                if entry.loc not in seen:
+                    seen.add(entry.loc)
+                    yield entry.loc
+
+    return islice(locs(), limit)
+
+if __name__ == "__main__":
+    import requests
+
+    session = requests.Session()
+    stats = SitemapStats()
+    entries = iter_sitemap_urls(session, "https://www.tln-werbemittel.de/sitemap.xml", stats=stats)
+    for entry in islice(entries, 10):
+        print(f"{entry.lastmod or '-':>25}  {entry.loc}")
+
+    for _ in entries:
+        pass
+
+    report = stats.as_dict()
+    print(f"\nSitemaps: {report['sitemaps']}, URLs: {report['urls']}, "
+          f"{report['bytes'] / 1024:.0f} KB in {report['elapsed']:.2f}s")
+    print(f"Throughput: {report['urls_per_second']:.0f} URLs/s, {report['mb_per_second']:.1f} MB/s")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
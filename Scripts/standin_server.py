@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Local HTTP(S) and DNS stand-in servers for offline tests and benchmarks"""
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import BaseRequestHandler, ThreadingUDPServer
+
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
+def synthetic_page(path, links=20, pages=1000):
+    """Build a small shop-like HTML page that links to other synthetic pages"""
+    try:
+        page_id = int(path.rstrip('/').rsplit('/', 1)[-1])
+    except ValueError:
+        page_id = 0
+
+    anchors = ''.join(
+        f'<li><a href="/page/{(page_id * 7 + i) % pages}">Produkt {(page_id * 7 + i) % pages}</a></li>'
+        for i in range(links)
+    )
+    alt = ' alt="Bild"'
+    images = ''.join(
+        f'<img src="/img/{page_id}-{i}.jpg"{alt if i % 2 else ""}>'
+        for i in range(4)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Werbeartikel Seite {page_id} - TLN Werbemittel</title>
+<meta name="description" content="Werbeartikel mit Logo bedrucken, Seite {page_id}">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta property="og:title" content="Seite {page_id}">
+<link rel="canonical" href="{path}">
+</head>
+<body>
+<h1>Werbeartikel {page_id}</h1>
+<h2>Unsere Topseller</h2>
+<ul>{anchors}</ul>
+{images}
+<p>{'Kugelschreiber Tassen USB Sticks Taschen ' * 50}</p>
+<a href="https://www.example.com/partner">Partner</a>
+</body>
+</html>
+"""
+
+def default_app(method, path, headers):
+    """Serve synthetic HTML pages for every path"""
+    body = synthetic_page(path).encode('utf-8')
+    return 200, {'Content-Type': 'text/html; charset=utf-8'}, body
+
+def static_app(body, content_type='text/html; charset=utf-8'):
+    """Build an app that answers every request with the same body"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+
+    def app(method, path, headers):
+        return 200, {'Content-Type': content_type}, body
+    return app
+
+def self_signed_certificate(directory, hostname='localhost', days=1):
+    """Write a self-signed certificate and key for ``hostname`` (and 127.0.0.1) with openssl
+
+    Returns ``(certfile, keyfile)``.
+    """
+    certfile = os.path.join(directory, f'{hostname}.crt')
+    keyfile = os.path.join(directory, f'{hostname}.key')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-sha256', '-days', str(days),
+         '-keyout', keyfile, '-out', certfile, '-subj', f'/CN={hostname}',
+         '-addext', f'subjectAltName=DNS:{hostname},IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY the body
+    # waits for the client's delayed ACK and adds ~40ms to every response
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        server = self.server.standin
+        if server.tls and server.handshake_latency:
+            # Held before the server's first handshake flight, like extra round trips to a remote host
+            time.sleep(server.handshake_latency)
+        super().setup()
+
+    def _respond(self, send_body):
+        server = self.server.standin
+        if server.latency:
+            time.sleep(server.latency)
+        status, headers, body = server.app(self.command, self.path, self.headers)
+        # Handlers run on one thread per connection
+        with server._count_lock:
+            server.request_count += 1
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that hang up mid-response (e.g. after reading a prefix) or reject a
+        # self-signed certificate are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            super().handle_error(request, client_address)
+
+class StandinServer:
+    """Threaded local HTTP server driven by an ``app(method, path, headers)`` callable
+
+    The app returns ``(status, headers, body)``. An optional fixed latency is
+    added to every response to emulate a remote origin. With ``tls`` the
+    server speaks HTTPS, using ``certfile``/``keyfile`` or a throwaway
+    self-signed certificate whose path is exposed as ``cafile`` for clients.
+    ``handshake_latency`` delays every TLS handshake.
+    """
+
+    def __init__(self, app=None, latency=0.0, host='127.0.0.1', port=0, tls=False, certfile=None, keyfile=None,
+                 handshake_latency=0.0):
+        self.app = app or default_app
+        self.latency = latency
+        self.handshake_latency = handshake_latency
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.tls = tls
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.standin = self
+        self._thread = None
+        self._cert_dir = None
+        self.cafile = None
+        if tls:
+            if certfile is None:
+                self._cert_dir = tempfile.mkdtemp(prefix='standin_tls_')
+                certfile, keyfile = self_signed_certificate(self._cert_dir)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # The handshake runs in the handler thread, so a slow client does not block accept()
+            self._httpd.socket = context.wrap_socket(self._httpd.socket, server_side=True,
+                                                     do_handshake_on_connect=False)
+            self.cafile = certfile
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}"
+
+    def url(self, path='/'):
+        return self.base_url + path
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+        if self._cert_dir:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+class _DNSHandler(BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        server = self.server.standin
+        if server.latency:
+            time.sleep(server.latency)
+        query = dns.message.from_wire(data)
+        sock.sendto(server.answer(query).to_wire(), self.client_address)
+
+class _DNSServer(ThreadingUDPServer):
+    daemon_threads = True
+
+class StubDNSServer:
+    """Threaded local UDP DNS server answering from a fixed zone
+
+    ``zone`` maps names to ``{record type: (ttl, [rdata text, ...])}``. Names
+    outside the zone get NXDOMAIN and missing types an empty answer, both with
+    an SOA whose minimum of ``negative_ttl`` seconds allows negative caching.
+    Every question is counted in ``queries``.
+    """
+
+    def __init__(self, zone, latency=0.0, negative_ttl=60, host='127.0.0.1', port=0):
+        self.zone = {dns.name.from_text(name): records for name, records in zone.items()}
+        self.latency = latency
+        self.negative_ttl = negative_ttl
+        self.queries = []
+        self._lock = threading.Lock()
+        self._server = _DNSServer((host, port), _DNSHandler)
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def _soa(self, name):
+        ttl = self.negative_ttl
+        return dns.rrset.from_text(name.parent() if len(name) > 2 else name, ttl, 'IN', 'SOA',
+                                   f'ns.stub. hostmaster.stub. 1 3600 600 86400 {ttl}')
+
+    def answer(self, query):
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        with self._lock:
+            self.queries.append((question.name.to_text(), dns.rdatatype.to_text(question.rdtype)))
+        records = self.zone.get(question.name)
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+            response.authority.append(self._soa(question.name))
+            return response
+        entry = records.get(dns.rdatatype.to_text(question.rdtype))
+        if entry is None:
+            response.authority.append(self._soa(question.name))
+            return response
+        ttl, values = entry
+        response.answer.append(dns.rrset.from_text_list(question.name, ttl, dns.rdataclass.IN,
+                                                        question.rdtype, values))
+        return response
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+if __name__ == "__main__":
+    with StandinServer() as server:
+        print(f"Stand-in server running at {server.base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Dependency-aware concurrent task execution
+
+Tasks are blocking callables plus the names of the tasks they need. Each one
+starts on a thread pool, driven by asyncio, as soon as its dependencies have
+finished, so independent network checks overlap and a run takes about as
+long as its longest dependency chain instead of the sum of all tasks. Every
+task may have its own deadline and the run as a whole has one. A task that
+fails or misses a deadline gets its default value, its error is recorded
+with the timings, and the tasks depending on it are skipped. Threads cannot
+be interrupted, so a task past its deadline is abandoned rather than killed.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class TaskGraph:
+    def __init__(self, max_workers=8, timeout=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.tasks = {}
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name, func, *args, after=(), timeout=None, default=None, **kwargs):
+        """Add a task; ``func`` is called with the results of ``after`` followed by ``args``
+
+        Dependencies must already be in the graph, which also rules out cycles.
+        """
+        if name in self.tasks:
+            raise ValueError(f'Duplicate task: {name}')
+        missing = [dependency for dependency in after if dependency not in self.tasks]
+        if missing:
+            raise ValueError(f'Task {name} depends on unknown tasks: {", ".join(missing)}')
+        self.tasks[name] = {'func': func, 'args': args, 'kwargs': kwargs, 'after': tuple(after),
+                            'timeout': timeout, 'default': default}
+        return self
+
+    def _finish(self, name, status, started, result=None, error=None):
+        task = self.tasks[name]
+        self.results[name] = result if status == 'ok' else task['default']
+        timing = {'status': status, 'seconds': round(time.perf_counter() - started, 3)}
+        if error:
+            timing['error'] = error
+        self.timings[name] = timing
+        return status == 'ok'
+
+    async def _run_task(self, name, runs, executor):
+        task = self.tasks[name]
+        ready = await asyncio.gather(*(runs[dependency] for dependency in task['after']))
+        started = time.perf_counter()
+        if not all(ready):
+            failed = [dependency for dependency, ok in zip(task['after'], ready) if not ok]
+            return self._finish(name, 'skipped', started, error=f'dependency failed: {", ".join(failed)}')
+
+        loop = asyncio.get_running_loop()
+        inputs = [self.results[dependency] for dependency in task['after']]
+        call = loop.run_in_executor(executor, lambda: task['func'](*inputs, *task['args'], **task['kwargs']))
+        try:
+            result = await asyncio.wait_for(call, task['timeout'])
+        except asyncio.TimeoutError:
+            return self._finish(name, 'timeout', started, error=f"no result after {task['timeout']}s")
+        except Exception as e:
+            return self._finish(name, 'error', started, error=f'{type(e).__name__}: {e}')
+        return self._finish(name, 'ok', started, result)
+
+    async def run_async(self):
+        """Run every task; returns ``{name: result}`` (timings are left in ``self.timings``)"""
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        runs = {}
+        for name in self.tasks:
+            runs[name] = asyncio.ensure_future(self._run_task(name, runs, executor))
+        try:
+            _, pending = await asyncio.wait(runs.values(), timeout=self.timeout)
+            for name, run in runs.items():
+                if run in pending:
+                    run.cancel()
+                    self._finish(name, 'timeout', started, error=f'run deadline of {self.timeout}s passed')
+        finally:
+            # Abandoned tasks keep their threads until they return on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.elapsed = time.perf_counter() - started
+        return {name: self.results[name] for name in self.tasks}
+
+    def run(self):
+        """Synchronous entry point for ``run_async``"""
+        return asyncio.run(self.run_async())
+
+    def report(self):
+        """Per-task status and wall time plus the run's elapsed time"""
+        return {
+            'elapsed': round(self.elapsed, 3),
+            'sum_of_tasks': round(sum(timing['seconds'] for timing in self.timings.values()), 3),
+            'tasks': {name: self.timings[name] for name in self.tasks}
+        }
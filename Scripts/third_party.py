@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""Third-party origin attribution
+
+Every request URL is mapped to its registrable domain and a vendor entity.
+Public-suffix rules and vendor domains are compiled once into label tries
+walked from the TLD inwards, and resolution is memoized per host, so
+classifying millions of request rows costs one dictionary lookup per row
+after the first sighting of a host. Rows are then aggregated per vendor
+with NumPy (bytes, main-thread time, request count) from Lighthouse
+reports or HAR files.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from lighthouse_loader import REPORT_FIELDS, find_reports, load_reports, report_spec
+
+# Built-in subset of the public suffix list; pass a full public_suffix_list.dat for complete coverage
+PUBLIC_SUFFIXES = """
+com net org edu gov mil int info biz io co me tv app dev shop online store site xyz eu asia
+de at ch fr it es nl be lu dk se no fi is pl cz sk hu ro bg gr pt ie ru ua tr us ca mx br ar cl
+cn jp kr in au nz za sg hk tw
+co.uk org.uk ac.uk gov.uk me.uk ltd.uk plc.uk
+com.au net.au org.au edu.au gov.au co.nz org.nz
+co.jp ne.jp or.jp ac.jp co.kr or.kr co.in net.in org.in co.za org.za
+com.br net.br org.br com.mx com.ar com.cn net.cn org.cn com.hk com.sg com.tw com.tr co.at or.at
+*.ck !www.ck
+github.io gitlab.io netlify.app vercel.app herokuapp.com pages.dev web.app firebaseapp.com
+appspot.com blogspot.com azurewebsites.net cloudfront.net
+"""
+
+# Registrable domain (or more specific host) -> (vendor, category)
+KNOWN_ENTITIES = {
+    'google-analytics.com': ('Google Analytics', 'analytics'),
+    'googletagmanager.com': ('Google Tag Manager', 'tag-manager'),
+    'doubleclick.net': ('Google/Doubleclick Ads', 'ad'),
+    'googlesyndication.com': ('Google/Doubleclick Ads', 'ad'),
+    'googleadservices.com': ('Google/Doubleclick Ads', 'ad'),
+    'gstatic.com': ('Google CDN', 'cdn'),
+    'fonts.googleapis.com': ('Google Fonts', 'cdn'),
+    'fonts.gstatic.com': ('Google Fonts', 'cdn'),
+    'googleapis.com': ('Google APIs', 'utility'),
+    'google.com': ('Other Google APIs/SDKs', 'utility'),
+    'recaptcha.net': ('Other Google APIs/SDKs', 'utility'),
+    'youtube.com': ('YouTube', 'video'),
+    'ytimg.com': ('YouTube', 'video'),
+    'youtube-nocookie.com': ('YouTube', 'video'),
+    'facebook.net': ('Facebook', 'social'),
+    'facebook.com': ('Facebook', 'social'),
+    'instagram.com': ('Instagram', 'social'),
+    'linkedin.com': ('LinkedIn', 'social'),
+    'licdn.com': ('LinkedIn', 'social'),
+    'twitter.com': ('Twitter', 'social'),
+    'twimg.com': ('Twitter', 'social'),
+    'tiktok.com': ('TikTok', 'social'),
+    'pinterest.com': ('Pinterest', 'social'),
+    'bing.com': ('Microsoft Advertising', 'ad'),
+    'clarity.ms': ('Microsoft Clarity', 'analytics'),
+    'hotjar.com': ('Hotjar', 'analytics'),
+    'cloudflareinsights.com': ('Cloudflare', 'utility'),
+    'cdnjs.cloudflare.com': ('Cloudflare CDN', 'cdn'),
+    'jsdelivr.net': ('JSDelivr CDN', 'cdn'),
+    'unpkg.com': ('unpkg', 'cdn'),
+    'jquery.com': ('jQuery CDN', 'cdn'),
+    'bootstrapcdn.com': ('Bootstrap CDN', 'cdn'),
+    'fontawesome.com': ('Font Awesome', 'cdn'),
+    'typekit.net': ('Adobe Fonts', 'cdn'),
+    'cookiebot.com': ('Cookiebot', 'consent-provider'),
+    'usercentrics.eu': ('Usercentrics', 'consent-provider'),
+    'onetrust.com': ('OneTrust', 'consent-provider'),
+    'cookielaw.org': ('OneTrust', 'consent-provider'),
+    'paypal.com': ('PayPal', 'utility'),
+    'paypalobjects.com': ('PayPal', 'utility'),
+    'stripe.com': ('Stripe', 'utility'),
+    'klarna.com': ('Klarna', 'utility'),
+    'trustedshops.com': ('Trusted Shops', 'customer-success'),
+    'trustpilot.com': ('Trustpilot', 'customer-success'),
+    'elfsight.com': ('Elfsight', 'customer-success'),
+    'zendesk.com': ('Zendesk', 'customer-success'),
+    'intercom.io': ('Intercom', 'customer-success'),
+    'hubspot.com': ('HubSpot', 'marketing'),
+    'hs-scripts.com': ('HubSpot', 'marketing'),
+    'klaviyo.com': ('Klaviyo', 'marketing'),
+    'mailchimp.com': ('Mailchimp', 'marketing'),
+    'vimeo.com': ('Vimeo', 'video'),
+    'vimeocdn.com': ('Vimeo', 'video'),
+    'sentry.io': ('Sentry', 'utility'),
+    'newrelic.com': ('New Relic', 'utility'),
+    'nr-data.net': ('New Relic', 'utility'),
+}
+
+# Sentinel keys inside trie nodes; labels never contain these characters
+RULE, EXCEPTION, ENTITY = '$', '!', '='
+IP_RE = re.compile(r'^[\d.]+$|^\[?[0-9a-f:]+\]?$')
+HOST_RE = re.compile(r'[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^/?#@]*@)?(\[[^\]/?#]*\]|[^/?#:]*)')
+
+ATTRIBUTION_SPEC = report_spec(['network-requests', 'bootup-time'], fields=REPORT_FIELDS + ('entities',))
+
+def read_public_suffix_list(path):
+    """Rules of a public_suffix_list.dat file"""
+    rules = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('//'):
+                rules.append(line.split()[0].lower())
+    return rules
+
+def url_host(url):
+    """Lowercase host of an absolute URL (no userinfo, port or trailing dot), '' if there is none"""
+    # Anchored on the scheme, so data: URIs embedding '://' (e.g. SVG namespaces) have no host
+    match = HOST_RE.match(url)
+    return match.group(1).rstrip('.').lower() if match else ''
+
+class DomainClassifier:
+    """Registrable domain and vendor of a host, from precompiled label tries"""
+
+    def __init__(self, suffix_rules=None, entities=KNOWN_ENTITIES):
+        self._hosts = {}
+        self._suffixes = {}
+        for rule in suffix_rules if suffix_rules is not None else PUBLIC_SUFFIXES.split():
+            self._add_suffix_rule(rule)
+        self._entities = {}
+        for domain, (name, category) in entities.items():
+            self.add_entity(domain, name, category)
+        self.stats = {'lookups': 0, 'hosts': 0}
+
+    def _add_suffix_rule(self, rule):
+        exception = rule.startswith('!')
+        node = self._suffixes
+        for label in reversed(rule.lstrip('!').split('.')):
+            node = node.setdefault(label, {})
+        node[EXCEPTION if exception else RULE] = True
+
+    def add_entity(self, domain, name, category=None, first_party=False):
+        """Attribute ``domain`` and its subdomains to a vendor; more specific domains win"""
+        node = self._entities
+        for label in reversed(domain.lower().split('.')):
+            node = node.setdefault(label, {})
+        entity = (name, category, first_party)
+        if node.get(ENTITY) != entity:
+            node[ENTITY] = entity
+            # Only memoized hosts at or under ``domain`` can resolve differently now
+            domain = domain.lower()
+            suffix = '.' + domain
+            for host in [host for host in self._hosts if host == domain or host.endswith(suffix)]:
+                del self._hosts[host]
+
+    def add_report_entities(self, entities):
+        """Entities listed in a Lighthouse report (name, origins, category, isFirstParty)"""
+        for entity in entities or ():
+            for origin in entity.get('origins', ()):
+                host = url_host(origin)
+                if host:
+                    self.add_entity(host, entity['name'], entity.get('category'), entity.get('isFirstParty', False))
+
+    def _suffix_labels(self, labels):
+        """Number of trailing labels forming the public suffix (``labels`` TLD first)"""
+        node = self._suffixes
+        # Default rule: an unknown TLD is itself a public suffix
+        length = 1
+        for i, label in enumerate(labels):
+            child = node.get(label)
+            if child is not None and EXCEPTION in child:
+                return i
+            if child is None:
+                child = node.get('*')
+                if child is None:
+                    break
+            if RULE in child:
+                length = i + 1
+            node = child
+        return length
+
+    def registrable_domain(self, host):
+        if not host or IP_RE.match(host):
+            return host
+        labels = host.split('.')
+        labels.reverse()
+        length = self._suffix_labels(labels) + 1
+        if length > len(labels):
+            return host
+        return '.'.join(reversed(labels[:length]))
+
+    def _entity(self, host):
+        node = self._entities
+        found = None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(ENTITY, found)
+        return found
+
+    def resolve(self, host):
+        """``(vendor, category, registrable domain, first party)`` of a host, memoized"""
+        self.stats['lookups'] += 1
+        resolved = self._hosts.get(host)
+        if resolved is None:
+            self.stats['hosts'] += 1
+            domain = self.registrable_domain(host)
+            entity = self._entity(host)
+            if entity is None:
+                # Unrecognized hosts are grouped by registrable domain, like Lighthouse does
+                resolved = (domain, None, domain, False)
+            else:
+                resolved = (entity[0], entity[1], domain, entity[2])
+            self._hosts[host] = resolved
+        return resolved
+
+    def classify_url(self, url):
+        return self.resolve(url_host(url))
+
+class VendorAttribution:
+    """Per-vendor totals of request rows from one or many pages"""
+
+    def __init__(self, classifier=None):
+        self.classifier = classifier or DomainClassifier()
+        self._codes = {}
+        self.vendors = []
+        self.categories = []
+        self.domains = []
+        self.first_party = []
+        self.pages = []
+        self.requests = np.zeros(0, dtype=np.int64)
+        self.transfer = np.zeros(0, dtype=np.int64)
+        self.main_thread = np.zeros(0, dtype=np.float64)
+        self.rows = 0
+
+    def _vendor_code(self, host, page_domain):
+        vendor, category, domain, first_party = self.classifier.resolve(host)
+        code = self._codes.get(vendor)
+        if code is None:
+            code = self._codes[vendor] = len(self.vendors)
+            self.vendors.append(vendor)
+            self.categories.append(category)
+            self.domains.append(set())
+            self.first_party.append(False)
+            self.pages.append(0)
+        if len(self.domains[code]) < 20:
+            self.domains[code].add(domain)
+        if first_party or domain == page_domain:
+            self.first_party[code] = True
+        return code
+
+    def _vendor_codes(self, urls, page_domain):
+        codes = np.empty(len(urls), dtype=np.int64)
+        # First party depends on the page, so host -> vendor code is memoized per call
+        host_codes = {}
+        for i, url in enumerate(urls):
+            host = url_host(url)
+            code = host_codes.get(host)
+            if code is None:
+                code = host_codes[host] = self._vendor_code(host, page_domain)
+            codes[i] = code
+        return codes
+
+    def _accumulate(self, codes, requests, transfer, main_thread):
+        size = len(self.vendors)
+        self.requests = np.pad(self.requests, (0, size - len(self.requests)))
+        self.transfer = np.pad(self.transfer, (0, size - len(self.transfer)))
+        self.main_thread = np.pad(self.main_thread, (0, size - len(self.main_thread)))
+        if requests:
+            self.requests += np.bincount(codes, minlength=size)
+        if transfer is not None:
+            self.transfer += np.bincount(codes, weights=transfer, minlength=size).astype(np.int64)
+        if main_thread is not None:
+            self.main_thread += np.bincount(codes, weights=main_thread, minlength=size)
+
+    def add(self, urls, transfer_bytes=None, main_thread_ms=None, page_url=None, requests=True):
+        """Attribute parallel arrays of URLs and their bytes / main-thread milliseconds"""
+        page_domain = self.classifier.registrable_domain(url_host(page_url)) if page_url else None
+        codes = self._vendor_codes(urls, page_domain)
+        transfer = None if transfer_bytes is None else np.asarray(transfer_bytes, dtype=np.float64)
+        main_thread = None if main_thread_ms is None else np.asarray(main_thread_ms, dtype=np.float64)
+        self._accumulate(codes, requests, transfer, main_thread)
+        if requests:
+            self.rows += len(urls)
+            for code in np.unique(codes).tolist():
+                self.pages[code] += 1
+
+    def add_lighthouse_report(self, report):
+        """Network requests (bytes, count) and bootup-time (main thread) of a selectively loaded report"""
+        self.classifier.add_report_entities(report.get('entities'))
+        page_url = report.get('finalUrl') or report.get('requestedUrl')
+        audits = report.get('audits', {})
+        items = (audits.get('network-requests', {}).get('details') or {}).get('items', [])
+        items = [item for item in items if url_host(item.get('url', ''))]
+        self.add([item['url'] for item in items], [item.get('transferSize') or 0 for item in items],
+                 page_url=page_url)
+        # Bootup time only lists scripts above Lighthouse's threshold and has an "Unattributable" row
+        items = (audits.get('bootup-time', {}).get('details') or {}).get('items', [])
+        items = [item for item in items if url_host(item.get('url', ''))]
+        self.add([item['url'] for item in items], main_thread_ms=[item.get('total') or 0 for item in items],
+                 page_url=page_url, requests=False)
+
+    def add_har(self, har):
+        """Requests of a HAR log; HAR has no main-thread data"""
+        entries = har.get('log', {}).get('entries', [])
+        pages = har.get('log', {}).get('pages') or []
+        # A page's title is free text; its URL is Chrome's _url or the first request of the page
+        page_url = pages[0].get('_url') if pages else None
+        if page_url is None and pages:
+            page_url = next((entry.get('request', {}).get('url') for entry in entries
+                             if entry.get('pageref') == pages[0].get('id')), None)
+        urls = []
+        transfer = []
+        for entry in entries:
+            url = entry.get('request', {}).get('url', '')
+            if not url_host(url):
+                continue
+            response = entry.get('response', {})
+            size = response.get('_transferSize')
+            if size is None:
+                size = max(response.get('headersSize', 0), 0) + max(response.get('bodySize', 0), 0)
+            urls.append(url)
+            transfer.append(size)
+        if page_url is None and urls:
+            page_url = urls[0]
+        self.add(urls, transfer, page_url=page_url)
+
+    def report(self, sort_by='transfer_bytes'):
+        vendors = [{
+            'vendor': vendor,
+            'category': self.categories[code],
+            'first_party': self.first_party[code],
+            'domains': sorted(self.domains[code]),
+            'pages': self.pages[code],
+            'requests': int(self.requests[code]),
+            'transfer_bytes': int(self.transfer[code]),
+            'main_thread_ms': round(float(self.main_thread[code]), 1),
+        } for vendor, code in self._codes.items()]
+        vendors.sort(key=lambda row: row[sort_by], reverse=True)
+        third_party = [row for row in vendors if not row['first_party']]
+        return {
+            'rows': self.rows,
+            'vendors': len(vendors),
+            'third_party_requests': sum(row['requests'] for row in third_party),
+            'third_party_bytes': sum(row['transfer_bytes'] for row in third_party),
+            'third_party_main_thread_ms': round(sum(row['main_thread_ms'] for row in third_party), 1),
+            'by_vendor': vendors,
+            'stats': dict(self.classifier.stats)
+        }
+
+def attribute_reports(paths, classifier=None, workers=None):
+    """Vendor attribution over Lighthouse reports (.json) and HAR files (.har)"""
+    attribution = VendorAttribution(classifier)
+    har_paths = [path for path in paths if path.endswith('.har')]
+    report_paths = [path for path in paths if not path.endswith('.har')]
+    for path in har_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            attribution.add_har(json.load(f))
+    if report_paths:
+        for report in load_reports(report_paths, ATTRIBUTION_SPEC, workers):
+            if 'error' not in report:
+                attribution.add_lighthouse_report(report)
+    return attribution.report()
+
+def _find_inputs(source):
+    if os.path.isdir(source):
+        hars = [os.path.join(root, name) for root, _, names in os.walk(source)
+                for name in names if name.endswith('.har')]
+        return find_reports(source) + sorted(hars)
+    return [source]
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Attribute requests to third-party vendors')
+    arg_parser.add_argument('source', nargs='?', default='lighthouse-report.json',
+                            help='Lighthouse report or HAR file, or a directory of them')
+    arg_parser.add_argument('--psl', default=None, help='full public_suffix_list.dat to use')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--top', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    rules = read_public_suffix_list(args.psl) if args.psl else None
+    started = time.perf_counter()
+    report = attribute_reports(_find_inputs(args.source), DomainClassifier(rules), args.workers)
+    elapsed = time.perf_counter() - started
+
+    with open('third_party_attribution.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"Attributed {report['rows']} requests to {report['vendors']} vendors in {elapsed:.2f}s "
+          f"({report['stats']['hosts']} hosts resolved)", file=sys.stderr)
+    print(f"Third parties: {report['third_party_requests']} requests, "
+          f"{report['third_party_bytes'] / 1024:.0f} KB, {report['third_party_main_thread_ms']:.0f}ms main thread")
+    print(f"\n{'Vendor':32} {'Category':18} {'Requests':>8} {'KB':>8} {'Main ms':>8}")
+    for row in report['by_vendor'][:args.top]:
+        name = row['vendor'] + (' (1st party)' if row['first_party'] else '')
+        print(f"{name[:32]:32} {row['category'] or '-':18} {row['requests']:8} "
+              f"{row['transfer_bytes'] / 1024:8.0f} {row['main_thread_ms']:8.0f}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Batch TLS certificate scanner with a sorted expiry index
+
+Hosts are scanned concurrently on a bounded thread pool that shares one
+client SSL context per verification mode (and, optionally, the DNS cache).
+Each scan records DNS, TCP connect and handshake latency, the negotiated
+protocol and cipher, and the full certificate chain with SANs and validity.
+A failed verification does not hide the certificate: the handshake is
+repeated without verification so the report still shows what the host
+serves and why it was rejected. Results go into an ExpiryIndex kept sorted
+by notAfter, so "what expires in the next 14 days" is a binary search.
+"""
+import argparse
+import bisect
+import json
+import os
+import socket
+import ssl
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_INDEX_PATH = 'tls_expiry_index.json'
+DAY = 86400
+
+def parse_target(target, default_port=443):
+    """``host``, ``host:port``, ``[v6]:port``, a bare IPv6 address or a URL -> (host, port)
+
+    Raises ValueError for a port that is not a number.
+    """
+    if '://' in target:
+        target = target.split('://', 1)[1].split('/', 1)[0]
+    if target.startswith('['):
+        host, _, rest = target[1:].partition(']')
+        return host, int(rest[1:]) if rest.startswith(':') else default_port
+    if target.count(':') > 1:
+        # Only an IPv6 address has several colons; a port needs the brackets
+        return target, default_port
+    host, _, port = target.partition(':')
+    return host, int(port) if port else default_port
+
+def _names(rdns):
+    """Certificate name tuple -> {'commonName': ..., 'organizationName': ...}"""
+    return {key: value for rdn in rdns for key, value in rdn}
+
+def certificate_details(info):
+    """Flatten the dict of a decoded certificate (ssl getpeercert / chain get_info)"""
+    expires_at = ssl.cert_time_to_seconds(info['notAfter'])
+    return {
+        'subject': _names(info.get('subject', ())),
+        'issuer': _names(info.get('issuer', ())),
+        'serial': info.get('serialNumber'),
+        'sans': [value for kind, value in info.get('subjectAltName', ()) if kind in ('DNS', 'IP Address')],
+        'not_before': info['notBefore'],
+        'not_after': info['notAfter'],
+        'expires_at': expires_at,
+    }
+
+def _chain(ssock):
+    # Public in Python 3.13; the same methods exist on the private SSL object since 3.10
+    owner = ssock if hasattr(ssock, 'get_unverified_chain') else getattr(ssock, '_sslobj', None)
+    if owner is None or not hasattr(owner, 'get_unverified_chain'):
+        return []
+    certificates = owner.get_verified_chain() if ssock.context.verify_mode != ssl.CERT_NONE else None
+    return [certificate_details(certificate.get_info())
+            for certificate in certificates or owner.get_unverified_chain() or []]
+
+class TLSScanner:
+    def __init__(self, concurrency=32, timeout=5.0, cafile=None, resolver=None, index=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.resolver = resolver
+        self.index = index
+        # Contexts are shared by every scan (and thread); only the socket is per host
+        self.context = ssl.create_default_context(cafile=cafile)
+        self.insecure_context = ssl.create_default_context(cafile=cafile)
+        self.insecure_context.check_hostname = False
+        self.insecure_context.verify_mode = ssl.CERT_NONE
+        self.stats = {'hosts': 0, 'verified': 0, 'unverified': 0, 'failed': 0}
+
+    def _handshake(self, address, host, port, context, result):
+        started = time.perf_counter()
+        sock = socket.create_connection((address, port), timeout=self.timeout)
+        try:
+            connected = time.perf_counter()
+            result['connect_ms'] = round((connected - started) * 1000, 2)
+            ssock = context.wrap_socket(sock, server_hostname=host)
+            result['handshake_ms'] = round((time.perf_counter() - connected) * 1000, 2)
+            with ssock:
+                cipher, _, bits = ssock.cipher()
+                result.update({'protocol': ssock.version(), 'cipher': cipher, 'cipher_bits': bits})
+                chain = _chain(ssock)
+                if not chain and context.verify_mode != ssl.CERT_NONE:
+                    chain = [certificate_details(ssock.getpeercert())]
+                result['chain'] = chain
+        finally:
+            sock.close()
+
+    def scan_host(self, target):
+        """Scan one ``host[:port]``; never raises, failures are described in ``error``"""
+        try:
+            host, port = parse_target(target)
+        except ValueError as e:
+            return {'host': target, 'port': None, 'ssl_enabled': False, 'verified': False, 'error': f'target: {e}'}
+        result = {'host': host, 'port': port, 'ssl_enabled': False, 'verified': False}
+        started = time.perf_counter()
+        try:
+            address = self.resolver.address(host, port) if self.resolver else \
+                socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        except OSError as e:
+            result['error'] = f'dns: {e}'
+            return result
+        result['address'] = address
+        result['dns_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        try:
+            try:
+                self._handshake(address, host, port, self.context, result)
+                result['verified'] = True
+            except ssl.SSLCertVerificationError as e:
+                # Repeat without verification to report what the host actually serves
+                result['error'] = f'verify: {e.verify_message}'
+                self._handshake(address, host, port, self.insecure_context, result)
+        except socket.timeout:
+            result['error'] = 'timeout'
+            return result
+        except ssl.SSLError as e:
+            result['error'] = f'handshake: {e.reason or e}'
+            return result
+        except OSError as e:
+            result['error'] = f'connect: {e.strerror or e}'
+            return result
+
+        result['ssl_enabled'] = True
+        if result['chain']:
+            leaf = result['chain'][0]
+            result.update({key: leaf[key] for key in ('subject', 'issuer', 'sans', 'not_before', 'not_after',
+                                                       'expires_at')})
+            result['days_left'] = round((leaf['expires_at'] - time.time()) / DAY, 2)
+            result['self_signed'] = len(result['chain']) == 1 and leaf['subject'] == leaf['issuer']
+        return result
+
+    def scan(self, targets):
+        """Scan every target, at most ``concurrency`` at a time; results keep the input order"""
+        targets = list(dict.fromkeys(targets))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(self.scan_host, targets))
+        for result in results:
+            self.stats['hosts'] += 1
+            if not result['ssl_enabled']:
+                self.stats['failed'] += 1
+            else:
+                self.stats['verified' if result['verified'] else 'unverified'] += 1
+            if self.index is not None and 'expires_at' in result:
+                self.index.add(result)
+        return results
+
+class ExpiryIndex:
+    """Certificates ordered by expiry; range queries are binary searches"""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, result):
+        """Insert or replace the certificate of ``result['host']:result['port']``"""
+        endpoint = f"{result['host']}:{result['port']}"
+        self.remove(endpoint)
+        entry = {key: result.get(key) for key in ('host', 'port', 'not_after', 'expires_at', 'verified')}
+        entry['issuer'] = (result.get('issuer') or {}).get('commonName')
+        self._entries[endpoint] = entry
+        bisect.insort(self._keys, (entry['expires_at'], endpoint))
+
+    def remove(self, endpoint):
+        entry = self._entries.pop(endpoint, None)
+        if entry is not None:
+            del self._keys[bisect.bisect_left(self._keys, (entry['expires_at'], endpoint))]
+
+    def expiring_between(self, start, end):
+        """Entries with ``start <= expires_at < end``, soonest first"""
+        low = bisect.bisect_left(self._keys, (start, ''))
+        high = bisect.bisect_left(self._keys, (end, ''))
+        return [self._entries[endpoint] for _, endpoint in self._keys[low:high]]
+
+    def expiring_within(self, days, now=None):
+        """Certificates that expire in the next ``days`` days (including already expired ones)"""
+        now = time.time() if now is None else now
+        return self.expiring_between(float('-inf'), now + days * DAY)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        temp = path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump([self._entries[endpoint] for _, endpoint in self._keys], f, indent=2)
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        index = cls()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            # Saved in order, so no re-sorting is needed
+            index._entries = {f"{entry['host']}:{entry['port']}": entry for entry in entries}
+            index._keys = [(entry['expires_at'], f"{entry['host']}:{entry['port']}") for entry in entries]
+        return index
+
+def print_expiring(entries, now=None):
+    now = time.time() if now is None else now
+    for entry in entries:
+        days = (entry['expires_at'] - now) / DAY
+        state = 'EXPIRED' if days < 0 else f'{days:6.1f} days'
+        print(f"{state:>12}  {entry['host']}:{entry['port']}  ({entry['issuer']}, {entry['not_after']})")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Scan TLS certificates of many hosts')
+    arg_parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help='expiry index file')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    scan_parser = commands.add_parser('scan', help='scan hosts and update the expiry index')
+    scan_parser.add_argument('hosts', nargs='*', help='host[:port] or URL (default: read from --file)')
+    scan_parser.add_argument('--file', help='text file with one host per line')
+    scan_parser.add_argument('--concurrency', type=int, default=32)
+    scan_parser.add_argument('--timeout', type=float, default=5.0)
+    scan_parser.add_argument('--cafile', default=None)
+    expiring_parser = commands.add_parser('expiring', help='list certificates expiring soon')
+    expiring_parser.add_argument('--days', type=float, default=14)
+    args = arg_parser.parse_args()
+
+    index = ExpiryIndex.load(args.index)
+    if args.command == 'expiring':
+        print_expiring(index.expiring_within(args.days))
+        sys.exit(0)
+
+    hosts = list(args.hosts)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            hosts += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    hosts = hosts or ['www.tln-werbemittel.de']
+    scanner = TLSScanner(args.concurrency, args.timeout, args.cafile, index=index)
+    started = time.perf_counter()
+    results = scanner.scan(hosts)
+    index.save(args.index)
+    with open('tls_scan_report.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"Scanned {len(results)} hosts in {time.perf_counter() - started:.2f}s: {scanner.stats}")
+    for result in results:
+        if result['ssl_enabled']:
+            print(f"{result['host']}:{result['port']}  {result['protocol']} {result['cipher']}  "
+                  f"handshake {result['handshake_ms']:.0f}ms  expires in {result.get('days_left', '?')} days"
+                  + ('' if result['verified'] else f"  [{result['error']}]"))
+        else:
+            print(f"{result['host']}:{result['port']}  FAILED: {result['error']}")
+    expiring = index.expiring_within(14)
+    if expiring:
+        print("\nExpiring within 14 days:")
+        print_expiring(expiring)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Vectorized network waterfall analysis of Lighthouse network-requests
+
+The requests of a run are loaded into typed NumPy columns (start/end
+times, sizes, priority, resource type, origin) and every breakdown is an
+array operation: per-origin and per-type bytes and busy time, how long
+render-blocking requests overlap the time to FCP, connection parallelism
+over time, inferred critical request chains and an attribution of the
+time to LCP. A batch mode summarizes whole report archives in parallel.
+
+Lighthouse's network-requests items carry no initiators, so a critical
+request's parent is inferred as the critical request that finished last
+before it started, or the main document for requests that began while
+the HTML was still streaming.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from lighthouse_loader import find_reports, load_report
+
+PRIORITIES = ('VeryLow', 'Low', 'Medium', 'High', 'VeryHigh')
+HIGH_PRIORITY = PRIORITIES.index('High')
+CRITICAL_TYPES = ('Document', 'Stylesheet', 'Script', 'Font')
+RENDER_BLOCKING_TYPES = ('Stylesheet', 'Script')
+
+NETWORK_FIELDS = {field: True for field in (
+    'url', 'rendererStartTime', 'networkRequestTime', 'networkEndTime', 'finished',
+    'transferSize', 'resourceSize', 'statusCode', 'resourceType', 'priority', 'protocol', 'isLinkPreload'
+)}
+WATERFALL_SPEC = {
+    'finalUrl': True,
+    'fetchTime': True,
+    'audits': {
+        'network-requests': {'details': {'items': NETWORK_FIELDS}},
+        'first-contentful-paint': {'numericValue': True},
+        'largest-contentful-paint': {'numericValue': True},
+    },
+}
+
+def _codes(values):
+    """Dictionary-encode strings as (int32 codes, labels)"""
+    labels, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int32), [str(label) for label in labels]
+
+def interval_union(starts, ends, groups=None, n_groups=1):
+    """Total length covered by the intervals of each group (overlaps counted once)"""
+    if groups is None:
+        groups = np.zeros(len(starts), dtype=np.int64)
+    if not len(starts):
+        return np.zeros(n_groups)
+    order = np.lexsort((starts, groups))
+    groups, starts, ends = groups[order], starts[order], ends[order]
+    first = np.r_[True, groups[1:] != groups[:-1]]
+    # Running max of the end time, restarted per group by lifting each group above the previous
+    lift = (ends.max() - starts.min() + 1) * groups
+    reach = np.maximum.accumulate(ends - starts.min() + lift) - lift + starts.min()
+    new_segment = first | (starts > np.r_[-np.inf, reach[:-1]])
+    seg_index = np.flatnonzero(new_segment)
+    seg_end = np.maximum.reduceat(ends, seg_index)
+    return np.bincount(groups[seg_index], weights=seg_end - starts[seg_index], minlength=n_groups)
+
+def concurrency_profile(starts, ends):
+    """Event times and the number of requests in flight from each event to the next"""
+    times = np.r_[starts, ends]
+    deltas = np.r_[np.ones(len(starts), np.int64), -np.ones(len(ends), np.int64)]
+    # Ends sort before starts at equal times so touching requests do not count as parallel
+    order = np.lexsort((deltas, times))
+    times, level = times[order], np.cumsum(deltas[order])
+    return times, level
+
+class Waterfall:
+    def __init__(self, items, fcp=None, lcp=None, url=None):
+        self.url = url
+        self.fcp = fcp
+        self.lcp = lcp
+        self.urls = [item.get('url', '') for item in items]
+        self.start = np.array([item.get('rendererStartTime', item.get('networkRequestTime', 0)) for item in items],
+                              dtype=np.float64)
+        self.request = np.array([item.get('networkRequestTime', 0) for item in items], dtype=np.float64)
+        # Unfinished requests (networkEndTime -1) become zero-length
+        self.end = np.array([item.get('networkEndTime', -1) for item in items], dtype=np.float64)
+        self.end = np.maximum(self.end, self.start)
+        self.transfer = np.array([item.get('transferSize') or 0 for item in items], dtype=np.int64)
+        self.resource = np.array([item.get('resourceSize') or 0 for item in items], dtype=np.int64)
+        self.status = np.array([item.get('statusCode', 0) for item in items], dtype=np.int16)
+        self.priority = np.array([PRIORITIES.index(item['priority']) if item.get('priority') in PRIORITIES else 0
+                                  for item in items], dtype=np.int8)
+        self.type_codes, self.types = _codes([item.get('resourceType', 'Other') for item in items])
+        self.origin_codes, self.origins = _codes([
+            '{0.scheme}://{0.netloc}'.format(urlsplit(url)) if not url.startswith('data:') else 'data:'
+            for url in self.urls
+        ])
+        self.protocol_codes, self.protocols = _codes([item.get('protocol', '') for item in items])
+
+    @classmethod
+    def from_report(cls, report):
+        audits = report.get('audits', {})
+        items = (audits.get('network-requests', {}).get('details') or {}).get('items', [])
+        return cls(
+            items,
+            fcp=audits.get('first-contentful-paint', {}).get('numericValue'),
+            lcp=audits.get('largest-contentful-paint', {}).get('numericValue'),
+            url=report.get('finalUrl'),
+        )
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_report(load_report(path, spec=WATERFALL_SPEC))
+
+    def __len__(self):
+        return len(self.urls)
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def _network_mask(self):
+        # data: URIs are decoded in memory and never hit the network
+        return self.origin_codes != self.origins.index('data:') if 'data:' in self.origins else np.ones(len(self), bool)
+
+    def breakdown(self, by='type'):
+        """Requests, bytes, summed and busy (overlap-free) time per resource type or origin"""
+        codes, labels = (self.type_codes, self.types) if by == 'type' else (self.origin_codes, self.origins)
+        n = len(labels)
+        requests = np.bincount(codes, minlength=n)
+        transfer = np.bincount(codes, weights=self.transfer, minlength=n)
+        resource = np.bincount(codes, weights=self.resource, minlength=n)
+        summed = np.bincount(codes, weights=self.duration, minlength=n)
+        busy = interval_union(self.start, self.end, codes, n)
+        rows = [{
+            by: labels[i],
+            'requests': int(requests[i]),
+            'transfer_bytes': int(transfer[i]),
+            'resource_bytes': int(resource[i]),
+            'summed_ms': round(float(summed[i]), 1),
+            'busy_ms': round(float(busy[i]), 1),
+        } for i in range(n)]
+        rows.sort(key=lambda row: row['transfer_bytes'], reverse=True)
+        return rows
+
+    def render_blocking(self):
+        """Render-blocking candidates (high-priority CSS/JS started before FCP) and their overlap with FCP"""
+        if self.fcp is None:
+            return None
+        blocking_types = [self.types.index(t) for t in RENDER_BLOCKING_TYPES if t in self.types]
+        mask = np.isin(self.type_codes, blocking_types) & (self.priority >= HIGH_PRIORITY) & (self.start < self.fcp)
+        starts = np.minimum(self.start[mask], self.fcp)
+        ends = np.minimum(self.end[mask], self.fcp)
+        covered = float(interval_union(starts, ends)[0])
+        return {
+            'requests': int(mask.sum()),
+            'transfer_bytes': int(self.transfer[mask].sum()),
+            'in_flight_before_fcp_ms': round(covered, 1),
+            'share_of_fcp': round(covered / self.fcp, 3) if self.fcp else None,
+            'last_finished_ms': round(float(self.end[mask].max()), 1) if mask.any() else None,
+        }
+
+    def parallelism(self):
+        """Time-weighted requests in flight overall and the peak per origin"""
+        network = self._network_mask()
+        times, level = concurrency_profile(self.start[network], self.end[network])
+        if not len(times):
+            return None
+        spans = np.diff(times)
+        active = level[:-1] > 0
+        busy = spans[active].sum()
+        per_origin = {}
+        codes = self.origin_codes[network]
+        for code in np.unique(codes):
+            _, origin_level = concurrency_profile(self.start[network][codes == code], self.end[network][codes == code])
+            per_origin[self.origins[code]] = int(origin_level.max())
+        histogram = np.bincount(level[:-1], weights=spans)
+        return {
+            'max_in_flight': int(level.max()),
+            'mean_in_flight_while_busy': round(float((level[:-1] * spans)[active].sum() / busy), 2) if busy else 0.0,
+            'network_busy_ms': round(float(busy), 1),
+            'network_idle_ms': round(float(spans[~active].sum()), 1),
+            'ms_at_level': {int(k): round(float(v), 1) for k, v in enumerate(histogram) if v},
+            'max_in_flight_per_origin': dict(sorted(per_origin.items(), key=lambda item: -item[1])),
+        }
+
+    def critical_chains(self):
+        """Inferred critical request chains and the longest one"""
+        critical_types = [self.types.index(t) for t in CRITICAL_TYPES if t in self.types]
+        critical = np.flatnonzero(np.isin(self.type_codes, critical_types) & (self.priority >= HIGH_PRIORITY))
+        if not len(critical):
+            return None
+        by_end = critical[np.argsort(self.end[critical], kind='stable')]
+        ends = self.end[by_end]
+        # Parent: the critical request that finished last before this one started
+        slot = np.searchsorted(ends, self.start[critical], side='left') - 1
+        parent = np.full(len(self), -1, dtype=np.int64)
+        parent[critical] = np.where(slot >= 0, by_end[np.maximum(slot, 0)], -1)
+        # Requests discovered while the HTML was still streaming hang off the main document
+        documents = critical[self.type_codes[critical] == self.types.index('Document')] \
+            if 'Document' in self.types else critical[:0]
+        if len(documents):
+            root = documents[np.argmin(self.start[documents])]
+            orphans = critical[(parent[critical] < 0) & (critical != root)]
+            parent[orphans] = root
+
+        # Chain depth by pointer jumping: O(log depth) vectorized passes
+        depth = (parent >= 0).astype(np.int64)
+        ancestor = parent.copy()
+        nodes = np.flatnonzero(ancestor >= 0)
+        while len(nodes):
+            step = ancestor[nodes]
+            depth[nodes] += depth[step]
+            ancestor[nodes] = ancestor[step]
+            nodes = nodes[ancestor[nodes] >= 0]
+
+        leaf = critical[np.argmax(self.end[critical])]
+        chain = [leaf]
+        while parent[chain[-1]] >= 0:
+            chain.append(parent[chain[-1]])
+        chain.reverse()
+        return {
+            'critical_requests': int(len(critical)),
+            'max_depth': int(depth[critical].max()) + 1,
+            'longest_chain': {
+                'length': len(chain),
+                'duration_ms': round(float(self.end[chain[-1]] - self.start[chain[0]]), 1),
+                'transfer_bytes': int(self.transfer[chain].sum()),
+                'requests': [{
+                    'url': self.urls[i],
+                    'type': self.types[self.type_codes[i]],
+                    'start_ms': round(float(self.start[i]), 1),
+                    'end_ms': round(float(self.end[i]), 1),
+                    'transfer_bytes': int(self.transfer[i]),
+                } for i in chain],
+            },
+        }
+
+    def lcp_attribution(self):
+        """Split the time to LCP into document, render-blocking, other network and network-idle time"""
+        if self.lcp is None or not len(self):
+            return None
+        document = self.types.index('Document') if 'Document' in self.types else -1
+        blocking_types = [self.types.index(t) for t in RENDER_BLOCKING_TYPES if t in self.types]
+        is_document = self.type_codes == document
+        is_blocking = np.isin(self.type_codes, blocking_types) & (self.priority >= HIGH_PRIORITY)
+        network = self._network_mask()
+
+        starts = np.minimum(self.start, self.lcp)
+        ends = np.minimum(self.end, self.lcp)
+        # Start/end events of each class plus the two window bounds
+        times = np.r_[starts, ends, 0.0, self.lcp]
+        deltas = {}
+        for name, mask in (('all', network), ('document', is_document & network),
+                           ('blocking', is_blocking & network)):
+            mask = mask.astype(np.int64)
+            deltas[name] = np.r_[mask, -mask, 0, 0]
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        spans = np.diff(times)
+        levels = {name: np.cumsum(delta[order])[:-1] for name, delta in deltas.items()}
+        document_time = spans[levels['document'] > 0].sum()
+        blocking_time = spans[(levels['document'] <= 0) & (levels['blocking'] > 0)].sum()
+        other_time = spans[(levels['document'] <= 0) & (levels['blocking'] <= 0) & (levels['all'] > 0)].sum()
+        idle_time = spans[levels['all'] <= 0].sum()
+        return {
+            'lcp_ms': round(float(self.lcp), 1),
+            'document_ms': round(float(document_time), 1),
+            'render_blocking_ms': round(float(blocking_time), 1),
+            'other_network_ms': round(float(other_time), 1),
+            'network_idle_ms': round(float(idle_time), 1),
+            'bytes_before_lcp': int(self.transfer[self.end <= self.lcp].sum()),
+            'requests_after_lcp': int((self.start > self.lcp).sum()),
+        }
+
+    def summary(self):
+        return {
+            'url': self.url,
+            'requests': len(self),
+            'transfer_bytes': int(self.transfer.sum()),
+            'by_type': self.breakdown('type'),
+            'by_origin': self.breakdown('origin'),
+            'render_blocking': self.render_blocking(),
+            'parallelism': self.parallelism(),
+            'critical_chains': self.critical_chains(),
+            'lcp_attribution': self.lcp_attribution(),
+        }
+
+def _summarize(path):
+    try:
+        report = load_report(path, spec=WATERFALL_SPEC)
+        record = Waterfall.from_report(report).summary()
+        record['fetch_time'] = report.get('fetchTime')
+    except (OSError, ValueError) as e:
+        record = {'error': str(e)}
+    record['file'] = path
+    return record
+
+def summarize_reports(paths, workers=None, chunksize=8):
+    """Yield waterfall summaries of many reports, computed on a process pool"""
+    from batch_analyze import available_cores
+
+    with ProcessPoolExecutor(max_workers=workers or available_cores()) as executor:
+        yield from executor.map(_summarize, paths, chunksize=chunksize)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Network waterfall analysis of Lighthouse reports')
+    arg_parser.add_argument('source', nargs='?', default='lighthouse-report.json',
+                            help='report file, or a directory for batch mode')
+    arg_parser.add_argument('output', nargs='?', default='waterfall_summaries.jsonl')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    args = arg_parser.parse_args()
+
+    paths = find_reports(args.source)
+    if len(paths) == 1:
+        print(json.dumps(_summarize(paths[0]), indent=2, ensure_ascii=False))
+    else:
+        started = time.perf_counter()
+        with open(args.output, 'w', encoding='utf-8') as out:
+            for record in summarize_reports(paths, args.workers):
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        elapsed = time.perf_counter() - started
+        print(f"Summarized {len(paths)} reports in {elapsed:.2f}s -> {args.output}", file=sys.stderr)
@@ -0,0 +1,125 @@
+import asyncio
+import socket
+import time
+
+import dns.rcode
+import pytest
+import requests
+
+from dns_cache import CachingResolver, install_resolver
+from standin_server import StandinServer, StubDNSServer, default_app, self_signed_certificate
+
+ZONE = {
+    'site.test.': {'A': (300, ['127.0.0.1']), 'MX': (300, ['10 mail.site.test.']), 'TXT': (300, ['"v=spf1 -all"'])},
+    'short.test.': {'A': (1, ['127.0.0.2'])},
+}
+
+class _ServfailDNSServer(StubDNSServer):
+    def answer(self, query):
+        response = super().answer(query)
+        response.set_rcode(dns.rcode.SERVFAIL)
+        del response.answer[:]
+        del response.authority[:]
+        return response
+
+def _resolver(stub, **options):
+    nameserver, port = stub.address
+    return CachingResolver(nameservers=[nameserver], port=port, **options)
+
+@pytest.fixture
+def stub():
+    with StubDNSServer(ZONE, negative_ttl=7) as stub:
+        yield stub
+
+def test_answers_are_cached_until_their_ttl_expires(stub):
+    resolver = _resolver(stub)
+
+    first = resolver.resolve('short.test')
+    assert [record.to_text() for record in first.records] == ['127.0.0.2']
+    assert first.ttl == 1
+    assert resolver.resolve('short.test') is first
+    assert len(stub.queries) == 1
+
+    time.sleep(1.1)
+    resolver.resolve('short.test')
+    assert len(stub.queries) == 2
+    assert resolver.stats['hits'] == 1
+
+def test_nxdomain_is_cached_for_the_soa_minimum(stub):
+    resolver = _resolver(stub)
+
+    missing = resolver.resolve('nothing.test')
+    assert missing.error == 'NXDOMAIN'
+    assert missing.ttl == 7
+    assert resolver.resolve('NOTHING.test.').error == 'NXDOMAIN'
+    assert len(stub.queries) == 1
+    assert resolver.stats['negative_hits'] == 1
+
+    empty = resolver.resolve('short.test', 'MX')
+    assert empty.error == 'NoAnswer'
+    assert empty.ttl == 7
+
+def test_servfail_is_not_cached():
+    with _ServfailDNSServer(ZONE) as stub:
+        resolver = _resolver(stub, timeout=2)
+        assert resolver.resolve('site.test').error is not None
+        assert resolver.resolve('site.test').error is not None
+    assert len(stub.queries) >= 2
+    assert resolver.stats['hits'] == 0
+    assert resolver.stats['errors'] == 2
+
+def test_timeouts_are_not_cached():
+    # A socket nobody reads from: every query times out
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    try:
+        resolver = CachingResolver(nameservers=['127.0.0.1'], port=silent.getsockname()[1], timeout=0.3)
+        assert resolver.resolve('site.test').error == 'LifetimeTimeout'
+        assert resolver.resolve('site.test').error == 'LifetimeTimeout'
+    finally:
+        silent.close()
+    assert resolver.stats['queries'] == 2
+    assert resolver.stats['hits'] == 0
+
+def test_resolve_many_returns_every_name_and_type(stub):
+    resolver = _resolver(stub)
+    results = resolver.resolve_many(['site.test', 'nothing.test'])
+
+    assert set(results) == {'site.test', 'nothing.test'}
+    assert [record.to_text() for record in results['site.test']['MX'].records] == ['10 mail.site.test.']
+    assert results['nothing.test']['A'].error == 'NXDOMAIN'
+    assert len(stub.queries) == 6
+
+def test_concurrent_identical_lookups_share_one_query():
+    with StubDNSServer(ZONE, latency=0.2) as stub:
+        resolver = _resolver(stub)
+
+        async def lookups():
+            # Spelled differently, the same (name, type) once normalized
+            return await asyncio.gather(resolver.resolve_many_async(['site.test', 'SITE.test.'], ['A']),
+                                        resolver.resolve_many_async(['site.test'], ['A']))
+
+        first, second = asyncio.run(lookups())
+    assert stub.queries == [('site.test.', 'A')]
+    assert first['site.test']['A'] is first['SITE.test.']['A'] is second['site.test']['A']
+
+def test_install_resolver_keeps_sni_and_host_on_the_hostname(stub, tmp_path):
+    certfile, keyfile = self_signed_certificate(str(tmp_path), hostname='site.test')
+    hosts = []
+
+    def app(method, path, headers):
+        hosts.append(headers['Host'])
+        return default_app(method, path, headers)
+
+    server_names = []
+    with StandinServer(app, tls=True, certfile=certfile, keyfile=keyfile) as server:
+        server._httpd.socket.context.sni_callback = lambda sock, name, context: server_names.append(name)
+        port = server.base_url.rsplit(':', 1)[1]
+        session = requests.Session()
+        install_resolver(session, _resolver(stub))
+        response = session.get(f'https://site.test:{port}/', verify=certfile, timeout=5)
+
+    assert response.status_code == 200
+    assert ('site.test.', 'A') in stub.queries
+    assert server_names == ['site.test']
+    assert hosts == [f'site.test:{port}']
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from histogram import LatencyHistogram
+from phase_probe import PHASES, PhaseProbe, probe_once, ssl_context
+from standin_server import StandinServer, default_app
+
+def _redirecting_app(method, path, headers):
+    hops = {'/old': '/middle', '/middle': '/new'}
+    if path in hops:
+        return 301, {'Location': hops[path]}, b''
+    return default_app(method, path, headers)
+
+@pytest.fixture(scope='module')
+def server():
+    with StandinServer(_redirecting_app, tls=True) as server:
+        yield server
+
+def test_every_phase_is_recorded_for_every_sample(server):
+    probe = PhaseProbe(samples=6, concurrency=3, verify=server.cafile)
+    report = probe.run(server.url('/page'))
+
+    assert report['errors'] == 0
+    assert set(report['phases_ms']) == set(PHASES)
+    assert all(summary['count'] == 6 for summary in report['phases_ms'].values())
+    assert report['phases_ms']['tls']['p50'] > 0
+    assert report['phases_ms']['redirect']['max'] == 0
+    assert report['final_url'] == server.url('/page')
+
+def test_redirect_hops_are_counted_and_timed(server):
+    sample = probe_once(server.url('/old'), ssl_context(server.cafile))
+
+    assert sample['status'] == 200
+    assert sample['url'] == server.url('/new')
+    assert [hop['status'] for hop in sample['redirects']] == [301, 301]
+    assert sample['phases']['redirect'] > 0
+    assert sample['phases']['total'] > sample['phases']['redirect']
+
+def test_redirects_stop_at_the_limit(server):
+    sample = probe_once(server.url('/old'), ssl_context(server.cafile), max_redirects=1)
+
+    assert sample['status'] == 301
+    assert sample['url'] == server.url('/middle')
+    assert len(sample['redirects']) == 1
+
+def test_host_header_matches_the_url(server):
+    seen = []
+
+    def app(method, path, headers):
+        seen.append(headers.get_all('Host'))
+        return default_app(method, path, headers)
+
+    with StandinServer(app, tls=True) as other:
+        probe_once(other.url('/'), ssl_context(other.cafile))
+        port = other.base_url.rsplit(':', 1)[1]
+    assert seen == [[f'127.0.0.1:{port}']]
+
+def test_untrusted_certificate_is_reported_per_sample(server):
+    # The stand-in's self-signed certificate is not in the default trust store
+    probe = PhaseProbe(samples=3, verify=True)
+    report = probe.run(server.url('/'))
+
+    assert report['errors'] == 3
+    assert 'SSL' in report['first_error'] or 'certificate' in report['first_error']
+    assert report['phases_ms']['total'] == {'count': 0}
+
+def test_connection_refused_is_an_error_not_an_exception():
+    with StandinServer() as closed:
+        url = closed.url('/')
+
+    sample = probe_once(url)
+    assert 'error' in sample
+    assert sample['redirects'] == []
+
+def test_histogram_percentiles_are_within_a_bucket():
+    histogram = LatencyHistogram()
+    histogram.record_many(range(1, 1001))
+
+    assert histogram.count == 1000
+    assert histogram.min == 1 and histogram.max == 1000
+    assert histogram.mean == pytest.approx(500.5)
+    for q, exact in ((50, 500), (90, 900), (99, 990)):
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.025)
+    assert LatencyHistogram().percentile(50) is None
+
+def test_merged_histograms_equal_one_recording_everything():
+    left, right, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    left.record_many([1, 2, 3, 400])
+    right.record_many([5, 60, 7000])
+    both.record_many([1, 2, 3, 400, 5, 60, 7000])
+
+    left.merge(right)
+    assert left.summary() == both.summary()
+    assert (left.counts == both.counts).all()
+    with pytest.raises(ValueError):
+        left.merge(LatencyHistogram(buckets_per_decade=10))
+
+def test_histogram_survives_a_json_round_trip():
+    histogram = LatencyHistogram()
+    histogram.record_many([0.001, 0.5, 12.25, 12.3, 99999.0, 1e9])
+
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert restored.layout == histogram.layout
+    assert (restored.counts == histogram.counts).all()
+    assert restored.summary() == histogram.summary()
+    assert LatencyHistogram.from_dict(LatencyHistogram().to_dict()).count == 0